@@ -0,0 +1,237 @@
+# -*- coding: utf-8 -*-
+"""
+getJsonData.cmd 응답과 jsp 를 DataFrame, converting_map, readable_columns 로 바꾸는 함수들의 벤치마크.
+네트워크를 사용하지 않는다.
+
+    python -m benchmark.conversion                     # 실행 후 baseline.json 과 비교, 느려졌으면 exit code 1
+    python -m benchmark.conversion --save-baseline     # 결과를 baseline.json 에 저장
+    python -m benchmark.conversion --filter universe   # 이름에 universe 가 들어간 case 만 실행
+
+baseline 은 실행한 컴퓨터에 따라 다르므로 비교하는 컴퓨터에서 다시 저장해서 사용한다.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import tracemalloc
+from statistics import mean
+
+from bs4 import BeautifulSoup as bs
+
+from finance import jsp_parser
+from finance import to_DataFrame as td
+from finance import to_Table as tt
+from finance.data_reader_ import parse_converting_map, parse_div_map, parse_jsGrid_dict, parse_efrb_urls
+from finance.json_decoder import rows_to_columns
+from benchmark.payloads import load_payloads
+from benchmark.corpus import load_fixture
+
+baseline_filename = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+
+class Case:
+    def __init__(self, name, func, setup, rows, source='recorded'):
+        """
+        :param func: 측정할 함수
+        :param setup: func 의 인자 tuple 을 돌려주는 함수, func 가 인자를 수정하는 경우가 있어 매번 새로 만든다.
+            setup 시간은 측정하지 않는다.
+        :param rows: 한 번 실행할 때 처리하는 row 수
+        :param source: payload 가 녹화된 것이면 'recorded', 만든 것이면 'synthetic' (benchmark.payloads 참고)
+        """
+        self.name = name
+        self.func = func
+        self.setup = setup
+        self.rows = rows
+        self.source = source
+
+
+def make_cases():
+    cases = []
+    for name, (krx_data, column_map, source) in load_payloads().items():
+        columnar_data = rows_to_columns(krx_data)
+        rows = len(list(krx_data.values())[0])
+        raw = td.apply_column_map(krx_data, dict(column_map))
+        indexed = td.date_to_index(raw.copy())
+        column_data = [column.split('//') for column in indexed.columns]
+        columns_depth = max([len(c) for c in column_data])
+        column_data = td.remove_same_named_column(column_data, columns_depth)
+        converted = td.to_DataFrame(columnar_data, dict(column_map))
+
+        cases.extend([
+            Case(f'to_DataFrame[{name}]', td.to_DataFrame,
+                 lambda d=columnar_data, m=column_map: (d, dict(m)), rows, source),
+            Case(f'apply_column_map[{name}, rows]', td.apply_column_map,
+                 lambda d=krx_data, m=column_map: (d, dict(m)), rows, source),
+            Case(f'apply_column_map[{name}, columnar]', td.apply_column_map,
+                 lambda d=columnar_data, m=column_map: (d, dict(m)), rows, source),
+            Case(f'string_to_float[{name}]', td.string_to_float, lambda d=indexed: (d.copy(),), rows, source),
+            Case(f'date_to_index[{name}]', td.date_to_index, lambda d=raw: (d.copy(),), rows, source),
+            Case(f'multi_columnize[{name}]', td.multi_columnize,
+                 lambda c=column_data, depth=columns_depth: ([list(i) for i in c], depth), rows, source),
+            Case(f'compact_DataFrame[{name}]', td.compact_DataFrame, lambda d=converted: (d,), rows, source),
+        ])
+        if tt.pa is not None:
+            cases.append(Case(f'to_Table[{name}, arrow]', tt.to_Table,
+                              lambda d=columnar_data, m=column_map: (d, dict(m)), rows, source))
+
+    # [15001] jsp, BeautifulSoup 과 lxml backend
+    fixture = load_fixture()
+    jsp = str(fixture['jsp_soup']).encode('utf-8')
+    jsp_soup = bs(jsp, 'html.parser')
+    resource_bundles = {url: fixture['resource_bundle'] for url in parse_efrb_urls(fixture['jsp_soup'])}
+    jsGrid = parse_jsGrid_dict(fixture['jsp_soup'])[fixture['mdcstat']]
+    div_tag = fixture['jsp_soup'].find('div', {'id': jsGrid})
+    cases.extend([
+        Case('parse_converting_map[jsp, html.parser]', parse_converting_map,
+             lambda: (jsp_soup, resource_bundles), 1),
+        Case('parse_div_map[jsp, html.parser]', parse_div_map, lambda: (div_tag,), 1),
+    ])
+    if jsp_parser.lxml is not None:
+        tree = jsp_parser.make_tree(jsp)
+        lxml_div_tag = jsp_parser.find_by_id(tree, 'div', jsGrid)
+        cases.extend([
+            Case('parse_converting_map[jsp, lxml]', jsp_parser.parse_converting_map,
+                 lambda: (tree, resource_bundles), 1),
+            Case('parse_div_map[jsp, lxml]', jsp_parser.parse_div_map, lambda: (lxml_div_tag,), 1),
+        ])
+    return cases
+
+
+def percentile(sorted_values, p):
+    index = min(len(sorted_values) - 1, int(round(p / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def measure(case, repeat=None, min_time=0.5, warmup=2):
+    """
+    repeat 이 None 이면 min_time 초 이상, 최소 5번 실행한다.
+    peak memory 는 tracemalloc 이 실행 속도를 늦추기 때문에 시간 측정과 따로 한 번 실행해서 잰다.
+    """
+    for _ in range(warmup):
+        case.func(*case.setup())
+
+    times = []
+    total = 0
+    while (len(times) < repeat) if repeat is not None else (total < min_time or len(times) < 5):
+        args = case.setup()
+        start = time.perf_counter()
+        case.func(*args)
+        elapsed = time.perf_counter() - start
+        times.append(elapsed)
+        total += elapsed
+
+    args = case.setup()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    case.func(*args)
+    peak = tracemalloc.get_traced_memory()[1] - before
+    tracemalloc.stop()
+
+    times.sort()
+    mean_time = mean(times)
+    return {
+        'rows': case.rows,
+        'source': case.source,
+        'n': len(times),
+        'mean_ms': mean_time * 1000,
+        'p50_ms': percentile(times, 50) * 1000,
+        'p90_ms': percentile(times, 90) * 1000,
+        'p99_ms': percentile(times, 99) * 1000,
+        'ops_per_s': 1 / mean_time,
+        'rows_per_s': case.rows / mean_time,
+        'peak_kib': peak / 1024,
+    }
+
+
+def run(name_filter=None, repeat=None, min_time=0.5):
+    results = {}
+    for case in make_cases():
+        if name_filter is not None and name_filter not in case.name:
+            continue
+        results[case.name] = measure(case, repeat, min_time)
+    return results
+
+
+def compare(results, baseline, time_threshold=1.25, memory_threshold=1.25, min_delta_ms=0.05):
+    """
+    :param min_delta_ms: p50 의 차이가 이보다 작으면 비율이 커도 regression 으로 보지 않는다. (수 us 단위의 측정 오차)
+    :return: {name: (p50 비율, peak memory 비율, regression 여부)}, baseline 에 없는 case 는 제외한다.
+    """
+    comparison = {}
+    for name, result in results.items():
+        base = baseline.get(name, None)
+        if base is None:
+            continue
+        time_ratio = result['p50_ms'] / base['p50_ms'] if base['p50_ms'] else 1
+        memory_ratio = result['peak_kib'] / base['peak_kib'] if base['peak_kib'] else 1
+        slower = time_ratio > time_threshold and result['p50_ms'] - base['p50_ms'] > min_delta_ms
+        comparison[name] = (time_ratio, memory_ratio, slower or memory_ratio > memory_threshold)
+    return comparison
+
+
+def load_baseline(filename=None):
+    try:
+        with open(baseline_filename if filename is None else filename, encoding='utf-8') as f:
+            return json.load(f)['results']
+    except OSError:
+        return {}
+
+
+def save_baseline(results, filename=None):
+    baseline = {
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'created_at': time.strftime('%Y%m%d'),
+        'results': results,
+    }
+    with open(baseline_filename if filename is None else filename, 'w', encoding='utf-8') as f:
+        json.dump(baseline, f, ensure_ascii=False, indent=1, sort_keys=True)
+
+
+def report(results, comparison):
+    header = f"{'case':<42}{'source':>10}{'rows':>7}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'rows/s':>13}{'peak KiB':>11}{'vs base':>16}"
+    lines = [header, '-' * len(header)]
+    for name, r in results.items():
+        line = f"{name:<42}{r['source']:>10}{r['rows']:>7}{r['p50_ms']:>10.3f}{r['p90_ms']:>10.3f}{r['p99_ms']:>10.3f}" \
+               f"{r['rows_per_s']:>13,.0f}{r['peak_kib']:>11,.1f}"
+        if name in comparison:
+            time_ratio, memory_ratio, regression = comparison[name]
+            line += f"{time_ratio:>8.2f}x {memory_ratio:>5.2f}x"
+            if regression:
+                line += '  REGRESSION'
+        lines.append(line)
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='to_DataFrame 변환 함수 벤치마크')
+    parser.add_argument('--filter', default=None, help='이름에 이 문자열이 들어간 case 만 실행한다.')
+    parser.add_argument('--repeat', type=int, default=None, help='case 별 실행 횟수, 없으면 min-time 만큼 실행한다.')
+    parser.add_argument('--min-time', type=float, default=0.5)
+    parser.add_argument('--baseline', default=None, help=f'default 값은 {baseline_filename}')
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--time-threshold', type=float, default=1.25, help='p50 이 baseline 의 몇 배를 넘으면 regression')
+    parser.add_argument('--memory-threshold', type=float, default=1.25)
+    args = parser.parse_args(argv)
+
+    results = run(args.filter, args.repeat, args.min_time)
+    if args.save_baseline:
+        baseline = load_baseline(args.baseline)
+        baseline.update(results)
+        save_baseline(baseline, args.baseline)
+        print(report(results, {}))
+        return 0
+
+    comparison = compare(results, load_baseline(args.baseline), args.time_threshold, args.memory_threshold)
+    print(report(results, comparison))
+    regressions = [name for name, (_, _, regression) in comparison.items() if regression]
+    if regressions:
+        print(f'\n{len(regressions)} regression(s): {", ".join(regressions)}')
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
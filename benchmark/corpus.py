@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""
+녹화해둔 KRX 응답(test/corpus)과 test/test_data_reader.bin 을 읽는다.
+test/krx_server.py 의 로컬 KRX 서버와 benchmark.payloads 가 함께 사용한다.
+"""
+import os
+import json
+import pickle
+import hashlib
+import threading
+
+test_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'test')
+corpus_dir = os.path.join(test_dir, 'corpus')
+json_data_path = '/comm/bldAttendant/getJsonData.cmd'
+
+
+class Corpus:
+    def __init__(self, path=None):
+        """
+        path/index.json 에 요청 별 응답 정보를, path/bodies 에 응답 내용을 저장한다.
+        index.json 의 entry 는 {method, path, params, status, content_type, body} 이다.
+        """
+        self.path = corpus_dir if path is None else path
+        self._lock = threading.Lock()
+        try:
+            with open(os.path.join(self.path, 'index.json'), encoding='utf-8') as f:
+                self.entries = json.load(f)['entries']
+        except OSError:
+            self.entries = []
+        self._index = {}
+        self._bld_index = {}
+        for entry in self.entries:
+            self._add_to_index(entry)
+
+    def find(self, method, path, params, strict=False):
+        """
+        strict 가 False 이면 getJsonData.cmd 요청은 bld 만 같아도 응답을 돌려준다.
+        날짜 등이 달라도 같은 형태의 응답이 필요한 벤치마크에서 사용한다.
+        """
+        entry = self._index.get(make_key(method, path, params), None)
+        if entry is None and not strict and path == json_data_path:
+            entry = self._bld_index.get(params.get('bld', None), None)
+        return entry
+
+    def read_body(self, entry):
+        with open(os.path.join(self.path, 'bodies', entry['body']), 'rb') as f:
+            return f.read()
+
+    def add(self, method, path, params, status, content_type, body):
+        name = hashlib.sha1(body).hexdigest()
+        os.makedirs(os.path.join(self.path, 'bodies'), exist_ok=True)
+        with open(os.path.join(self.path, 'bodies', name), 'wb') as f:
+            f.write(body)
+        entry = {
+            'method': method,
+            'path': path,
+            'params': params,
+            'status': status,
+            'content_type': content_type,
+            'body': name
+        }
+        with self._lock:
+            self.entries = [e for e in self.entries if make_key(e['method'], e['path'], e['params']) !=
+                            make_key(method, path, params)]
+            self.entries.append(entry)
+            self._add_to_index(entry)
+            self.save()
+        return entry
+
+    def save(self):
+        entries = sorted(self.entries, key=lambda e: (e['path'], json.dumps(e['params'], sort_keys=True)))
+        with open(os.path.join(self.path, 'index.json'), 'w', encoding='utf-8') as f:
+            json.dump({'entries': entries}, f, ensure_ascii=False, indent=1, sort_keys=True)
+
+    def _add_to_index(self, entry):
+        self._index[make_key(entry['method'], entry['path'], entry['params'])] = entry
+        if entry['path'] == json_data_path:
+            self._bld_index[entry['params'].get('bld', None)] = entry
+
+
+def make_key(method, path, params):
+    return method, path, json.dumps(params, sort_keys=True, ensure_ascii=False)
+
+
+def load_fixture():
+    # [15001] 전종목 시세(파생), test/test_data_reader.py 와 같은 녹화 데이터
+    with open(os.path.join(test_dir, 'test_data_reader.bin'), 'rb') as f:
+        return pickle.load(f)
@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+"""
+벤치마크에 사용하는 getJsonData.cmd 응답과 jsp.
+
+test/corpus 에 녹화된 응답이 있으면 그것을 사용하고, 없으면 같은 형식(column, 값의 표기)의 응답을 만든다.
+만든 응답은 seed 가 고정되어 있어 매번 같다. (test/krx_server.py 의 record_corpus 로 녹화할 수 있다. 녹화된 응답은 benchmark.corpus 로 읽는다.)
+"""
+import json
+import random
+from datetime import date, timedelta
+
+from benchmark.corpus import Corpus, json_data_path
+
+# [12001] 전종목 시세, MDCSTAT01501
+universe_bld = 'dbms/MDC/STAT/standard/MDCSTAT01501'
+universe_column_map = {
+    'ISU_SRT_CD': '종목코드',
+    'ISU_ABBRV': '종목명',
+    'MKT_NM': '시장구분',
+    'SECT_TP_NM': '소속부',
+    'TDD_CLSPRC': '종가',
+    'CMPPREVDD_PRC': '대비',
+    'FLUC_RT': '등락률',
+    'TDD_OPNPRC': '시가',
+    'TDD_HGPRC': '고가',
+    'TDD_LWPRC': '저가',
+    'ACC_TRDVOL': '거래량',
+    'ACC_TRDVAL': '거래대금',
+    'MKTCAP': '시가총액',
+    'LIST_SHRS': '상장주식수',
+}
+
+# [13103] ETF 개별종목 시세 추이, MDCSTAT04501
+history_bld = 'dbms/MDC/STAT/standard/MDCSTAT04501'
+history_column_map = {
+    'TRD_DD': '일자',
+    'TDD_CLSPRC': '종가',
+    'CMPPREVDD_PRC': '대비',
+    'FLUC_RT': '등락률',
+    'LST_NAV': 'NAV',
+    'TDD_OPNPRC': '시가',
+    'TDD_HGPRC': '고가',
+    'TDD_LWPRC': '저가',
+    'ACC_TRDVOL': '거래량',
+    'ACC_TRDVAL': '거래대금',
+    'MKTCAP': '시가총액',
+    'INVSTASST_NETASST_TOTAMT': '순자산총액',
+    'LIST_SHRS': '상장좌수',
+    'IDX_IND_NM': '기초지수//지수명',
+    'OBJ_STKPRC_IDX': '기초지수//종가',
+    'CMPPREVDD_IDX': '기초지수//대비',
+    'FLUC_RT_IDX': '기초지수//등락률',
+}
+
+universe_rows = 2500
+# 2016/01/04 ~ 2021/04/30, 약 5년의 영업일
+history_start = date(2016, 1, 4)
+history_end = date(2021, 4, 30)
+
+
+def number(value, digits=0):
+    return f'{value:,.{digits}f}'
+
+
+def make_universe(n_rows=universe_rows, seed=0):
+    rnd = random.Random(seed)
+    rows = []
+    for i in range(n_rows):
+        close = rnd.randint(500, 900000)
+        change = rnd.randint(-close // 10, close // 10)
+        # 거래정지 종목은 시가, 고가, 저가가 0 이고 등락률이 '-' 로 온다.
+        halted = rnd.random() < 0.01
+        volume = 0 if halted else rnd.randint(0, 50000000)
+        shares = rnd.randint(1000000, 6000000000)
+        rows.append({
+            'ISU_SRT_CD': f'{i * 7 % 999999:06d}',
+            'ISU_CD': f'KR7{i * 7 % 999999:06d}00{i % 10}',
+            'ISU_ABBRV': f'종목{i:04d}',
+            'MKT_NM': ['KOSPI', 'KOSDAQ', 'KONEX'][i % 3],
+            'SECT_TP_NM': ['', '중견기업부', '벤처기업부', '우량기업부'][i % 4],
+            'TDD_CLSPRC': number(close),
+            'FLUC_TP_CD': str(rnd.randint(1, 3)),
+            'CMPPREVDD_PRC': number(change),
+            'FLUC_RT': '-' if halted else number(change / close * 100, 2),
+            'TDD_OPNPRC': number(0 if halted else close - change),
+            'TDD_HGPRC': number(0 if halted else close + abs(change)),
+            'TDD_LWPRC': number(0 if halted else close - abs(change)),
+            'ACC_TRDVOL': number(volume),
+            'ACC_TRDVAL': number(volume * close),
+            'MKTCAP': number(close * shares),
+            'LIST_SHRS': number(shares),
+            'MKT_ID': ['STK', 'KSQ', 'KNX'][i % 3],
+        })
+    return {'OutBlock_1': rows, 'CURRENT_DATETIME': '2021.04.30 PM 06:00:00'}
+
+
+def make_history(start=history_start, end=history_end, seed=0):
+    rnd = random.Random(seed)
+    rows = []
+    close = 30000.0
+    index = 300.0
+    day = end
+    # KRX 는 최근 날짜부터 돌려준다.
+    while day >= start:
+        if day.weekday() < 5:
+            change = round(close * rnd.uniform(-0.03, 0.03), -1)
+            index_change = round(index * rnd.uniform(-0.03, 0.03), 2)
+            volume = rnd.randint(100000, 20000000)
+            rows.append({
+                'TRD_DD': day.strftime('%Y/%m/%d'),
+                'TDD_CLSPRC': number(close),
+                'FLUC_TP_CD': '1' if change > 0 else '2',
+                'CMPPREVDD_PRC': number(change),
+                'FLUC_RT': number(change / close * 100, 2),
+                'LST_NAV': number(close * 1.001, 2),
+                'TDD_OPNPRC': number(close - change),
+                'TDD_HGPRC': number(close + abs(change)),
+                'TDD_LWPRC': number(close - abs(change)),
+                'ACC_TRDVOL': number(volume),
+                'ACC_TRDVAL': number(volume * close),
+                'MKTCAP': number(close * 200000000),
+                'INVSTASST_NETASST_TOTAMT': number(close * 200100000),
+                'LIST_SHRS': number(200000000),
+                'IDX_IND_NM': '코스피 200',
+                'OBJ_STKPRC_IDX': number(index, 2),
+                'CMPPREVDD_IDX': number(index_change, 2),
+                'FLUC_RT_IDX': number(index_change / index * 100, 2),
+            })
+            close = max(close - change, 1000.0)
+            index = max(index - index_change, 10.0)
+        day -= timedelta(days=1)
+    return {'output': rows}
+
+
+def recorded_payload(bld, corpus=None):
+    # bld 의 응답 중 row 가 가장 많은 것
+    corpus = Corpus() if corpus is None else corpus
+    best = None
+    for entry in corpus.entries:
+        if entry['path'] == json_data_path and entry['params'].get('bld', None) == bld:
+            krx_data = json.loads(corpus.read_body(entry))
+            if best is None or len(list(krx_data.values())[0]) > len(list(best.values())[0]):
+                best = krx_data
+    return best
+
+
+def load_payloads():
+    """
+    :return: {name: (krx_data, column_map, source)}, krx_data 는 row 의 list 형태
+        item : 한 종목의 하루치 데이터 (1 row)
+        universe : 전종목 하루치 데이터 (2,500 row)
+        history : 한 종목의 약 5년치 일별 데이터
+    """
+    universe, universe_source = recorded_payload(universe_bld), 'recorded'
+    if universe is None:
+        universe, universe_source = make_universe(), 'synthetic'
+    history, history_source = recorded_payload(history_bld), 'recorded'
+    if history is None:
+        history, history_source = make_history(), 'synthetic'
+    block_name = list(history.keys())[0]
+    item = {block_name: history[block_name][:1]}
+    return {
+        'item': (item, dict(history_column_map), history_source),
+        'universe': (universe, dict(universe_column_map), universe_source),
+        'history': (history, dict(history_column_map), history_source),
+    }
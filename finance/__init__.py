@@ -1,5 +1,11 @@
-from finance.data_reader_ import data_reader
+from finance.data_reader_ import data_reader, data_reader_many
+from finance.cache import metadata_cache, response_cache
+from finance.symbols import symbol_master
+from finance.search_index import search
 from finance.tools import *
+from finance.adata_reader_ import adata_reader
+from finance.atools import aget, aper, aetf
 
 __version__ = '0.1'
-__all__ = ['__version__', 'data_reader', 'get', 'per', 'etf']
+__all__ = ['__version__', 'data_reader', 'data_reader_many', 'metadata_cache', 'response_cache', 'symbol_master', 'get', 'get_many', 'resolve', 'search', 'per', 'etf',
+           'adata_reader', 'aget', 'aper', 'aetf']
@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import contextvars
+
+from finance import session, metrics, symbols
+from finance.exceptions import KrxHtmlResponseError
+from finance.cache import metadata_cache, response_cache, resource_bundle_cache
+from finance.data_reader_ import parse_mdcstat, jsp_url, parse_jsp, parse_efrb_urls, parse_metadata, \
+    parse_resource_bundle, parse_efrb_key, apply_converting_map, krx_data_url, decode_krx_columns, \
+    split_requested_data, merge_krx_data, lookup_metadata, make_flight_key
+from finance.get_requested_data import get_requested_data, autocomplete_type
+from finance.statistics.basic.info import Info
+from finance.to_DataFrame import to_DataFrame
+from finance.to_Table import to_Table, check_output, copy as copy_output
+
+
+async def adata_reader(code, start=None, end=None, day=None, division=None, item=None, compact=False,
+                       output='pandas', **kwargs):
+    """
+    data_reader 의 asyncio 버전. autocomplete, jsp, resource bundle, getJsonData.cmd 요청을
+    event loop 를 막지 않고 보낸다. aiohttp 가 필요하다.
+    """
+    with metrics.record(code) as m:
+        # 같은 요청이 동시에 들어오면 먼저 들어온 요청의 Task 를 함께 기다리고, 결과의 복사본을 받는다.
+        check_output(output, compact)
+        flight_key = make_flight_key(code, start, end, day, division, item,
+                                     dict(kwargs, compact=compact, output=output))
+        task_key = (asyncio.get_running_loop(), flight_key)
+        task = _data_reader_tasks.get(task_key, None)
+        leader = task is None
+        if leader:
+            task = asyncio.ensure_future(aread_data(code, start, end, day, division, item, compact, output, **kwargs))
+            _data_reader_tasks[task_key] = task
+            task.add_done_callback(lambda _: _data_reader_tasks.pop(task_key, None))
+        metrics.count_cache('single_flight', not leader)
+        data = await asyncio.shield(task)
+        if not leader:
+            data = copy_output(data)
+        m.rows = len(data)
+        return data
+
+
+# 실행 중인 adata_reader 의 asyncio.Task
+_data_reader_tasks = {}
+
+
+async def aread_data(code, start=None, end=None, day=None, division=None, item=None, compact=False,
+                     output='pandas', **kwargs):
+    # 종목명은 먼저 비동기로 찾아서 Info.autocomplete_cache 에 넣어둔다.
+    # 그러면 get_requested_data 안의 autocomplete 는 네트워크 요청 없이 끝난다.
+    item_type = autocomplete_type(code)
+    if kwargs.get('item_code', None) and item_type in item_code_types:
+        # 종목코드는 여기서 종목명으로 바꿔서 get_requested_data 가 종목 목록을 받지 않게 한다.
+        item = await aconvert_item_code(kwargs['item_code'], item_type)
+        kwargs = {key: value for key, value in kwargs.items() if key != 'item_code'}
+    if item is not None and item_type is not None:
+        await Info(None, None, None).aautocomplete(item, item_type)
+    with metrics.stage('get_requested_data'):
+        requested_data = get_requested_data(code, start, end, day, division, item, **kwargs)
+    mdcstat = parse_mdcstat(requested_data)
+    with metrics.stage('get_metadata'):
+        converting_map, readable_columns = await aget_metadata(mdcstat)
+    with metrics.stage('apply_converting_map'):
+        valid_requested_data = apply_converting_map(converting_map, requested_data)
+    chunked_requested_data = split_requested_data(valid_requested_data)
+    with metrics.stage('get_krx_data'):
+        if len(chunked_requested_data) == 1:
+            krx_data = await aget_krx_data(valid_requested_data)
+        else:
+            krx_data = merge_krx_data(await asyncio.gather(*map(aget_krx_data, chunked_requested_data)))
+
+    with metrics.stage('to_DataFrame'):
+        if output != 'pandas':
+            return to_Table(krx_data, readable_columns, output)
+        return to_DataFrame(krx_data, readable_columns, compact)
+
+
+# item_code 를 받는 class(Stock, Product)의 autocomplete item_type
+item_code_types = ['stock', 'ETF', 'ETN', 'ELW']
+
+
+async def aconvert_item_code(item_code, item_type):
+    # Stock.convert_code_to_name, Product.convert_code_to_item 의 asyncio 버전.
+    # 종목 목록을 받거나 다시 받을 때는 네트워크 요청이 있으므로 thread 에서 실행한다.
+    symbol = await asyncio.get_running_loop().run_in_executor(
+        None, contextvars.copy_context().run, symbols.lookup, item_code, item_type)
+    if symbol is None:
+        raise AttributeError(f'{item_code} is Wrong code as a {item_type} code')
+    return symbol[0]
+
+
+async def aget_metadata(mdcstat):
+    metadata = lookup_metadata(mdcstat)
+    if metadata is not None:
+        return metadata
+    document = parse_jsp(await session.async_get(jsp_url(mdcstat)))
+    # resource bundle 들은 한꺼번에 요청한다.
+    efrb_urls = list(dict.fromkeys(parse_efrb_urls(document)))
+    bundles = await asyncio.gather(*[aget_resource_bundle(efrb_url) for efrb_url in efrb_urls])
+    resource_bundles = dict(zip(efrb_urls, bundles))
+
+    converting_map, readable_columns = parse_metadata(document, mdcstat, resource_bundles)
+    metadata_cache.set(mdcstat, converting_map, readable_columns)
+    return converting_map, readable_columns
+
+
+# 받아오는 중인 resource bundle 의 asyncio.Task, 동시에 들어온 같은 요청은 이 Task 를 함께 기다린다.
+_resource_bundle_tasks = {}
+
+
+async def aget_resource_bundle(efrb_url):
+    key = parse_efrb_key(efrb_url)
+    resource_bundle = resource_bundle_cache.get(key)
+    metrics.count_cache('resource_bundle', resource_bundle is not None)
+    if resource_bundle is not None:
+        return dict(resource_bundle)
+    task_key = (asyncio.get_running_loop(), key)
+    task = _resource_bundle_tasks.get(task_key, None)
+    if task is None:
+        task = asyncio.ensure_future(session.async_get(efrb_url))
+        _resource_bundle_tasks[task_key] = task
+        task.add_done_callback(lambda _: _resource_bundle_tasks.pop(task_key, None))
+    resource_bundle = parse_resource_bundle(await asyncio.shield(task))
+    resource_bundle_cache.set(key, resource_bundle)
+    return dict(resource_bundle)
+
+
+async def aget_krx_data(requested_data):
+    krx_data = response_cache.get(requested_data, columnar=True)
+    metrics.count_cache('response', krx_data is not None)
+    if krx_data is not None:
+        return krx_data
+    krx_data = await session.async_call_with_retry(afetch_krx_data, requested_data, retry_on=KrxHtmlResponseError)
+    response_cache.set(requested_data, krx_data, columnar=True)
+    return krx_data
+
+
+async def afetch_krx_data(requested_data):
+    content = await session.async_post(krx_data_url, data=requested_data)
+    return decode_krx_columns(content, requested_data)
@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+from finance.adata_reader_ import adata_reader
+from finance import utils
+from finance.to_Table import replace_substring
+from finance.log.log import Log
+
+# finance.tools 의 asyncio 버전. 사용법과 반환값은 같다.
+
+
+@Log.info
+async def aget(stock="all", start=None, end=None, output='pandas'):
+    """ finance.get 의 asyncio 버전 """
+    utils.start_end_validation(start, end)
+    if stock == "all":
+        return await adata_reader("12001", market="전체", day=start, output=output)
+    else:
+        if utils.classifier(stock) == "item code":
+            return await adata_reader("12003", start=start, end=end, item_code=stock, output=output)
+        else:
+            return await adata_reader("12003", start=start, end=end, item=stock, output=output)
+
+
+@Log.info
+async def aper(stock="all", start=None, end=None, output='pandas'):
+    """ finance.per 의 asyncio 버전 """
+    utils.start_end_validation(start, end)
+    if stock == "all":
+        data = await adata_reader("12021", search_type="전종목", market="전체", day=start, output=output)
+        #  12021 종목명 데이터에 아래와 같은 문자열이 함께 출력됨.
+        return replace_substring(data, "종목명", "<em class =\"up\"></em>")
+    else:
+        if utils.classifier(stock) == "item code":
+            return await adata_reader("12021", search_type="개별추이", item_code=stock, start=start, end=end, output=output)
+        else:
+            return await adata_reader("12021", search_type="개별추이", item=stock, start=start, end=end, output=output)
+
+
+@Log.info
+async def aetf(item="all", start=None, end=None, output='pandas'):
+    """ finance.etf 의 asyncio 버전 """
+    utils.start_end_validation(start, end)
+    if item == "all":
+        return await adata_reader("13101", output=output)
+    else:
+        if utils.classifier(item) == "item code":
+            return await adata_reader("13103", item_code=item, start=start, end=end, output=output)
+        else:
+            return await adata_reader("13103", item=item, start=start, end=end, output=output)
@@ -0,0 +1,311 @@
+# -*- coding: utf-8 -*-
+import os
+import copy
+import json
+import time
+import pickle
+import hashlib
+import threading
+from datetime import datetime
+from collections import OrderedDict
+
+from finance.json_decoder import n_rows
+
+
+def default_cache_dir():
+    # FINANCE_CACHE_DIR 환경변수로 캐시 경로를 바꿀 수 있다.
+    default = os.path.join(os.path.expanduser('~'), '.cache', 'finance')
+    return os.environ.get('FINANCE_CACHE_DIR', default)
+
+
+class MetadataCache:
+    def __init__(self, path=None, ttl=60 * 60 * 24 * 7):
+        """ MDCSTAT 별 converting_map, readable_columns 를 디스크에 저장한다.
+        :param path: 저장 경로, default 값은 default_cache_dir()/metadata
+        :param ttl: 유효 시간(초), None 이면 만료되지 않는다.
+        """
+        self.path = os.path.join(default_cache_dir(), 'metadata') if path is None else path
+        self.ttl = ttl
+        self.enabled = True
+        self._memory = {}
+        self._lock = threading.Lock()
+
+    def get(self, mdcstat):
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._memory.get(mdcstat)
+        if entry is None:
+            entry = self._read(mdcstat)
+            if entry is None:
+                return None
+            with self._lock:
+                self._memory[mdcstat] = entry
+        if self._expired(entry):
+            self.invalidate(mdcstat)
+            return None
+        # to_DataFrame 이 column_map 을 수정하기 때문에 복사본을 돌려준다.
+        return copy.deepcopy(entry['converting_map']), copy.deepcopy(entry['readable_columns'])
+
+    def set(self, mdcstat, converting_map, readable_columns):
+        if not self.enabled:
+            return
+        entry = {
+            'saved_at': time.time(),
+            'converting_map': copy.deepcopy(converting_map),
+            'readable_columns': copy.deepcopy(readable_columns)
+        }
+        with self._lock:
+            self._memory[mdcstat] = entry
+        self._write(mdcstat, entry)
+
+    def invalidate(self, mdcstat=None):
+        """ mdcstat 이 None 이면 전부 지운다. """
+        with self._lock:
+            if mdcstat is None:
+                self._memory.clear()
+            else:
+                self._memory.pop(mdcstat, None)
+        if not os.path.isdir(self.path):
+            return
+        filenames = os.listdir(self.path) if mdcstat is None else [f'{mdcstat}.json']
+        for filename in filenames:
+            try:
+                os.remove(os.path.join(self.path, filename))
+            except OSError:
+                pass
+
+    def _expired(self, entry):
+        if self.ttl is None:
+            return False
+        return time.time() - entry['saved_at'] > self.ttl
+
+    def _read(self, mdcstat):
+        try:
+            with open(os.path.join(self.path, f'{mdcstat}.json'), encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write(self, mdcstat, entry):
+        content = json.dumps(entry, ensure_ascii=False).encode('utf-8')
+        write_file(os.path.join(self.path, f'{mdcstat}.json'), content)
+
+
+class ResponseCache:
+    def __init__(self, path=None, ttl=60, max_memory_entries=256, max_disk_entries=10000):
+        """ get_krx_data 의 결과를 requested_data 별로 메모리와 디스크에 저장한다.
+        종료일(endDd, trdDd, endYymm)이 오늘 이전인 요청은 바뀌지 않으므로 만료되지 않는다.
+        오늘이 포함된 요청과 데이터가 없는 응답은 ttl 이 지나면 만료된다.
+        :param path: 저장 경로, default 값은 default_cache_dir()/responses
+        :param ttl: 오늘이 포함된 요청의 유효 시간(초)
+        :param max_memory_entries: 메모리에 저장할 최대 개수, 넘으면 가장 오래 안 쓴 것부터 지운다.
+        :param max_disk_entries: 디스크에 저장할 최대 개수, 넘으면 가장 오래 안 쓴 것부터 지운다.
+        """
+        self.path = os.path.join(default_cache_dir(), 'responses') if path is None else path
+        self.ttl = ttl
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+        self.enabled = True
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, requested_data, columnar=False):
+        """ 저장된 값은 복사하지 않고 그대로 돌려주므로 수정해서는 안된다.
+        columnar 는 krx_data 의 형태(json_decoder 참고)이며, 형태 별로 따로 저장된다.
+        """
+        if not self.enabled:
+            return None
+        key = self.make_key(requested_data, columnar)
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+        if entry is None:
+            entry = self._read(key)
+            if entry is None:
+                return None
+            self._remember(key, entry)
+        if entry['expires_at'] is not None and entry['expires_at'] < time.time():
+            self.invalidate(requested_data)
+            return None
+        return entry['data']
+
+    def set(self, requested_data, krx_data, columnar=False):
+        if not self.enabled:
+            return
+        key = self.make_key(requested_data, columnar)
+        # 데이터가 없는 응답은 인자가 잘못되었거나 KRX 에 일시적인 문제가 있는 경우일 수 있으므로 오래 저장하지 않는다.
+        permanent = is_historical(requested_data) and not is_empty(krx_data)
+        expires_at = None if permanent else time.time() + self.ttl
+        entry = {'expires_at': expires_at, 'data': krx_data}
+        self._remember(key, entry)
+        if expires_at is None:
+            # 금방 만료되는 값은 디스크에 저장하지 않는다.
+            write_file(os.path.join(self.path, key), pickle.dumps(entry, pickle.HIGHEST_PROTOCOL))
+            self._evict_disk()
+
+    def invalidate(self, requested_data=None):
+        """ requested_data 가 None 이면 전부 지운다. """
+        keys = None if requested_data is None else [self.make_key(requested_data, c) for c in [False, True]]
+        with self._lock:
+            if keys is None:
+                self._memory.clear()
+            else:
+                for key in keys:
+                    self._memory.pop(key, None)
+        if not os.path.isdir(self.path):
+            return
+        for key in os.listdir(self.path) if keys is None else keys:
+            try:
+                os.remove(os.path.join(self.path, key))
+            except OSError:
+                pass
+
+    @staticmethod
+    def make_key(requested_data, columnar=False):
+        canonical = json.dumps(requested_data, sort_keys=True, ensure_ascii=False, default=str)
+        key = hashlib.sha1(canonical.encode('utf-8')).hexdigest()
+        return f'{key}.columnar' if columnar else key
+
+    def _remember(self, key, entry):
+        with self._lock:
+            self._memory[key] = entry
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_memory_entries:
+                self._memory.popitem(last=False)
+
+    def _read(self, key):
+        filename = os.path.join(self.path, key)
+        try:
+            with open(filename, 'rb') as f:
+                entry = pickle.load(f)
+            # 디스크의 LRU 순서는 파일 수정 시간으로 관리한다.
+            os.utime(filename)
+            return entry
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None
+
+    def _evict_disk(self):
+        try:
+            filenames = [os.path.join(self.path, f) for f in os.listdir(self.path) if not f.endswith('.tmp')]
+            if len(filenames) <= self.max_disk_entries:
+                return
+            filenames.sort(key=os.path.getmtime)
+            for filename in filenames[:len(filenames) - self.max_disk_entries]:
+                os.remove(filename)
+        except OSError:
+            pass
+
+
+class TTLCache:
+    def __init__(self, ttl, max_entries=1024):
+        """ 메모리에만 저장하는 캐시. ttl 초가 지나면 만료되고, max_entries 를 넘으면 가장 오래 안 쓴 것부터 지운다. """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.enabled = True
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.time():
+                self._memory.pop(key)
+                return None
+            self._memory.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, value):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._memory[key] = (time.time() + self.ttl, value)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def invalidate(self, key=None):
+        with self._lock:
+            if key is None:
+                self._memory.clear()
+            else:
+                self._memory.pop(key, None)
+
+
+class SingleFlight:
+    """ 같은 key 로 동시에 들어온 호출은 먼저 들어온 호출 하나만 실행하고, 나머지는 그 결과를 함께 받는다. """
+    def __init__(self, copy=None):
+        """
+        :param copy: 결과를 기다린 호출에 결과 대신 copy(결과)를 돌려준다. 결과를 수정해도 서로 영향이 없게 할 때 사용한다.
+        """
+        self.copy = copy
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, func, *args, **kwargs):
+        with self._lock:
+            call = self._calls.get(key, None)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result if self.copy is None else self.copy(call.result)
+
+        try:
+            call.result = func(*args, **kwargs)
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+def is_historical(requested_data):
+    # 조회 기간의 마지막 날이 오늘 이전이면 KRX 데이터가 더 이상 바뀌지 않는다.
+    today = datetime.now().strftime('%Y%m%d')
+    for key in ['endDd', 'trdDd']:
+        if requested_data.get(key):
+            return str(requested_data[key]) < today
+    if requested_data.get('endYymm'):
+        return str(requested_data['endYymm']) < today[:6]
+    return False
+
+
+def is_empty(krx_data):
+    return not krx_data or n_rows(list(krx_data.values())[0]) == 0
+
+
+def write_file(filename, content):
+    # 캐시 저장에 실패해도 데이터 요청은 계속 되어야 한다.
+    try:
+        os.makedirs(os.path.dirname(filename), exist_ok=True)
+        tmp_filename = f'{filename}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(tmp_filename, 'wb') as f:
+            f.write(content)
+        os.replace(tmp_filename, filename)
+    except OSError:
+        pass
+
+
+metadata_cache = MetadataCache()
+response_cache = ResponseCache()
+# (baseName, key, type) 별 executeForResourceBundle.cmd 결과
+resource_bundle_cache = TTLCache(ttl=60 * 60 * 24)
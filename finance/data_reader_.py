@@ -1,28 +1,205 @@
+import io
 import re
 import json
-import requests
 import logging
+import contextvars
+from urllib.parse import urlparse, parse_qs
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
 
 from bs4 import BeautifulSoup as bs
 
+from finance import session, jsp_parser, registry, metrics
+from finance.cache import metadata_cache, response_cache, resource_bundle_cache, SingleFlight
+from finance.exceptions import KrxHtmlResponseError
+from finance.json_decoder import decode_columns, is_columnar, PrependedStream
 from finance.to_DataFrame import to_DataFrame
+from finance.to_Table import to_Table, check_output, copy as copy_output
 from finance.get_requested_data import get_requested_data
 
 
-def data_reader(code, start=None, end=None, day=None, division=None,  item=None, **kwargs):
-    requested_data = get_requested_data(code, start, end, day, division, item, **kwargs)
-    # jsp_soup는 MDCSTAT044.jsp 의 소스 코드다.
-    # readable_column, conveted_requested_data 를 얻기에 필요하다.
+def data_reader(code, start=None, end=None, day=None, division=None,  item=None, compact=False, output='pandas',
+                **kwargs):
+    """
+    compact 가 True 또는 'float32' 이면 메모리를 적게 쓰는 dtype 으로 바꿔서 돌려준다. (to_DataFrame.compact_DataFrame 참고)
+    compact 는 output='pandas' 에서만 사용할 수 있다.
+    output 이 'arrow' 이면 pyarrow.Table, 'polars' 이면 polars.DataFrame 을 돌려준다. (to_Table 참고)
+    """
+    check_output(output, compact)
+    # 단계별 시간, HTTP 요청 수 등은 finance.metrics 에 기록된다.
+    with metrics.record(code) as m:
+        # 같은 요청이 동시에 들어오면 먼저 들어온 요청만 KRX 에 보내고, 나머지는 그 결과의 복사본을 받는다.
+        leader = []
+
+        def read():
+            leader.append(True)
+            return read_data(code, start, end, day, division, item, compact, output, **kwargs)
+        key = make_flight_key(code, start, end, day, division, item, dict(kwargs, compact=compact, output=output))
+        data = data_reader_flight.do(key, read)
+        metrics.count_cache('single_flight', not leader)
+        m.rows = len(data)
+        return data
+
+
+data_reader_flight = SingleFlight(copy=copy_output)
+
+
+def make_flight_key(code, start, end, day, division, item, kwargs):
+    params = {'start': start, 'end': end, 'day': day, 'division': division, 'item': item}
+    params.update(kwargs)
+    return code, json.dumps(params, sort_keys=True, ensure_ascii=False, default=str)
+
+
+def read_data(code, start=None, end=None, day=None, division=None,  item=None, compact=False, output='pandas',
+              **kwargs):
+    with metrics.stage('get_requested_data'):
+        requested_data = get_requested_data(code, start, end, day, division, item, **kwargs)
     mdcstat = parse_mdcstat(requested_data)
-    jsp_soup = get_jsp_soup(mdcstat)
+    with metrics.stage('get_metadata'):
+        converting_map, readable_columns = get_metadata(mdcstat)
     # requested_data는 data.krx로 requests.post 되기 부적합하다. 유효한 형태로 전환해 주어야 한다.
     # ex) '전체' -> 'ALL' , '주식 선물' -> 'KRDRVFUEQU'
-    valid_requested_data = convert_valid_requested_data(jsp_soup, requested_data)
-
-    readable_columns = get_readable_columns(jsp_soup, mdcstat)
-    krx_data = get_krx_data(valid_requested_data)
-
-    return to_DataFrame(krx_data, readable_columns)
+    with metrics.stage('apply_converting_map'):
+        valid_requested_data = apply_converting_map(converting_map, requested_data)
+    # 조회 기간이 긴 요청은 나누어서 동시에 받은 뒤 합친다.
+    # 응답은 row dict 를 만들지 않고 column 별 list 로 읽는다.
+    chunked_requested_data = split_requested_data(valid_requested_data)
+    with metrics.stage('get_krx_data'):
+        if len(chunked_requested_data) == 1:
+            krx_data = get_krx_data(valid_requested_data, columnar=True)
+        else:
+            with ThreadPoolExecutor(max_workers=min(len(chunked_requested_data), chunk_workers)) as executor:
+                # thread 에서도 같은 metrics 에 기록되도록 context 를 복사해서 실행한다.
+                futures = [executor.submit(contextvars.copy_context().run, get_krx_data, chunk, columnar=True)
+                           for chunk in chunked_requested_data]
+                krx_data_list = [future.result() for future in futures]
+            krx_data = merge_krx_data(krx_data_list)
+
+    with metrics.stage('to_DataFrame'):
+        if output != 'pandas':
+            return to_Table(krx_data, readable_columns, output)
+        return to_DataFrame(krx_data, readable_columns, compact)
+
+
+# 한 번에 조회할 수 있는 기간(일)이 제한된 일별 추이 MDCSTAT.
+# 나누어 받은 결과는 일자(TRD_DD)로 이어 붙이므로, 기간 전체의 합계를 돌려주는 MDCSTAT(12008 의 기간합계 02201,
+# 상세보기 02203 등)은 넣으면 안된다.
+chunk_days = {
+    'MDCSTAT00301': 730,    # [11003] 개별지수 시세 추이
+    'MDCSTAT01701': 730,    # [12003] 개별종목 시세 추이
+    'MDCSTAT02202': 365,    # [12008] 투자자별 거래실적 일별추이
+}
+# 나누어진 요청을 동시에 보낼 thread 수
+chunk_workers = 4
+
+
+def split_requested_data(requested_data):
+    # strtDd ~ endDd 를 chunk_days[MDCSTAT] 일 단위로 나눈다. KRX 와 같이 최근 기간이 먼저 온다.
+    days = chunk_days.get(parse_mdcstat(requested_data), None)
+    if days is None or not requested_data.get('strtDd') or not requested_data.get('endDd'):
+        return [requested_data]
+    chunks = []
+    for start, end in split_date_range(requested_data['strtDd'], requested_data['endDd'], days):
+        chunk = dict(requested_data)
+        chunk['strtDd'] = start
+        chunk['endDd'] = end
+        chunks.append(chunk)
+    return chunks
+
+
+def split_date_range(start, end, days):
+    start = datetime.strptime(str(start), '%Y%m%d')
+    end = datetime.strptime(str(end), '%Y%m%d')
+    date_range = []
+    while end >= start:
+        chunk_start = max(start, end - timedelta(days=days - 1))
+        date_range.append((chunk_start.strftime('%Y%m%d'), end.strftime('%Y%m%d')))
+        end = chunk_start - timedelta(days=1)
+    return date_range
+
+
+def merge_krx_data(krx_data_list):
+    # 나누어 받은 krx_data 들의 row 를 순서대로 이어 붙이고, 같은 일자(TRD_DD)의 row 는 하나만 남긴다.
+    block_name = list(krx_data_list[0].keys())[0]
+    if is_columnar(krx_data_list[0][block_name]):
+        return merge_krx_columns(krx_data_list)
+    rows = []
+    seen = set()
+    for krx_data in krx_data_list:
+        for row in list(krx_data.values())[0]:
+            key = row.get('TRD_DD', None)
+            if key is not None:
+                if key in seen:
+                    continue
+                seen.add(key)
+            rows.append(row)
+    merged = dict(krx_data_list[0])
+    merged[block_name] = rows
+    return merged
+
+
+def merge_krx_columns(krx_data_list):
+    block_name = list(krx_data_list[0].keys())[0]
+    columns = {}
+    seen = set()
+    n_rows = 0
+    for krx_data in krx_data_list:
+        block = list(krx_data.values())[0]
+        if not block:
+            continue
+        block_rows = len(next(iter(block.values())))
+        dates = block.get('TRD_DD', [None] * block_rows)
+        keep = []
+        for i, date in enumerate(dates):
+            if date is not None:
+                if date in seen:
+                    continue
+                seen.add(date)
+            keep.append(i)
+        for column, values in block.items():
+            merged = columns.setdefault(column, [None] * n_rows)
+            merged.extend(values[i] for i in keep)
+        n_rows += len(keep)
+        for merged in columns.values():
+            merged.extend([None] * (n_rows - len(merged)))
+    merged = dict(krx_data_list[0])
+    merged[block_name] = columns
+    return merged
+
+
+def data_reader_many(requests, max_workers=8):
+    """
+    여러 개의 data_reader 요청을 thread pool 에서 동시에 실행한다.
+    Parameters
+    ----------
+    requests : list
+        (function code, kwargs) 또는 function code 의 list
+        ex) [('12003', {'item': '삼성전자', 'start': 20210101}), '12001']
+    max_workers : int
+        동시에 실행할 요청 수, finance.session 의 pool_size 보다 크지 않게 잡는다.
+
+    Returns : list
+        requests 와 같은 순서의 결과. 실패한 요청의 자리에는 발생한 Exception 이 들어간다.
+    -------
+    """
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = []
+        for request in requests:
+            if isinstance(request, str):
+                code, kwargs = request, {}
+            else:
+                code, kwargs = request
+            # 요청마다 context 를 복사해서 GettingDataNm 의 종목명이 다른 요청으로 넘어가지 않게 한다.
+            context = contextvars.copy_context()
+            futures.append(executor.submit(context.run, data_reader, code, **kwargs))
+
+    results = []
+    for future in futures:
+        try:
+            results.append(future.result())
+        except Exception as e:
+            results.append(e)
+    return results
 
 
 def parse_mdcstat(requested_data):
@@ -31,19 +208,65 @@ def parse_mdcstat(requested_data):
     return mdcstat
 
 
+def get_metadata(mdcstat):
+    # jsp_soup는 MDCSTAT044.jsp 의 소스 코드다.
+    # converting_map, readable_columns 를 얻기에 필요하다.
+    # jsp_soup 를 받아 파싱하는 작업은 느리기 때문에 결과를 metadata_cache 에 저장해 둔다.
+    # 패키지에 포함된 registry 에 있는 MDCSTAT 은 jsp 를 받지 않는다.
+    metadata = lookup_metadata(mdcstat)
+    if metadata is not None:
+        return metadata
+    html = session.get(jsp_url(mdcstat))
+    converting_map, readable_columns = parse_metadata(parse_jsp(html.content), mdcstat)
+    metadata_cache.set(mdcstat, converting_map, readable_columns)
+    return converting_map, readable_columns
+
+
+def lookup_metadata(mdcstat):
+    metadata = metadata_cache.get(mdcstat)
+    metrics.count_cache('metadata', metadata is not None)
+    if metadata is None:
+        metadata = registry.lookup(mdcstat)
+        metrics.count_cache('registry', metadata is not None)
+    return metadata
+
+
+def parse_jsp(content):
+    # jsp_parser.backend 에 따라 lxml tree 또는 BeautifulSoup 을 만든다.
+    if jsp_parser.backend == 'lxml':
+        return jsp_parser.make_tree(content)
+    return bs(content, 'html.parser')
+
+
+def parse_metadata(document, mdcstat, resource_bundles=None):
+    if isinstance(document, bs):
+        converting_map = parse_converting_map(document, resource_bundles)
+        readable_columns = get_readable_columns(document, mdcstat)
+    else:
+        converting_map = jsp_parser.parse_converting_map(document, resource_bundles, get_resource_bundle)
+        readable_columns = jsp_parser.get_readable_columns(document, mdcstat)
+    return remove_len_zero(converting_map), readable_columns
+
+
 def get_jsp_soup(mdcstat):
-    jsp_filename = mdcstat[:-2]
-    url = f'http://data.krx.co.kr/contents/MDC/STAT/standard/{jsp_filename}.jsp'
     # TODO: Consider whether it is needed that checking status_code is 200 or not.
-    html = requests.get(url)
+    html = session.get(jsp_url(mdcstat))
     jsp_soup = bs(html.content, 'html.parser')
     return jsp_soup
 
 
+def jsp_url(mdcstat):
+    jsp_filename = mdcstat[:-2]
+    return f'http://data.krx.co.kr/contents/MDC/STAT/standard/{jsp_filename}.jsp'
+
+
 def convert_valid_requested_data(jsp_soup, requested_data):
     converting_map = parse_converting_map(jsp_soup)
     converting_map = remove_len_zero(converting_map)
+    return apply_converting_map(converting_map, requested_data)
 
+
+def apply_converting_map(converting_map, requested_data):
     for key in requested_data.keys():
         converting_by_key = converting_map.get(key, None)
         if converting_by_key is not None:
@@ -53,8 +276,9 @@ def convert_valid_requested_data(jsp_soup, requested_data):
     return requested_data
 
 
-def parse_converting_map(jsp_soup):
+def parse_converting_map(jsp_soup, resource_bundles=None):
     # 총 3개의 tag(select, label, input)에서 필요한 정보를 추출한다.
+    # resource_bundles 는 미리 받아둔 {efrb_url: resource_bundle}, None 이면 그때그때 받아온다.
     select = jsp_soup.find_all('select')
     label = jsp_soup.find_all('label')
     input_ = jsp_soup.find_all('input')
@@ -71,11 +295,12 @@ def parse_converting_map(jsp_soup):
                 inner[text] = i.attrs.get('value', None)
 
     for select_tag in select:
-        # TODO: 아래의 if 문이 hard coding 으로 작성되어 있다.
-        #  리스트를 사용하기 보다 어떤 경우에 execute_for_resource_bundle 을 사용하는지 알아내라.
-        if select_tag.attrs.get('name', None) in ['bndClssCd', 'isurCd', 'idxIndCd', 'prodId', 'isuCd', 'selecbox', 'invstTpCd']: # [14021], [15001], [15007]
+        if select_tag.attrs.get('name', None) in jsp_parser.resource_bundle_select_names:
             efrb_url = parse_efrb_url(select_tag)
-            result = get_resource_bundle(efrb_url)
+            if resource_bundles is None:
+                result = get_resource_bundle(efrb_url)
+            else:
+                result = resource_bundles[efrb_url]
             converting_map[select_tag.attrs['name']] = result
         elif select_tag.find_all('option') != '':
             dic = {}
@@ -97,12 +322,35 @@ def remove_len_zero(converting_map):
     return converting_map
 
 
+resource_bundle_flight = SingleFlight()
+
+
 # Getting bundle from ExecuteForResourceBundle.cmd
 # in order to make readable map
 def get_resource_bundle(efrb_url):
-    html = requests.get(efrb_url)
-    soup = bs(html.content, 'html.parser')
-    the = json.loads(str(soup))
+    # 여러 function code 가 같은 resource bundle 을 사용한다. (baseName, key, type) 별로 저장해 두고,
+    # 동시에 들어온 같은 요청은 한 번만 보낸다.
+    key = parse_efrb_key(efrb_url)
+    resource_bundle = resource_bundle_cache.get(key)
+    metrics.count_cache('resource_bundle', resource_bundle is not None)
+    if resource_bundle is None:
+        resource_bundle = resource_bundle_flight.do(key, fetch_resource_bundle, efrb_url)
+        resource_bundle_cache.set(key, resource_bundle)
+    return dict(resource_bundle)
+
+
+def fetch_resource_bundle(efrb_url):
+    html = session.get(efrb_url)
+    return parse_resource_bundle(html.content)
+
+
+def parse_efrb_key(efrb_url):
+    query = parse_qs(urlparse(efrb_url).query)
+    return tuple(query.get(name, [None])[0] for name in ['baseName', 'key', 'type'])
+
+
+def parse_resource_bundle(content):
+    the = json.loads(content)
     new = the['result']['output']
     result = {}
     for n in new:
@@ -110,16 +358,19 @@ def get_resource_bundle(efrb_url):
     return result
 
 
+def parse_efrb_urls(document):
+    # parse_converting_map 에서 받아와야 하는 resource bundle 의 url 목록
+    if not isinstance(document, bs):
+        return jsp_parser.parse_efrb_urls(document)
+    efrb_urls = []
+    for select_tag in document.find_all('select'):
+        if select_tag.attrs.get('name', None) in jsp_parser.resource_bundle_select_names:
+            efrb_urls.append(parse_efrb_url(select_tag))
+    return efrb_urls
+
+
 def parse_efrb_url(select_tag):
-    queries = str(select_tag.next.next).split('baseName:')[1].split('}')[0]
-    for e in queries.split('\''):
-        if 'krx' in e:
-            baseName = e
-        elif 'bld' in e:
-            key = e
-    market = 'kospi'
-    efrb_url = f'http://data.krx.co.kr/comm/bldAttendant/executeForResourceBundle.cmd?baseName={baseName}&key={key}&type={market}'
-    return efrb_url
+    return jsp_parser.make_efrb_url(str(select_tag.next.next))
 
 
 def get_readable_columns(jsp_soup, mdcstat):
@@ -200,21 +451,73 @@ def parse_div_map(div_tag):
     return div_map
 
 
-def get_krx_data(requested_data):
-    headers = {
-        'User-Agent':
-            'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/'
-            '605.1.15 (KHTML, like Gecko) Version/14.0.2 Safari/605.1.15'
-            }
-    url = 'http://data.krx.co.kr/comm/bldAttendant/getJsonData.cmd'
-    r = requests.post(url, data=requested_data, headers=headers)
+krx_data_url = 'http://data.krx.co.kr/comm/bldAttendant/getJsonData.cmd'
 
-    try:
-        krx_data = json.loads(r.content)
-    except json.JSONDecodeError as e:
-        logger = logging.getLogger('log')
-        logger.info(f'\tdata:\t{requested_data}\n'
-                    f'error:\t{e}\n'
-                    f'status code:\t{r.status_code}'
-                    f'response:\t{r}')
+
+def get_krx_data(requested_data, columnar=False):
+    """
+    columnar 가 True 이면 data block 을 row 의 list 가 아닌 {column: [values]} 로 돌려준다.
+    응답을 내려받으면서 바로 column 으로 변환하므로 row dict 를 만들지 않는다. (json_decoder 참고)
+    5xx, 연결 오류는 session 에서, JSON 대신 HTML 이 온 경우는 여기서 다시 요청한다.
+    """
+    krx_data = response_cache.get(requested_data, columnar)
+    metrics.count_cache('response', krx_data is not None)
+    if krx_data is not None:
+        return krx_data
+    krx_data = session.call_with_retry(fetch_krx_data, requested_data, columnar, retry_on=KrxHtmlResponseError)
+    response_cache.set(requested_data, krx_data, columnar)
     return krx_data
+
+
+def fetch_krx_data(requested_data, columnar=False):
+    if columnar:
+        # body 를 읽는 중에 연결이 끊겨도 session 에서 다시 요청하도록 읽는 것까지 session 에 맡긴다.
+        return session.post(krx_data_url, data=requested_data, stream=True,
+                            read=lambda r: read_krx_columns(r, requested_data))
+    r = session.post(krx_data_url, data=requested_data)
+    return decode_krx_data(r.content, requested_data, r.status_code)
+
+
+def read_krx_columns(r, requested_data):
+    r.raw.decode_content = True
+    krx_data = decode_krx_columns(r.raw, requested_data, r.status_code)
+    # 압축된 상태로 받은 bytes
+    metrics.count_bytes(r.raw.tell())
+    return krx_data
+
+
+def decode_krx_columns(content, requested_data, status_code=None):
+    if isinstance(content, bytes):
+        content = io.BytesIO(content)
+    head = content.read(64)
+    if is_html(head):
+        log_decode_error(requested_data, 'html response', status_code)
+        raise KrxHtmlResponseError(requested_data, status_code)
+    try:
+        return decode_columns(PrependedStream(head, content))
+    except ValueError as e:
+        log_decode_error(requested_data, e, status_code)
+        raise
+
+
+def decode_krx_data(content, requested_data, status_code=None):
+    if is_html(content[:64]):
+        log_decode_error(requested_data, 'html response', status_code)
+        raise KrxHtmlResponseError(requested_data, status_code)
+    try:
+        return json.loads(content)
+    except ValueError as e:
+        log_decode_error(requested_data, e, status_code)
+        raise
+
+
+def is_html(head):
+    # 요청이 잘못되었거나 서버에 문제가 있으면 KRX 는 200 으로 HTML 에러 페이지를 돌려주기도 한다.
+    return head.lstrip()[:1] == b'<'
+
+
+def log_decode_error(requested_data, error, status_code):
+    logger = logging.getLogger('log')
+    logger.info(f'\tdata:\t{requested_data}\n'
+                f'error:\t{error}\n'
+                f'status code:\t{status_code}')
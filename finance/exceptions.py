@@ -0,0 +1,21 @@
+# -*- coding: utf-8 -*-
+
+
+class KrxHtmlResponseError(ValueError):
+    """ getJsonData.cmd 가 JSON 대신 HTML(에러 페이지 등)을 돌려준 경우 """
+    def __init__(self, requested_data, status_code=None):
+        self.requested_data = requested_data
+        self.status_code = status_code
+        super().__init__(f'KRX returned HTML instead of JSON, status code: {status_code}, data: {requested_data}')
+
+
+class NoDataError(Exception):
+    """ 요청한 기간이나 조건에 해당하는 데이터가 없는 경우 """
+
+
+class CircuitOpenError(Exception):
+    """ 같은 host 에 대한 요청이 연속으로 실패해서 잠시 요청을 보내지 않는 경우 """
+    def __init__(self, host, retry_after):
+        self.host = host
+        self.retry_after = retry_after
+        super().__init__(f'Too many failures to {host}, retry after {retry_after:.1f} seconds')
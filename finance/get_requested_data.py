@@ -67,3 +67,24 @@ def get_requested_data(code, start, end, day, division, item, **kwargs):
         raise ValueError(f"No function code, [{code}]")
 
     return requested_data
+
+
+def autocomplete_type(code):
+    # get_requested_data 에서 생성되는 class 가 autocomplete 에 사용하는 item_type
+    if code in index_code_list_stock:
+        return 'index'
+    elif code in stock_code_list_item + stock_code_list_trade + stock_code_list_detail:
+        return 'stock'
+    elif code in product_code_list_ETF:
+        return 'ETF'
+    elif code in product_code_list_ETN:
+        return 'ETN'
+    elif code in product_code_list_ELW:
+        return 'ELW'
+    elif code in ['14011', '14021', '14023']:
+        return 'publish'
+    elif code in bond_code_list_price + bond_code_list_info + bond_code_list_trade + bond_code_list_detail:
+        return 'bond'
+    elif code in ['15002', '15010']:
+        return 'derivative'
+    return None
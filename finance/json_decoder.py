@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+import io
+import re
+import json
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+# getJsonData.cmd 의 응답은 {'output': [{row}, {row}, ...], 'CURRENT_DATETIME': ...} 형태다.
+# 전종목 데이터는 row 가 수천 개라 row dict 를 모두 만들면 메모리를 많이 쓴다.
+# 여기서는 응답을 읽으면서 바로 {'output': {column: [values]}, ...} 형태(columnar)로 만든다.
+# ijson 이 설치되어 있으면 응답을 조금씩 읽으며(streaming) 변환하고, 없으면 json.loads 후에 변환한다.
+
+
+def decode_columns(content):
+    """
+    :param content: bytes 또는 read() 가 가능한 file-like 객체
+    :return: data block 이 {column: [values]} 인 dict
+    """
+    if ijson is None:
+        if hasattr(content, 'read'):
+            content = content.read()
+        return rows_to_columns(json.loads(content))
+    return stream_columns(content)
+
+
+def stream_columns(content):
+    """ data block 만 돌려준다. CURRENT_DATETIME 등 data block 이외의 값은 읽지 않는다. """
+    if isinstance(content, bytes):
+        content = io.BytesIO(content)
+    # 응답은 {"OutBlock_1":[...], ...} 처럼 data block 이 맨 앞에 온다. 앞부분을 읽어서 block 이름을 알아낸다.
+    head = content.read(256)
+    match = re.match(rb'\s*\{\s*"([^"]+)"\s*:\s*\[', head)
+    if match is None:
+        return rows_to_columns(json.loads(head + content.read()))
+    block_name = match.group(1).decode('utf-8')
+
+    # ijson.items 는 row 를 하나씩 만들어 준다. 바로 column 에 옮기므로 row dict 가 쌓이지 않는다.
+    columns = {}
+    rows = ijson.items(PrependedStream(head, content), f'{block_name}.item', use_float=True)
+    for i, row in enumerate(rows):
+        for column, data_value in row.items():
+            values = columns.get(column, None)
+            if values is None:
+                # 앞의 row 에 없던 column 은 None 으로 채운다.
+                values = columns[column] = [None] * i
+            values.append(data_value)
+        fill_columns(columns, i + 1)
+    return {block_name: columns}
+
+
+class PrependedStream:
+    """ 먼저 읽어둔 head 를 다시 앞에 붙여서 읽게 해주는 file-like 객체 """
+    def __init__(self, head, stream):
+        self.head = head
+        self.stream = stream
+
+    def read(self, size=-1):
+        if not self.head:
+            return self.stream.read(size)
+        if size is None or size < 0:
+            data = self.head + self.stream.read()
+        else:
+            data = self.head[:size]
+        self.head = self.head[len(data):]
+        return data
+
+
+def fill_columns(columns, n_rows):
+    # row 에 없던 column 은 None 으로 채워서 모든 column 의 길이를 맞춘다.
+    for column in columns.values():
+        if len(column) < n_rows:
+            column.append(None)
+
+
+def rows_to_columns(krx_data):
+    result = {}
+    for key, value in krx_data.items():
+        if isinstance(value, list):
+            columns = {}
+            for i, row in enumerate(value):
+                for column, data_value in row.items():
+                    if column not in columns:
+                        columns[column] = [None] * i
+                    columns[column].append(data_value)
+                fill_columns(columns, i + 1)
+            result[key] = columns
+        else:
+            result[key] = value
+    return result
+
+
+def is_columnar(block):
+    return isinstance(block, dict)
+
+
+def n_rows(block):
+    if is_columnar(block):
+        return len(next(iter(block.values()))) if block else 0
+    return len(block)
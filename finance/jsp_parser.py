@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+import re
+
+try:
+    import lxml.html
+    utf8_parser = lxml.html.HTMLParser(encoding='utf-8')
+except ImportError:
+    lxml = None
+
+# MDCSTAT jsp 를 파싱하는 backend. lxml 이 설치되어 있으면 lxml 을, 없으면 BeautifulSoup(html.parser)를 사용한다.
+# BeautifulSoup 보다 lxml 이 10배 이상 빠르다.
+# 아래 함수들은 data_reader_ 의 같은 이름의 함수들과 같은 결과를 lxml tree 에서 만든다.
+backend = 'html.parser' if lxml is None else 'lxml'
+
+# resource bundle 에서 값을 받아오는 select tag 의 name. [14021], [15001], [15007]
+# TODO: 아래의 list 가 hard coding 으로 작성되어 있다.
+#  리스트를 사용하기 보다 어떤 경우에 execute_for_resource_bundle 을 사용하는지 알아내라.
+resource_bundle_select_names = ['bndClssCd', 'isurCd', 'idxIndCd', 'prodId', 'isuCd', 'selecbox', 'invstTpCd']
+
+
+def set_backend(name):
+    global backend
+    if name not in ['lxml', 'html.parser']:
+        raise ValueError(f"No parser backend, [{name}]")
+    if name == 'lxml' and lxml is None:
+        raise ImportError('lxml backend 를 사용하려면 lxml 이 필요합니다. (pip install lxml)')
+    backend = name
+
+
+def make_tree(content):
+    # jsp 에는 charset 정보가 없어서 bytes 를 그대로 넘기면 latin-1 로 읽힌다. KRX 는 utf-8 을 사용한다.
+    if isinstance(content, bytes):
+        return lxml.html.fromstring(content, parser=utf8_parser)
+    return lxml.html.fromstring(content)
+
+
+def parse_converting_map(tree, resource_bundles=None, get_resource_bundle=None):
+    label_map = {}
+    for label in tree.iter('label'):
+        label_map[label.get('for')] = label.text_content()
+
+    converting_map = {}
+    for input_ in tree.iter('input'):
+        if input_.get('value') != '':
+            inner = converting_map.setdefault(input_.get('name'), {})
+            text = label_map.get(input_.get('id'), None)
+            if text is not None:
+                inner[text] = input_.get('value')
+
+    for select_tag in tree.iter('select'):
+        name = select_tag.get('name')
+        if name in resource_bundle_select_names:
+            efrb_url = parse_efrb_url(select_tag)
+            if resource_bundles is None:
+                converting_map[name] = get_resource_bundle(efrb_url)
+            else:
+                converting_map[name] = resource_bundles[efrb_url]
+        else:
+            dic = {}
+            for option in select_tag.iter('option'):
+                dic[option.text_content()] = option.get('value')
+            converting_map[name] = dic
+    return converting_map
+
+
+def parse_efrb_urls(tree):
+    efrb_urls = []
+    for select_tag in tree.iter('select'):
+        if select_tag.get('name') in resource_bundle_select_names:
+            efrb_urls.append(parse_efrb_url(select_tag))
+    return efrb_urls
+
+
+def parse_efrb_url(select_tag):
+    # select tag 바로 뒤의 script 에 resource bundle 의 baseName, key 가 있다.
+    script = select_tag.xpath('following::script[1]')[0]
+    return make_efrb_url(script.text or '')
+
+
+def make_efrb_url(script_text):
+    queries = script_text.split('baseName:')[1].split('}')[0]
+    for e in queries.split('\''):
+        if 'krx' in e:
+            baseName = e
+        elif 'bld' in e:
+            key = e
+    market = 'kospi'
+    efrb_url = f'http://data.krx.co.kr/comm/bldAttendant/executeForResourceBundle.cmd?baseName={baseName}&key={key}&type={market}'
+    return efrb_url
+
+
+def get_readable_columns(tree, mdcstat):
+    map_ = {}
+    jsGrid_dict = parse_jsGrid_dict(tree)
+    jsGrid = jsGrid_dict[mdcstat]
+
+    table_tag = find_by_id(tree, 'table', jsGrid)
+    div_tag = find_by_id(tree, 'div', jsGrid)
+
+    if table_tag is not None:
+        table_map = parse_table_map(table_tag)
+        map_.update(table_map)
+    if div_tag is not None:
+        div_map = parse_div_map(div_tag)
+        map_.update(div_map)
+    return map_
+
+
+def find_by_id(tree, tag, ids):
+    for element in tree.iter(tag):
+        if element.get('id') in ids:
+            return element
+    return None
+
+
+def parse_jsGrid_dict(tree):
+    jscode_str = ''
+    for script in tree.iter('script'):
+        if 'jsGrid' in (script.text or ''):
+            jscode_str = script.text
+            break
+    mdcstat_list = re.findall(r'template: \$content\.select\(\'\#(jsGrid_MDCSTAT[0-9]*\_[0-9])', jscode_str)
+    bld_list = re.findall(r'bld: \'dbms/MDC/STAT/standard/(MDCSTAT[0-9]*)', jscode_str)
+    jsGrid_dict = {}
+    for mdcstat, bld in zip(mdcstat_list, bld_list):
+        lis = jsGrid_dict.setdefault(bld, [])
+        lis.append(mdcstat)
+    return jsGrid_dict
+
+
+def parse_table_map(table_tag):
+    table_map = {}
+    for tr in table_tag.iter('tr'):
+        th = list(tr.iter('th'))
+        td = list(tr.iter('td'))
+        for name, id in zip(th, td):
+            table_map[id.get('data-bind')] = name.text_content()
+    return table_map
+
+
+def parse_div_map(div_tag):
+    thead = div_tag.find('.//thead')
+    if thead is None:
+        return {}
+    tag_list = []
+    tag_list.extend(thead.iter('th'))
+    tag_list.extend(thead.iter('td'))
+
+    div_map = {}
+    for i in tag_list:
+        div_map[i.get('name')] = {
+            'text': i.text_content(),
+            'parent': i.get('parent')
+        }
+
+    p_list = set()
+    for key in div_map:
+        p = div_map[key]['parent']
+
+        if p is not None:
+            child_name = div_map[key]['text']
+            parent_name = div_map[p]['text']
+            div_map[key]['text'] = f'{parent_name}//{child_name}'
+
+            p_list.add(p)
+    [div_map.pop(p) for p in p_list]
+    for d in div_map:
+        div_map[d] = div_map[d]['text']
+    return div_map
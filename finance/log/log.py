@@ -20,9 +20,9 @@ logger.addHandler(fh)
 class Log:
     @staticmethod
     def info(func):
-        def wrapper(name=None, start=None, end=None):
+        def wrapper(name=None, start=None, end=None, **kwargs):
             logger.info(f'\tname :\t{name}\tstart :\t{start}\tend :\t{end}')
             if name is None:
                 name = 'all'
-            return func(name, start, end)
+            return func(name, start, end, **kwargs)
         return wrapper
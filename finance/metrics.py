@@ -0,0 +1,220 @@
+# -*- coding: utf-8 -*-
+import time
+import threading
+import contextvars
+from contextlib import contextmanager
+
+from finance.cache import write_file
+
+# data_reader 한 번의 호출에서 단계별 시간, HTTP 요청 수, 받은 bytes, 캐시 hit, row 수를 기록한다.
+#
+#     from finance import metrics
+#     metrics.add_hook(lambda m: print(m.as_dict()))   # 호출이 끝날 때마다 실행된다.
+#     finance.data_reader('12001', market='전체')
+#     metrics.collector.as_dict()                      # 모든 호출의 합계
+#     metrics.collector.write_prometheus('/var/lib/node_exporter/finance.prom')
+#
+# 단계(stage)는 get_requested_data, symbol_master, autocomplete, get_metadata, apply_converting_map, get_krx_data,
+# to_DataFrame 이다.
+# symbol_master(종목 목록 받기), autocomplete 는 get_requested_data 안에서 실행되므로
+# get_requested_data 의 시간에 두 단계의 시간이 포함된다.
+
+_current = contextvars.ContextVar('metrics', default=None)
+_hooks = []
+
+
+class Metrics:
+    def __init__(self, code):
+        self.code = code
+        self.stages = {}
+        self.http_calls = 0
+        self.bytes = 0
+        self.cache_hits = {}
+        self.cache_misses = {}
+        self.rows = 0
+        self.error = None
+        self.started_at = time.time()
+        self.elapsed = 0
+        # 나누어진 요청은 여러 thread 에서 동시에 기록된다.
+        self._lock = threading.Lock()
+
+    def add_stage(self, stage, seconds):
+        with self._lock:
+            self.stages[stage] = self.stages.get(stage, 0) + seconds
+
+    def add_http_call(self, n_bytes=0):
+        with self._lock:
+            self.http_calls += 1
+            self.bytes += n_bytes
+
+    def add_bytes(self, n_bytes):
+        with self._lock:
+            self.bytes += n_bytes
+
+    def add_cache(self, cache, hit):
+        with self._lock:
+            counter = self.cache_hits if hit else self.cache_misses
+            counter[cache] = counter.get(cache, 0) + 1
+
+    def as_dict(self):
+        return {
+            'code': self.code,
+            'started_at': self.started_at,
+            'elapsed': self.elapsed,
+            'stages': dict(self.stages),
+            'http_calls': self.http_calls,
+            'bytes': self.bytes,
+            'cache_hits': dict(self.cache_hits),
+            'cache_misses': dict(self.cache_misses),
+            'rows': self.rows,
+            'error': None if self.error is None else type(self.error).__name__,
+        }
+
+
+class Collector:
+    """ Metrics 들을 합산한다. Prometheus text 형식으로 내보낼 수 있다. """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.calls = {}
+            self.errors = {}
+            self.stage_seconds = {}
+            self.stage_calls = {}
+            self.http_calls = 0
+            self.bytes = 0
+            self.cache_hits = {}
+            self.cache_misses = {}
+            self.rows = 0
+
+    def add(self, m):
+        with self._lock:
+            add_count(self.calls, m.code)
+            if m.error is not None:
+                add_count(self.errors, m.code)
+            for stage, seconds in m.stages.items():
+                add_count(self.stage_seconds, stage, seconds)
+                add_count(self.stage_calls, stage)
+            self.http_calls += m.http_calls
+            self.bytes += m.bytes
+            for cache, n in m.cache_hits.items():
+                add_count(self.cache_hits, cache, n)
+            for cache, n in m.cache_misses.items():
+                add_count(self.cache_misses, cache, n)
+            self.rows += m.rows
+
+    def as_dict(self):
+        with self._lock:
+            return {
+                'calls': dict(self.calls),
+                'errors': dict(self.errors),
+                'stage_seconds': dict(self.stage_seconds),
+                'stage_calls': dict(self.stage_calls),
+                'http_calls': self.http_calls,
+                'bytes': self.bytes,
+                'cache_hits': dict(self.cache_hits),
+                'cache_misses': dict(self.cache_misses),
+                'rows': self.rows,
+            }
+
+    def to_prometheus(self, prefix='finance'):
+        d = self.as_dict()
+        lines = []
+        for name, help_, label, values in [
+            ('data_reader_calls_total', 'data_reader calls', 'code', d['calls']),
+            ('data_reader_errors_total', 'data_reader calls that raised', 'code', d['errors']),
+            ('data_reader_stage_seconds_total', 'Wall time spent in each stage', 'stage', d['stage_seconds']),
+            ('data_reader_stage_calls_total', 'Number of times each stage ran', 'stage', d['stage_calls']),
+            ('http_requests_total', 'HTTP requests sent to KRX', None, d['http_calls']),
+            ('http_bytes_total', 'Bytes downloaded from KRX', None, d['bytes']),
+            ('cache_hits_total', 'Cache hits', 'cache', d['cache_hits']),
+            ('cache_misses_total', 'Cache misses', 'cache', d['cache_misses']),
+            ('data_reader_rows_total', 'Rows returned by data_reader', None, d['rows']),
+        ]:
+            lines.append(f'# HELP {prefix}_{name} {help_}')
+            lines.append(f'# TYPE {prefix}_{name} counter')
+            if label is None:
+                lines.append(f'{prefix}_{name} {values}')
+                continue
+            for key, value in sorted(values.items()):
+                lines.append(f'{prefix}_{name}{{{label}="{escape_label(key)}"}} {value}')
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, filename, prefix='finance'):
+        # node_exporter textfile collector 가 쓰는 중인 파일을 읽지 않도록 임시 파일에 쓴 뒤 바꾼다.
+        write_file(filename, self.to_prometheus(prefix).encode('utf-8'))
+
+
+def add_count(counter, key, n=1):
+    counter[key] = counter.get(key, 0) + n
+
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+collector = Collector()
+
+
+def add_hook(func):
+    """ func(metrics) 는 data_reader 호출이 끝날 때마다 실행된다. 예외가 발생한 호출도 포함된다. """
+    _hooks.append(func)
+
+
+def remove_hook(func):
+    _hooks.remove(func)
+
+
+def current():
+    return _current.get()
+
+
+@contextmanager
+def record(code):
+    m = Metrics(code)
+    token = _current.set(m)
+    start = time.perf_counter()
+    try:
+        yield m
+    except Exception as e:
+        m.error = e
+        raise
+    finally:
+        m.elapsed = time.perf_counter() - start
+        _current.reset(token)
+        collector.add(m)
+        for hook in list(_hooks):
+            hook(m)
+
+
+@contextmanager
+def stage(name):
+    m = _current.get()
+    if m is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        m.add_stage(name, time.perf_counter() - start)
+
+
+def count_http_call(n_bytes=0):
+    m = _current.get()
+    if m is not None:
+        m.add_http_call(n_bytes)
+
+
+def count_bytes(n_bytes):
+    m = _current.get()
+    if m is not None:
+        m.add_bytes(n_bytes)
+
+
+def count_cache(cache, hit):
+    m = _current.get()
+    if m is not None:
+        m.add_cache(cache, hit)
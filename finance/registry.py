@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+import os
+import copy
+import json
+import time
+import logging
+from datetime import datetime
+
+from bs4 import BeautifulSoup as bs
+
+from finance import function_code_list, jsp_parser, session
+
+# function code 별 MDCSTAT 의 converting_map, readable_columns 를 미리 만들어 둔 파일.
+# data_reader 는 이 파일에 있는 MDCSTAT 에 대해서는 jsp, resource bundle 요청 없이 getJsonData.cmd 만 요청한다.
+# 패키지에는 빈 파일이 들어 있으며, `python -m finance.registry` 로 만든다. (네트워크 필요)
+registry_filename = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'registry.json')
+# 파일 형식이 바뀌면 올린다. 버전이 다른 파일은 사용하지 않는다.
+registry_version = 1
+# 만든지 max_age 초가 지난 항목은 오래된 것으로 보고 jsp 를 직접 파싱한다. None 이면 만료되지 않는다.
+max_age = 60 * 60 * 24 * 90
+
+_registry = None
+
+
+def load_registry(filename=None):
+    global _registry
+    try:
+        with open(registry_filename if filename is None else filename, encoding='utf-8') as f:
+            registry = json.load(f)
+    except (OSError, ValueError):
+        registry = {}
+    if registry.get('version', None) != registry_version:
+        registry = {'version': registry_version, 'entries': {}}
+    _registry = registry
+    return registry
+
+
+def lookup(mdcstat):
+    registry = load_registry() if _registry is None else _registry
+    entry = registry['entries'].get(mdcstat, None)
+    if entry is None:
+        return None
+    if max_age is not None and time.time() - entry['built_at'] > max_age:
+        return None
+    # to_DataFrame 이 column_map 을 수정하기 때문에 복사본을 돌려준다.
+    return copy.deepcopy(entry['converting_map']), copy.deepcopy(entry['readable_columns'])
+
+
+def function_codes():
+    codes = []
+    for value in vars(function_code_list).values():
+        if isinstance(value, list):
+            codes.extend(value)
+    return sorted(set(codes))
+
+
+def build_registry(codes=None, filename=None):
+    """
+    function code 들의 jsp 를 한 번씩 받아 파싱해서 registry 파일을 만든다.
+    jsp 안의 모든 jsGrid(MDCSTAT)를 함께 저장하므로 search_type 등에 따라 bld 가 바뀌는 경우도 포함된다.
+    """
+    # 순환 import 를 피하기 위해 여기서 import 한다.
+    from finance.data_reader_ import parse_mdcstat, jsp_url, parse_jsp, parse_metadata, parse_jsGrid_dict
+    from finance.get_requested_data import get_requested_data
+
+    logger = logging.getLogger('log')
+    entries = {}
+    code_map = {}
+    for code in function_codes() if codes is None else codes:
+        try:
+            mdcstat = parse_mdcstat(get_requested_data(code, None, None, None, None, None))
+        except Exception as e:
+            # 'Not now' 인 function code 등
+            logger.info(f'\tregistry:\t{code}\tskipped:\t{e}')
+            continue
+        code_map[code] = mdcstat
+        if mdcstat in entries:
+            continue
+        try:
+            document = parse_jsp(session.get(jsp_url(mdcstat)).content)
+            if isinstance(document, bs):
+                jsGrid_dict = parse_jsGrid_dict(document)
+            else:
+                jsGrid_dict = jsp_parser.parse_jsGrid_dict(document)
+            for bld, jsGrid in jsGrid_dict.items():
+                if bld in entries:
+                    continue
+                converting_map, readable_columns = parse_metadata(document, bld)
+                entries[bld] = {
+                    'jsGrid': jsGrid,
+                    'converting_map': converting_map,
+                    'readable_columns': readable_columns,
+                    'built_at': time.time()
+                }
+        except Exception as e:
+            logger.info(f'\tregistry:\t{code}\t{mdcstat}\terror:\t{e}')
+
+    registry = {
+        'version': registry_version,
+        'built_at': datetime.now().strftime('%Y%m%d'),
+        'codes': code_map,
+        'entries': entries
+    }
+    with open(registry_filename if filename is None else filename, 'w', encoding='utf-8') as f:
+        json.dump(registry, f, ensure_ascii=False, indent=1, sort_keys=True)
+    load_registry(filename)
+    return registry
+
+
+if __name__ == '__main__':
+    build_registry()
@@ -0,0 +1,210 @@
+# -*- coding: utf-8 -*-
+import heapq
+import bisect
+import itertools
+import threading
+from collections import Counter
+
+from finance.symbols import symbol_master, listings
+
+# 종목 목록(finance.symbols)의 모든 이름으로 만든 검색 index. KRX 에 요청하지 않고 이름을 찾는다.
+#
+#     import finance
+#     finance.search_index.refresh()    # 종목 목록을 받는다. 하루에 한 번만 받는다.
+#     finance.search('삼성')        # 앞부분
+#     finance.search('삼성저')      # 입력 중인 글자
+#     finance.search('삼송전자')    # 오타
+#     finance.search('ㅅㅅㅈㅈ')    # 초성
+#
+# 이름을 자모로 나눈 뒤(삼성 -> ㅅㅏㅁㅅㅓㅇ) 자모 2-gram 의 inverted index 로 후보를 찾고 점수를 매긴다.
+# 초성만 입력하면 초성 문자열(삼성전자 -> ㅅㅅㅈㅈ)의 index 에서 찾는다.
+
+choseong = 'ㄱㄲㄴㄷㄸㄹㅁㅂㅃㅅㅆㅇㅈㅉㅊㅋㅌㅍㅎ'
+jungseong = ['ㅏ', 'ㅐ', 'ㅑ', 'ㅒ', 'ㅓ', 'ㅔ', 'ㅕ', 'ㅖ', 'ㅗ', 'ㅗㅏ', 'ㅗㅐ', 'ㅗㅣ', 'ㅛ', 'ㅜ', 'ㅜㅓ', 'ㅜㅔ', 'ㅜㅣ',
+             'ㅠ', 'ㅡ', 'ㅡㅣ', 'ㅣ']
+jongseong = ['', 'ㄱ', 'ㄲ', 'ㄱㅅ', 'ㄴ', 'ㄴㅈ', 'ㄴㅎ', 'ㄷ', 'ㄹ', 'ㄹㄱ', 'ㄹㅁ', 'ㄹㅂ', 'ㄹㅅ', 'ㄹㅌ', 'ㄹㅍ', 'ㄹㅎ',
+             'ㅁ', 'ㅂ', 'ㅂㅅ', 'ㅅ', 'ㅆ', 'ㅇ', 'ㅈ', 'ㅊ', 'ㅋ', 'ㅌ', 'ㅍ', 'ㅎ']
+# 입력 중에 보이는 겹자모(ㅘ, ㄳ 등)도 나누어서 비교한다.
+compound_jamo = {
+    'ㅘ': 'ㅗㅏ', 'ㅙ': 'ㅗㅐ', 'ㅚ': 'ㅗㅣ', 'ㅝ': 'ㅜㅓ', 'ㅞ': 'ㅜㅔ', 'ㅟ': 'ㅜㅣ', 'ㅢ': 'ㅡㅣ',
+    'ㄳ': 'ㄱㅅ', 'ㄵ': 'ㄴㅈ', 'ㄶ': 'ㄴㅎ', 'ㄺ': 'ㄹㄱ', 'ㄻ': 'ㄹㅁ', 'ㄼ': 'ㄹㅂ', 'ㄽ': 'ㄹㅅ', 'ㄾ': 'ㄹㅌ',
+    'ㄿ': 'ㄹㅍ', 'ㅀ': 'ㄹㅎ', 'ㅄ': 'ㅂㅅ',
+}
+
+
+def normalize(text):
+    return ''.join(str(text).lower().split())
+
+
+def to_jamo(text):
+    """ 삼성 -> ㅅㅏㅁㅅㅓㅇ, 한글이 아닌 글자는 그대로 둔다. """
+    jamo = []
+    for char in text:
+        code = ord(char) - 0xAC00
+        if 0 <= code < 11172:
+            jamo.append(choseong[code // 588])
+            jamo.append(jungseong[code % 588 // 28])
+            jamo.append(jongseong[code % 28])
+        else:
+            jamo.append(compound_jamo.get(char, char))
+    return ''.join(jamo)
+
+
+def to_choseong(text):
+    """ 삼성전자 -> ㅅㅅㅈㅈ, 한글이 아닌 글자는 그대로 둔다. """
+    result = []
+    for char in text:
+        code = ord(char) - 0xAC00
+        result.append(choseong[code // 588] if 0 <= code < 11172 else char)
+    return ''.join(result)
+
+
+def is_choseong_query(text):
+    return bool(text) and all(char in choseong for char in text)
+
+
+def ngrams(text, n=2):
+    if len(text) <= n:
+        return [text]
+    return [text[i:i + n] for i in range(len(text) - n + 1)]
+
+
+class Field:
+    def __init__(self, keys):
+        """ keys[i] 는 i 번째 문서의 검색용 문자열 """
+        self.keys = keys
+        self.grams = {}
+        for i, key in enumerate(keys):
+            for gram in set(ngrams(key)):
+                self.grams.setdefault(gram, []).append(i)
+        self.n_grams = [len(set(ngrams(key))) for key in keys]
+        self.sorted_keys = sorted((key, i) for i, key in enumerate(keys))
+
+    def prefix(self, query, limit):
+        start = bisect.bisect_left(self.sorted_keys, (query, -1))
+        result = []
+        for key, i in itertools.islice(self.sorted_keys, start, start + limit):
+            if not key.startswith(query):
+                break
+            result.append(i)
+        return result
+
+    def count_grams(self, query_grams):
+        counter = Counter()
+        for gram in query_grams:
+            counter.update(self.grams.get(gram, ()))
+        return counter
+
+
+class SearchIndex:
+    def __init__(self, symbols, min_similarity=0.4, max_prefix_candidates=200):
+        """
+        :param symbols: [(이름, 표준코드, 단축코드, 종류)]
+        :param min_similarity: 2-gram 이 이 비율 이상 겹쳐야 결과에 포함된다. 오타를 얼마나 허용할지 정한다.
+        :param max_prefix_candidates: 앞부분이 같은 이름이 많을 때 점수를 매길 최대 개수
+        """
+        self.symbols = list(symbols)
+        self.min_similarity = min_similarity
+        self.max_prefix_candidates = max_prefix_candidates
+        names = [normalize(symbol[0]) for symbol in self.symbols]
+        self.jamo = Field([to_jamo(name) for name in names])
+        self.choseong = Field([to_choseong(name) for name in names])
+        # 점수가 같으면 짧은 이름을 먼저 보여주도록 점수에서 순위에 따라 아주 작은 값을 뺀다.
+        order = sorted(range(len(names)), key=lambda i: (len(self.jamo.keys[i]), self.jamo.keys[i]))
+        self.tie = [0] * len(names)
+        for rank, i in enumerate(order):
+            self.tie[i] = rank / (len(names) + 1) * 1e-6
+        self.codes = {}
+        for i, symbol in enumerate(self.symbols):
+            self.codes.setdefault(str(symbol[2]).lower(), []).append(i)
+
+    def search(self, query, kind=None, limit=10):
+        """
+        :return: 점수가 높은 순서의 (이름, 표준코드, 단축코드, 종류) list
+        """
+        query = normalize(query)
+        if not query:
+            return []
+        if is_choseong_query(query):
+            field, key = self.choseong, query
+        else:
+            field, key = self.jamo, to_jamo(query)
+
+        query_grams = set(ngrams(key))
+        tie = self.tie
+        scores = {}
+        # 자모가 1, 2 개뿐인 짧은 입력은 앞부분으로만 찾는다.
+        if len(key) > 2:
+            counter = field.count_grams(query_grams)
+            n_query_grams = len(query_grams)
+            min_common = self.min_similarity * n_query_grams
+            n_grams = field.n_grams
+            # 입력한 2-gram 중 겹치는 비율이 min_similarity 이상인 이름에 dice 계수로 점수를 매긴다.
+            scores = {i: 2 * common / (n_query_grams + n_grams[i]) - tie[i]
+                      for i, common in counter.items() if common >= min_common}
+        # 앞부분이 같으면 1점, 같은 이름이면 3점, 단축코드가 같으면 3점을 더한다.
+        for i in field.prefix(key, self.max_prefix_candidates):
+            scores[i] = scores.get(i, -tie[i]) + (3 if field.keys[i] == key else 1)
+        for i in self.codes.get(query, ()):
+            scores[i] = scores.get(i, -tie[i]) + 3
+        if kind is not None:
+            scores = {i: score for i, score in scores.items() if self.symbols[i][3] == kind}
+        best = heapq.nlargest(limit, scores, key=scores.__getitem__)
+        return [self.symbols[i] for i in best]
+
+
+_index = None
+_index_version = None
+_index_lock = threading.Lock()
+
+
+def get_search_index():
+    """
+    메모리나 디스크에 있는 종목 목록으로 index 를 만들고, 목록이 바뀌면 다시 만든다.
+    KRX 에 요청하지 않으므로 아직 받지 않은 종류는 찾을 수 없다. refresh() 로 먼저 받는다.
+    """
+    global _index, _index_version
+    tables = {kind: symbol_master.loaded(kind) for kind in listings}
+    version = [(kind, id(table), table.date, len(table.entries)) for kind, table in tables.items() if table is not None]
+    with _index_lock:
+        if _index is None or _index_version != version:
+            symbols = []
+            for kind, table in tables.items():
+                if table is None:
+                    continue
+                # 마지막으로 받은 목록에 있는 종목만 찾는다.
+                symbols.extend((name, isin, code, kind) for name, isin, code, seen in table.entries.values()
+                               if seen == table.date)
+            _index = SearchIndex(symbols)
+            _index_version = version
+        return _index
+
+
+def refresh(kinds=None):
+    """
+    search 에 사용할 종목 목록을 받는다. 오늘 받은 목록이 있으면 다시 받지 않는다.
+    :param kinds: 'stock', 'ETF', 'ETN', 'ELW', 'index' 의 list, default 값은 None 이며 모든 종류를 받는다.
+    """
+    for kind in listings if kinds is None else kinds:
+        if symbol_master.enabled:
+            symbol_master.table(kind)
+
+
+def search(query, kind=None, limit=10):
+    """
+    종목 목록의 모든 이름에서 query 와 비슷한 이름을 찾는다. 앞부분, 입력 중인 글자, 오타, 초성으로 찾을 수 있다.
+    KRX 에 요청하지 않으며, 받아 둔 종목 목록이 없는 종류는 찾지 않는다. (refresh 참고)
+    Parameters
+    ----------
+    query : string
+        종목명의 일부, 초성 또는 단축코드
+    kind : string
+        'stock', 'ETF', 'ETN', 'ELW', 'index' 중 하나, default 값은 None 이며 모든 종류에서 찾는다.
+    limit : int
+        최대 결과 수
+
+    Returns : list
+        점수가 높은 순서의 (종목명, 표준코드, 단축코드, 종류) list
+    -------
+    """
+    return get_search_index().search(query, kind, limit)
@@ -0,0 +1,334 @@
+# -*- coding: utf-8 -*-
+import time
+import random
+import weakref
+import asyncio
+import threading
+from urllib.parse import urlparse
+
+import requests
+import urllib3
+from requests.adapters import HTTPAdapter
+
+from finance import metrics
+from finance.exceptions import CircuitOpenError
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+# data.krx.co.kr 로 나가는 모든 요청은 이 모듈을 거친다.
+# 하나의 requests.Session 을 공유해서 TCP 연결을 재사용(keep-alive)한다.
+
+headers = {
+    'User-Agent':
+        'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/'
+        '605.1.15 (KHTML, like Gecko) Version/14.0.2 Safari/605.1.15',
+    'Accept-Encoding': 'gzip, deflate',
+}
+
+config = {
+    'pool_size': 10,
+    # (connect timeout, read timeout)
+    'timeout': (5, 30),
+    # asyncio API 에서 동시에 열어둘 connection 수
+    'async_pool_size': 100,
+    # 5xx, timeout, 연결 오류일 때 다시 요청하는 횟수
+    'retries': 3,
+    # 200 으로 JSON 대신 HTML 이 왔을 때 다시 요청하는 횟수. 매번 retries 만큼 다시 요청할 수 있으므로 작게 잡는다.
+    'html_retries': 2,
+    # 다시 요청하기 전에 0 ~ min(backoff_max, backoff * 2 ** n) 초 사이에서 무작위로 기다린다.
+    'backoff': 0.5,
+    'backoff_max': 10,
+    # host 별로 breaker_threshold 번 연속 실패하면 breaker_reset 초 동안 요청을 보내지 않는다.
+    'breaker_threshold': 10,
+    'breaker_reset': 30,
+    # data.krx.co.kr 대신 요청을 보낼 주소. ex) 'http://127.0.0.1:8000' (test/krx_server.py 참고)
+    'base_url': None,
+}
+
+krx_url = 'http://data.krx.co.kr'
+
+_session = None
+_lock = threading.Lock()
+# aiohttp.ClientSession 은 event loop 에 묶이기 때문에 loop 별로 만든다. {loop: (ClientSession, closer)}
+_async_sessions = weakref.WeakKeyDictionary()
+
+
+def configure(pool_size=None, timeout=None, async_pool_size=None, **kwargs):
+    """
+    Parameters
+    ----------
+    pool_size : int
+        host 당 유지할 connection 수, 동시에 요청하는 thread 수보다 크게 잡는다.
+    timeout : float, tuple
+        requests 의 timeout 과 같다. (connect timeout, read timeout)
+    async_pool_size : int
+        asyncio API 에서 동시에 열어둘 connection 수
+    kwargs :
+        retries, html_retries, backoff, backoff_max, breaker_threshold, breaker_reset, base_url (config 참고)
+    """
+    if pool_size is not None:
+        config['pool_size'] = pool_size
+    if timeout is not None:
+        config['timeout'] = timeout
+    if async_pool_size is not None:
+        config['async_pool_size'] = async_pool_size
+    for key, value in kwargs.items():
+        if key not in config:
+            raise TypeError(f"configure() got an unexpected keyword argument '{key}'")
+        config[key] = value
+    # 바뀐 설정은 다음 요청에서 만드는 session 에 적용된다.
+    close()
+
+
+def close():
+    global _session
+    with _lock:
+        if _session is not None:
+            _session.close()
+        _session = None
+
+
+def get_session():
+    global _session
+    if _session is None:
+        with _lock:
+            if _session is None:
+                _session = make_session()
+    return _session
+
+
+def make_session():
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=config['pool_size'], pool_maxsize=config['pool_size'])
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.headers.update(headers)
+    return session
+
+
+class CircuitBreaker:
+    def __init__(self, host):
+        self.host = host
+        self.failures = 0
+        self.opened_at = None
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.opened_at is None:
+                return
+            retry_after = self.opened_at + config['breaker_reset'] - time.time()
+            if retry_after > 0:
+                raise CircuitOpenError(self.host, retry_after)
+            # breaker_reset 초가 지나면 다시 요청해 본다. 또 실패하면 바로 다시 열린다.
+            self.opened_at = None
+            self.failures = config['breaker_threshold'] - 1
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.failures >= config['breaker_threshold']:
+                self.opened_at = time.time()
+
+
+_breakers = {}
+
+
+def get_breaker(url):
+    host = urlparse(url).netloc
+    breaker = _breakers.get(host, None)
+    if breaker is None:
+        with _lock:
+            breaker = _breakers.setdefault(host, CircuitBreaker(host))
+    return breaker
+
+
+def reset_breakers():
+    """ 모든 host 의 circuit breaker 를 닫힌 상태로 되돌린다. """
+    with _lock:
+        _breakers.clear()
+
+
+def backoff_delay(attempt):
+    return random.uniform(0, min(config['backoff_max'], config['backoff'] * 2 ** attempt))
+
+
+def resolve_url(url):
+    if config['base_url'] is not None and url.startswith(krx_url):
+        return config['base_url'].rstrip('/') + url[len(krx_url):]
+    return url
+
+
+def retryable_status(status_code):
+    return status_code >= 500
+
+
+def request(method, url, read=None, **kwargs):
+    """
+    read 를 주면 response 대신 read(response) 를 돌려준다.
+    stream=True 로 받은 body 는 read 안에서 읽히므로, 읽다가 연결이 끊기거나 timeout 이 나도 다시 요청한다.
+    """
+    kwargs.setdefault('timeout', config['timeout'])
+    url = resolve_url(url)
+    breaker = get_breaker(url)
+    for attempt in range(config['retries'] + 1):
+        breaker.allow()
+        last_attempt = attempt == config['retries']
+        try:
+            response = get_session().request(method, url, **kwargs)
+            if metrics.current() is not None:
+                # stream=True 인 응답은 아직 읽지 않았으므로 bytes 는 읽는 쪽에서 센다.
+                metrics.count_http_call(0 if kwargs.get('stream', False) else len(response.content))
+            if not retryable_status(response.status_code):
+                result = response if read is None else read_response(response, read)
+                breaker.record_success()
+                return result
+        # stream=True 가 아니면 body 를 읽다가 끊긴 경우 ChunkedEncodingError 가 난다.
+        except (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError):
+            breaker.record_failure()
+            if last_attempt:
+                raise
+        else:
+            breaker.record_failure()
+            if last_attempt:
+                response.raise_for_status()
+            response.close()
+        time.sleep(backoff_delay(attempt))
+
+
+def read_response(response, read):
+    # response.raw 를 직접 읽을 때 나는 urllib3 의 오류는 requests 가 바꿔주지 않으므로 여기서 바꾼다.
+    with response:
+        try:
+            return read(response)
+        except urllib3.exceptions.ReadTimeoutError as e:
+            raise requests.ReadTimeout(e, response=response)
+        except urllib3.exceptions.ProtocolError as e:
+            raise requests.ConnectionError(e, response=response)
+
+
+def call_with_retry(func, *args, retry_on=(), **kwargs):
+    # request() 의 retry 와 별개로, 응답 내용 때문에 실패한 경우(retry_on) 다시 요청한다.
+    # 연결 오류, 5xx, body 를 읽다 끊긴 경우는 request() 에서만 다시 요청하고 여기서는 그대로 올려보낸다.
+    for attempt in range(config['html_retries'] + 1):
+        try:
+            return func(*args, **kwargs)
+        except retry_on:
+            if attempt == config['html_retries']:
+                raise
+        time.sleep(backoff_delay(attempt))
+
+
+def get(url, **kwargs):
+    return request('GET', url, **kwargs)
+
+
+def post(url, data=None, **kwargs):
+    return request('POST', url, data=data, **kwargs)
+
+
+def get_async_session():
+    if aiohttp is None:
+        raise ImportError('asyncio API 를 사용하려면 aiohttp 가 필요합니다. (pip install aiohttp)')
+    loop = asyncio.get_running_loop()
+    entry = _async_sessions.get(loop)
+    if entry is None or entry[0].closed:
+        # 닫힌 loop 의 session 은 더 이상 사용할 수 없으므로 지운다.
+        for closed_loop in [key for key in list(_async_sessions) if key.is_closed()]:
+            _async_sessions.pop(closed_loop, None)
+        async_session = make_async_session()
+        entry = _async_sessions[loop] = (async_session, close_on_shutdown(loop, async_session))
+    return entry[0]
+
+
+def close_on_shutdown(loop, async_session):
+    # asyncio.run 은 loop 를 닫기 전에 loop.shutdown_asyncgens() 로 멈춰 있는 async generator 를 모두 닫는다.
+    # 첫 yield 까지 실행해 둔 closer 가 이때 닫히면서 session 도 닫으므로 async_close() 를 부르지 않아도 된다.
+    closer = _closer(loop, async_session)
+    try:
+        closer.asend(None).send(None)
+    except StopIteration:
+        pass
+    return closer
+
+
+async def _closer(loop, async_session):
+    try:
+        yield
+    finally:
+        entry = _async_sessions.get(loop)
+        if entry is not None and entry[0] is async_session:
+            _async_sessions.pop(loop, None)
+        await async_session.close()
+
+
+def make_async_session():
+    timeout = config['timeout']
+    if isinstance(timeout, tuple):
+        client_timeout = aiohttp.ClientTimeout(sock_connect=timeout[0], sock_read=timeout[1])
+    else:
+        client_timeout = aiohttp.ClientTimeout(sock_connect=timeout, sock_read=timeout)
+    connector = aiohttp.TCPConnector(limit=config['async_pool_size'])
+    return aiohttp.ClientSession(connector=connector, headers=headers, timeout=client_timeout)
+
+
+async def async_request(method, url, data=None):
+    # request() 의 asyncio 버전. retry, backoff, circuit breaker 설정을 같이 사용한다.
+    url = resolve_url(url)
+    breaker = get_breaker(url)
+    for attempt in range(config['retries'] + 1):
+        breaker.allow()
+        last_attempt = attempt == config['retries']
+        try:
+            async with get_async_session().request(method, url, data=data) as response:
+                if not retryable_status(response.status):
+                    content = await response.read()
+                    metrics.count_http_call(len(content))
+                    breaker.record_success()
+                    return content
+                metrics.count_http_call()
+                breaker.record_failure()
+                if last_attempt:
+                    response.raise_for_status()
+        # body 를 읽다가 연결이 끊기면 ClientPayloadError 가 난다.
+        except (aiohttp.ClientConnectionError, aiohttp.ClientPayloadError, asyncio.TimeoutError):
+            breaker.record_failure()
+            if last_attempt:
+                raise
+        await asyncio.sleep(backoff_delay(attempt))
+
+
+async def async_call_with_retry(func, *args, retry_on=(), **kwargs):
+    for attempt in range(config['html_retries'] + 1):
+        try:
+            return await func(*args, **kwargs)
+        except retry_on:
+            if attempt == config['html_retries']:
+                raise
+        await asyncio.sleep(backoff_delay(attempt))
+
+
+async def async_get(url):
+    return await async_request('GET', url)
+
+
+async def async_post(url, data=None):
+    # requests 와 마찬가지로 값이 None 인 항목은 보내지 않는다.
+    if data is not None:
+        data = {key: str(value) for key, value in data.items() if value is not None}
+    return await async_request('POST', url, data=data)
+
+
+async def async_close():
+    """ 실행 중인 loop 의 aiohttp.ClientSession 을 닫는다. loop 가 끝날 때 자동으로 닫히므로 부르지 않아도 된다. """
+    entry = _async_sessions.pop(asyncio.get_running_loop(), None)
+    if entry is not None:
+        await entry[1].aclose()
@@ -1,6 +1,6 @@
 # -*- coding: utf-8 -*-
-import requests
 from bs4 import BeautifulSoup as bs
+from finance import session
 from finance.statistics.basic.info import Info
 
 class Index(Info):
@@ -163,7 +163,7 @@ class DerivationIndex(Index):
         if item is None:
             item = '코스피 200 선물지수'
         index_autocomplete_url = 'http://data.krx.co.kr/comm/finder/autocomplete.jspx?contextName=finder_drvetcidx&value={value}&viewCount=5&bldPath=%2Fdbms%2Fcomm%2Ffinder%2Ffinder_drvetcidx_autocomplete'
-        response = requests.get(index_autocomplete_url.format(value=item))
+        response = session.get(index_autocomplete_url.format(value=item))
         soup = bs(response.content, 'html.parser').li
 
         if soup is None:
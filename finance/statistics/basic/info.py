@@ -1,12 +1,28 @@
 import json
+import asyncio
 import logging
+import contextvars
 
 from datetime import datetime, timedelta
-import requests
 from bs4 import BeautifulSoup as bs
+from finance import session, metrics
+from finance.cache import TTLCache
+from finance.symbols import symbol_master, listings
 from finance.to_DataFrame import GettingDataNm
 
 
+autocomplete_urls = {
+    'index': 'http://data.krx.co.kr/comm/finder/autocomplete.jspx?contextName=finder_equidx&value={item_name}&viewCount=5&bldPath=%2Fdbms%2Fcomm%2Ffinder%2Ffinder_equidx_autocomplete',
+    'stock': 'http://data.krx.co.kr/comm/finder/autocomplete.jspx?contextName=finder_stkisu&value={item_name}&viewCount=5&bldPath=%2Fdbms%2Fcomm%2Ffinder%2Ffinder_stkisu_autocomplete',
+    'ETF': 'http://data.krx.co.kr/comm/finder/autocomplete.jspx?contextName=finder_secuprodisu_etf&value={item_name}&viewCount=5&bldPath=%2Fdbms%2Fcomm%2Ffinder%2Ffinder_secuprodisu_etf_autocomplete',
+    'ETN': 'http://data.krx.co.kr/comm/finder/autocomplete.jspx?contextName=finder_secuprodisu_etn&value={item_name}&viewCount=5&bldPath=%2Fdbms%2Fcomm%2Ffinder%2Ffinder_secuprodisu_etn_autocomplete',
+    'ELW': 'http://data.krx.co.kr/comm/finder/autocomplete.jspx?contextName=finder_secuprodisu_elw&value={item_name}&viewCount=5&bldPath=%2Fdbms%2Fcomm%2Ffinder%2Ffinder_secuprodisu_elw_autocomplete',
+    'derivative': 'http://data.krx.co.kr/comm/finder/autocomplete.jspx?contextName=finder_drvprodisu&value={item_name}&viewCount=5&bldPath=%2Fdbms%2Fcomm%2Ffinder%2Ffinder_drvprodisu_autocomplete',
+    'publish': 'http://data.krx.co.kr/comm/finder/autocomplete.jspx?contextName=finder_bndordisu&value={item_name}&viewCount=5&bldPath=%2Fdbms%2Fcomm%2Ffinder%2Ffinder_bndordisu_autocomplete',
+    'bond': 'http://data.krx.co.kr/comm/finder/autocomplete.jspx?contextName=finder_bondisu&value={item_name}&viewCount=5&bldPath=%2Fdbms%2Fcomm%2Ffinder%2Ffinder_bondisu_autocomplete'
+}
+
+
 class Info:
     def __init__(self, start, end, day):
         """ 지수
@@ -25,25 +41,63 @@ class Info:
         requested_data['csvxls_isNo'] = 'false'
         return requested_data
 
+    # autocomplete 결과는 (item_name, item_type) 별로 하루 동안 저장해 두고 재사용한다.
+    autocomplete_cache = TTLCache(ttl=60 * 60 * 24, max_entries=4096)
+
     def autocomplete(self, item_name, item_type):
         if item_name is None:
             return None, None, None
+        # 종목 목록(finance.symbols)에 있으면 autocomplete.jspx 를 요청하지 않는다.
+        symbol = self.lookup_symbol(item_name, item_type)
+        if symbol is not None:
+            return self.set_data_nm(symbol)
+        key = (item_name, item_type)
+        item = Info.autocomplete_cache.get(key)
+        metrics.count_cache('autocomplete', item is not None)
+        if item is None:
+            with metrics.stage('autocomplete'):
+                autocomplete_response = session.get(self.autocomplete_url(item_name, item_type))
+                item = self.parse_autocomplete(autocomplete_response.content, item_name)
+            Info.autocomplete_cache.set(key, item)
+        return self.set_data_nm(item)
+
+    async def aautocomplete(self, item_name, item_type):
+        """ asyncio 버전의 autocomplete """
+        if item_name is None:
+            return None, None, None
+        # 종목 목록을 처음 받을 때는 네트워크 요청이 있으므로 thread 에서 실행한다.
+        symbol = await asyncio.get_running_loop().run_in_executor(
+            None, contextvars.copy_context().run, self.lookup_symbol, item_name, item_type)
+        if symbol is not None:
+            return self.set_data_nm(symbol)
+        key = (item_name, item_type)
+        item = Info.autocomplete_cache.get(key)
+        metrics.count_cache('autocomplete', item is not None)
+        if item is None:
+            with metrics.stage('autocomplete'):
+                content = await session.async_get(self.autocomplete_url(item_name, item_type))
+                item = self.parse_autocomplete(content, item_name)
+            Info.autocomplete_cache.set(key, item)
+        return self.set_data_nm(item)
+
+    @staticmethod
+    def lookup_symbol(item_name, item_type):
+        if not symbol_master.enabled or item_type not in listings:
+            return None
+        symbol = symbol_master.lookup(item_name, item_type)
+        metrics.count_cache('symbol_master', symbol is not None)
+        return symbol
+
+    @staticmethod
+    def autocomplete_url(item_name, item_type):
         if '&' in item_name:
             # url에 item_name 문자열을 적용시키기 위 '&'를 변환시킴
             item_name = item_name.replace('&', '%2526')
+        return autocomplete_urls[item_type].format(item_name=item_name)
 
-        autocomplete_urls = {
-            'index': 'http://data.krx.co.kr/comm/finder/autocomplete.jspx?contextName=finder_equidx&value={item_name}&viewCount=5&bldPath=%2Fdbms%2Fcomm%2Ffinder%2Ffinder_equidx_autocomplete',
-            'stock': 'http://data.krx.co.kr/comm/finder/autocomplete.jspx?contextName=finder_stkisu&value={item_name}&viewCount=5&bldPath=%2Fdbms%2Fcomm%2Ffinder%2Ffinder_stkisu_autocomplete',
-            'ETF': 'http://data.krx.co.kr/comm/finder/autocomplete.jspx?contextName=finder_secuprodisu_etf&value={item_name}&viewCount=5&bldPath=%2Fdbms%2Fcomm%2Ffinder%2Ffinder_secuprodisu_etf_autocomplete',
-            'ETN': 'http://data.krx.co.kr/comm/finder/autocomplete.jspx?contextName=finder_secuprodisu_etn&value={item_name}&viewCount=5&bldPath=%2Fdbms%2Fcomm%2Ffinder%2Ffinder_secuprodisu_etn_autocomplete',
-            'ELW': 'http://data.krx.co.kr/comm/finder/autocomplete.jspx?contextName=finder_secuprodisu_elw&value={item_name}&viewCount=5&bldPath=%2Fdbms%2Fcomm%2Ffinder%2Ffinder_secuprodisu_elw_autocomplete',
-            'derivative': 'http://data.krx.co.kr/comm/finder/autocomplete.jspx?contextName=finder_drvprodisu&value={item_name}&viewCount=5&bldPath=%2Fdbms%2Fcomm%2Ffinder%2Ffinder_drvprodisu_autocomplete',
-            'publish': 'http://data.krx.co.kr/comm/finder/autocomplete.jspx?contextName=finder_bndordisu&value={item_name}&viewCount=5&bldPath=%2Fdbms%2Fcomm%2Ffinder%2Ffinder_bndordisu_autocomplete',
-            'bond': 'http://data.krx.co.kr/comm/finder/autocomplete.jspx?contextName=finder_bondisu&value={item_name}&viewCount=5&bldPath=%2Fdbms%2Fcomm%2Ffinder%2Ffinder_bondisu_autocomplete'
-        }
-        autocomplete_response = requests.get(autocomplete_urls[item_type].format(item_name=item_name))
-        soup = bs(autocomplete_response.content, 'html.parser')
+    @staticmethod
+    def parse_autocomplete(content, item_name):
+        soup = bs(content, 'html.parser')
 
         if soup is None:
             raise AttributeError(f'{item_name} is Wrong name as a stock name')
@@ -56,5 +110,9 @@ class Info:
             item_script = item_scripts[index]
         else:
             item_script = item_scripts[0]
-        GettingDataNm().data_nm = item_script.attrs['data-nm']
-        return item_script.attrs['data-nm'], item_script.attrs['data-cd'], item_script.attrs['data-tp']
\ No newline at end of file
+        return item_script.attrs['data-nm'], item_script.attrs['data-cd'], item_script.attrs['data-tp']
+
+    @staticmethod
+    def set_data_nm(item):
+        GettingDataNm().data_nm = item[0]
+        return item
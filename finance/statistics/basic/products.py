@@ -1,4 +1,5 @@
 # -*- coding: utf-8 -*-
+from finance import symbols
 from finance.statistics.basic.info import Info
 
 
@@ -25,26 +26,11 @@ class Product(Info):
         self.trade_check = kwargs.get('trade_check', None)
 
     def convert_code_to_item(self, item_code, item_type):
-        if item_type == 'ETF':
-            request_data = {
-                'bld': 'dbms/MDC/STAT/standard/MDCSTAT04301',
-                'trdDd': self.day,
-            }
-        elif item_type == 'ETN':
-            request_data = {
-                'bld': 'dbms/MDC/STAT/standard/MDCSTAT06401',
-                'trdDd': self.day
-            }
-        elif item_type == 'ELW':
-            request_data = {
-                'bld': 'dbms/MDC/STAT/standard/MDCSTAT08301',
-                'trdDd': self.day
-            }
-
-        data = self.update_requested_data(request_data)
-        for i in data[0]['output']:
-            if i['ISU_SRT_CD'] == str(item_code):
-                return i['ISU_ABBRV']
+        # ETF [13104], ETN [13204], ELW [13303] 전종목 기본정보로 만든 종목 목록에서 찾는다. (finance.symbols 참고)
+        symbol = symbols.lookup(item_code, item_type)
+        if symbol is None:
+            raise AttributeError(f'{item_code} is Wrong code as a {item_type} code')
+        return symbol[0]
 
 
 class ETF(Product):
@@ -1,4 +1,5 @@
 # -*- coding: utf-8 -*-
+from finance import symbols
 from finance.statistics.basic.info import Info
 
 
@@ -26,15 +27,11 @@ class Stock(Info):
 
 
     def convert_code_to_name(self, item_code):
-        # 전종목 기본정보 [12005] 데이터
-        request_data = {
-            'bld': 'dbms/MDC/STAT/standard/MDCSTAT01901',
-            'mktId': '전체'
-        }
-        data = self.update_requested_data(request_data)
-        for i in data[0]['OutBlock_1']:
-            if i['ISU_SRT_CD'] == str(item_code):
-                return i['ISU_ABBRV']
+        # 전종목 기본정보 [12005] 로 만든 종목 목록에서 찾는다. (finance.symbols 참고)
+        symbol = symbols.lookup(item_code, 'stock')
+        if symbol is None:
+            raise AttributeError(f'{item_code} is Wrong code as a stock code')
+        return symbol[0]
 
 
 class ItemPrice(Stock):
@@ -0,0 +1,266 @@
+# -*- coding: utf-8 -*-
+import io
+import os
+import json
+import shutil
+import hashlib
+import threading
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+from finance import symbols
+from finance.cache import default_cache_dir, write_file
+from finance.data_reader_ import data_reader
+from finance.get_requested_data import autocomplete_type
+from finance.exceptions import NoDataError
+
+# 기간(start, end)으로 조회하는 function code 의 결과를 Parquet 으로 저장해 두고, 없는 기간만 KRX 에 요청한다.
+#
+#     from finance.store import store
+#     store.read('12003', 20150101, 20210430, item='삼성전자')   # 처음에는 전체 기간을 받는다.
+#     store.read('12003', 20150101, 20210503, item='삼성전자')   # 20210501 ~ 20210503 만 받는다.
+#
+# 저장 경로는 default_cache_dir()/store/{function code}/{표준코드}/{나머지 인자 key}/ 이며
+# data.parquet 에 데이터를, meta.json 에 요청 인자와 이미 받은 기간을 저장한다.
+# 종목은 symbols.lookup 으로 표준코드를 찾으므로 item='삼성전자' 와 item_code='005930' 은 같은 곳에 저장된다.
+# 찾지 못한 종목이나 종목이 없는 요청은 {표준코드} 자리에 '_' 를 쓰고 종목 인자도 나머지 인자 key 에 넣는다.
+# 오늘이 포함된 기간은 장중에 바뀔 수 있으므로 받은 기간으로 기록하지 않고 다음 요청에서 다시 받는다.
+
+
+def to_date(value):
+    if isinstance(value, datetime):
+        return value.date()
+    return datetime.strptime(str(value), '%Y%m%d').date()
+
+
+def to_str(date):
+    return date.strftime('%Y%m%d')
+
+
+def subtract_ranges(start, end, covered):
+    """
+    :param covered: 이미 받은 [(start, end)], 날짜는 datetime.date, 양 끝을 포함한다.
+    :return: start ~ end 중 covered 에 없는 [(start, end)]
+    """
+    gaps = []
+    for covered_start, covered_end in sorted(covered):
+        if covered_end < start:
+            continue
+        if covered_start > end:
+            break
+        if covered_start > start:
+            gaps.append((start, covered_start - timedelta(days=1)))
+        start = max(start, covered_end + timedelta(days=1))
+        if start > end:
+            return gaps
+    if start <= end:
+        gaps.append((start, end))
+    return gaps
+
+
+def merge_ranges(ranges):
+    merged = []
+    for start, end in sorted(ranges):
+        # 이어지는 기간도 하나로 합친다.
+        if merged and start <= merged[-1][1] + timedelta(days=1):
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def trim_weekend(start, end):
+    # 토요일, 일요일에는 거래가 없으므로 요청하지 않는다.
+    while start <= end and start.weekday() >= 5:
+        start += timedelta(days=1)
+    while end >= start and end.weekday() >= 5:
+        end -= timedelta(days=1)
+    return (start, end) if start <= end else None
+
+
+def is_holidays(data, start, end):
+    # start ~ end 앞, 뒤로 거래된 날이 있으면 그 사이의 빈 기간은 휴장일이다.
+    if data is None:
+        return False
+    return (data.index < pd.Timestamp(start)).any() and (data.index > pd.Timestamp(end)).any()
+
+
+def lookup_symbol(code, instrument):
+    """ :return: instrument 의 표준코드, 지수는 계열 구분과 지수 코드를 붙인 코드, 찾지 못하면 None """
+    kind = autocomplete_type(code)
+    if instrument is None or kind not in symbols.listings:
+        return None
+    symbol = symbols.lookup(instrument, kind)
+    if symbol is None:
+        return None
+    _, isin, short_code = symbol
+    return f'{isin}{short_code}' if kind in symbols.composite_kinds else isin
+
+
+# data_reader 의 인자 중 store 에서 사용할 수 없는 것
+unsupported_kwargs = ['output', 'compact']
+
+
+class TimeSeriesStore:
+    def __init__(self, path=None):
+        """
+        :param path: 저장 경로, default 값은 default_cache_dir()/store
+        """
+        self.path = os.path.join(default_cache_dir(), 'store') if path is None else path
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def read(self, code, start, end=None, item=None, **kwargs):
+        """
+        start ~ end 의 data_reader(code, start=start, end=end, item=item, **kwargs) 결과를 돌려준다.
+        저장된 기간은 디스크에서 읽고, 없는 기간만 KRX 에 요청해서 저장한 뒤 합친다.
+        Parameters
+        ----------
+        code : string
+            기간으로 조회하는 function code, ex) '12003', '11003', '13103', '15002'
+        start : int, string
+            검색 시작일
+        end : int, string
+            검색 종료일, default 값은 오늘
+        item, kwargs :
+            data_reader 에 그대로 전달된다. output, compact 는 사용할 수 없다.
+            같은 종목이면 item 과 item_code 중 무엇으로 요청해도 같은 곳에 저장되고, 나머지 kwargs 가 다르면 따로 저장된다.
+
+        Returns : DataFrame
+            data_reader 와 같이 최근 날짜가 먼저 온다.
+        -------
+        """
+        if pyarrow is None:
+            raise ImportError('finance.store 를 사용하려면 pyarrow 가 필요합니다. (pip install pyarrow)')
+        # 저장하고 합치는 것은 data_reader 의 기본 출력(pandas DataFrame)이다.
+        for key in unsupported_kwargs:
+            if key in kwargs:
+                raise TypeError(f"read() got an unexpected keyword argument '{key}'")
+        start = to_date(start)
+        end = datetime.now().date() if end is None else to_date(end)
+        params = dict(kwargs, item=item)
+        directory = self.directory(code, item, kwargs)
+        with self._directory_lock(directory):
+            meta = self._read_meta(directory, params)
+            covered = [(to_date(s), to_date(e)) for s, e in meta['covered']]
+            data = self._read_data(directory)
+
+            parts = []
+            fetched = []
+            empty = []
+            for gap in subtract_ranges(start, end, covered):
+                trading_days = trim_weekend(*gap)
+                if trading_days is None:
+                    fetched.append(gap)
+                    continue
+                part = self.fetch(code, trading_days[0], trading_days[1], item, kwargs)
+                if part is None:
+                    empty.append(gap)
+                else:
+                    parts.append(part)
+                    fetched.append(gap)
+
+            if parts:
+                data = merge_data(data, parts)
+                self._write_data(directory, data)
+            # 데이터가 없는 평일은 앞, 뒤에 데이터가 있어야 휴장일로 보고 받은 기간으로 기록한다.
+            # 상장 전, 상장폐지 후, 아직 공개되지 않은 날일 수도 있으므로 그렇지 않으면 다음에 다시 요청한다.
+            fetched.extend(gap for gap in empty if is_holidays(data, *gap))
+            if fetched:
+                # 오늘 이후는 아직 바뀔 수 있다.
+                last_day = datetime.now().date() - timedelta(days=1)
+                covered.extend((s, min(e, last_day)) for s, e in fetched if s <= last_day)
+                meta['covered'] = [[to_str(s), to_str(e)] for s, e in merge_ranges(covered)]
+                self._write_meta(directory, meta)
+
+        if data is None:
+            raise NoDataError("No data, Check parameters")
+        data = data[(data.index >= pd.Timestamp(start)) & (data.index <= pd.Timestamp(end))]
+        return data.sort_index(ascending=False, kind='stable')
+
+    @staticmethod
+    def fetch(code, start, end, item, kwargs):
+        try:
+            data = data_reader(code, start=to_str(start), end=to_str(end), item=item, **kwargs)
+        except NoDataError:
+            # 휴장일만 있는 기간
+            return None
+        if not isinstance(data.index, pd.DatetimeIndex):
+            raise ValueError(f'[{code}] 는 일자 index 가 없어서 저장할 수 없습니다.')
+        return data
+
+    def covered(self, code, item=None, **kwargs):
+        """ :return: 저장된 기간 [(start, end)] """
+        params = dict(kwargs, item=item)
+        meta = self._read_meta(self.directory(code, item, kwargs), params)
+        return [tuple(r) for r in meta['covered']]
+
+    def directory(self, code, item, kwargs):
+        params = dict(kwargs, item=item)
+        instrument = '_'
+        symbol = lookup_symbol(code, item if item is not None else kwargs.get('item_code', None))
+        if symbol is not None:
+            # 종목은 표준코드로 나누므로 어떤 이름이나 코드로 요청했는지는 key 에 넣지 않는다.
+            instrument = symbol
+            params = {key: value for key, value in kwargs.items() if key != 'item_code'}
+        canonical = json.dumps(params, sort_keys=True, ensure_ascii=False, default=str)
+        key = hashlib.sha1(canonical.encode('utf-8')).hexdigest()[:16]
+        return os.path.join(self.path, str(code), instrument, key)
+
+    def invalidate(self, code=None, item=None, **kwargs):
+        """ code 가 None 이면 전부 지운다. """
+        if code is None:
+            directory = self.path
+        else:
+            directory = self.directory(code, item, kwargs)
+        shutil.rmtree(directory, ignore_errors=True)
+
+    def _directory_lock(self, directory):
+        with self._lock:
+            return self._locks.setdefault(directory, threading.Lock())
+
+    @staticmethod
+    def _read_meta(directory, params):
+        try:
+            with open(os.path.join(directory, 'meta.json'), encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {'params': json.loads(json.dumps(params, default=str)), 'covered': []}
+
+    @staticmethod
+    def _write_meta(directory, meta):
+        write_file(os.path.join(directory, 'meta.json'), json.dumps(meta, ensure_ascii=False).encode('utf-8'))
+
+    @staticmethod
+    def _read_data(directory):
+        try:
+            return pd.read_parquet(os.path.join(directory, 'data.parquet'))
+        except (OSError, ValueError):
+            return None
+
+    @staticmethod
+    def _write_data(directory, data):
+        buffer = io.BytesIO()
+        data.to_parquet(buffer)
+        write_file(os.path.join(directory, 'data.parquet'), buffer.getvalue())
+
+
+def merge_data(data, parts):
+    """
+    저장된 data 에 새로 받은 parts 를 합친다. 새로 받은 날짜는 저장된 row 를 버리고 새 row 를 사용한다.
+    투자자별 거래실적처럼 하루에 여러 row 가 있는 데이터도 있으므로 새로 받은 데이터 안의 같은 날짜는 그대로 둔다.
+    """
+    new = pd.concat(parts)
+    if data is not None:
+        new = pd.concat([data[~data.index.isin(new.index)], new])
+    # 같은 날짜 안의 순서는 받은 순서대로 둔다.
+    return new.sort_index(kind='stable')
+
+
+store = TimeSeriesStore()
@@ -0,0 +1,229 @@
+# -*- coding: utf-8 -*-
+import os
+import json
+import time
+import logging
+import threading
+from datetime import datetime
+
+from finance import metrics
+from finance.cache import default_cache_dir, write_file
+
+# 전종목 기본정보로 만든 종목 목록. autocomplete.jspx 대신 이름이나 단축코드로 (이름, 표준코드, 단축코드)를 찾는다.
+#
+#     from finance.symbols import symbol_master
+#     symbol_master.lookup('삼성전자', 'stock')    # ('삼성전자', 'KR7005930003', '005930')
+#     symbol_master.lookup('005930', 'stock')     # 단축코드, 표준코드로도 찾을 수 있다.
+#
+# kind 는 Info.autocomplete 의 item_type 과 같다.
+# 돌려주는 값도 autocomplete 와 같은 (data-nm, data-cd, data-tp) 이다.
+# 지수는 (지수명, 계열 구분, 지수 코드) 이다. 지수 코드는 계열마다 따로 매겨지므로(코스피 '1'/'001', 코스닥 '2'/'001')
+# 계열 구분과 지수 코드를 붙인 '1001' 로 찾고, 지수 코드만 주면 계열 구분이 작은 지수를 돌려준다.
+# kind 별 목록은 처음 사용할 때 받고, 날짜가 바뀐 뒤 처음 사용할 때 다시 받는다.
+
+listings = {
+    # kind: (function code, 요청 list, (이름, 표준코드, 단축코드) field)
+    'stock': ('12005', [{'bld': 'dbms/MDC/STAT/standard/MDCSTAT01901', 'mktId': 'ALL'}],
+              ('ISU_ABBRV', 'ISU_CD', 'ISU_SRT_CD')),
+    'ETF': ('13104', [{'bld': 'dbms/MDC/STAT/standard/MDCSTAT04601', 'share': '1'}],
+            ('ISU_ABBRV', 'ISU_CD', 'ISU_SRT_CD')),
+    'ETN': ('13204', [{'bld': 'dbms/MDC/STAT/standard/MDCSTAT06701'}],
+            ('ISU_ABBRV', 'ISU_CD', 'ISU_SRT_CD')),
+    'ELW': ('13303', [{'bld': 'dbms/MDC/STAT/standard/MDCSTAT08501'}],
+            ('ISU_ABBRV', 'ISU_CD', 'ISU_SRT_CD')),
+    # 전체지수 기본정보 [11004], KRX, KOSPI, KOSDAQ, 테마 지수
+    'index': ('11004', [{'bld': 'dbms/MDC/STAT/standard/MDCSTAT00401', 'idxIndMidclssCd': division}
+                        for division in ['01', '02', '03', '04']],
+              ('IDX_NM', 'IND_TP_CD', 'IDX_IND_CD')),
+}
+# 표준코드가 없어서 (표준코드 자리의 계열 구분, 단축코드) 로 종목을 구분하는 kind
+composite_kinds = ['index']
+
+
+def today():
+    return datetime.now().strftime('%Y%m%d')
+
+
+def fetch_listing(kind):
+    """ :return: [(이름, 표준코드, 단축코드)] """
+    # data_reader_ 가 get_requested_data -> Info 를 거쳐 이 module 을 import 하므로 여기서 import 한다.
+    from finance.data_reader_ import get_krx_data
+    _, requests, fields = listings[kind]
+    symbols = []
+    for requested_data in requests:
+        requested_data = dict(requested_data, **{'MIME Type': 'application/x-www-form-urlencoded; charset=UTF-8',
+                                                 'csvxls_isNo': 'false'})
+        columns = list(get_krx_data(requested_data, columnar=True).values())[0]
+        if not columns:
+            continue
+        symbols.extend(zip(*[columns[field] for field in fields]))
+    return symbols
+
+
+class SymbolTable:
+    def __init__(self, entries=None, date=None, composite=False):
+        """
+        :param entries: {key: [이름, 표준코드, 단축코드, 마지막으로 목록에 있었던 날짜]}, key 는 self.key 참고
+        :param date: 마지막으로 목록을 받은 날짜
+        :param composite: True 이면 표준코드 자리의 값(지수의 계열 구분)이 여러 종목에 같으므로
+            (표준코드, 단축코드) 로 종목을 구분한다. (composite_kinds 참고)
+        """
+        self.composite = composite
+        # 예전 형식으로 저장된 목록도 읽을 수 있도록 key 는 값으로 다시 만든다.
+        self.entries = {} if entries is None else {self.key(entry[1], entry[2]): entry for entry in entries.values()}
+        self.date = date
+        self.build()
+
+    def key(self, isin, code):
+        return f'{isin}/{code}' if self.composite else isin
+
+    def build(self):
+        by_name = {}
+        by_code = {}
+        # 상장폐지 등으로 목록에서 빠진 종목도 남겨두되, 이름이나 코드가 겹치면 최근 목록에 있는 종목을 사용한다.
+        entries = sorted(self.entries.values(), key=lambda entry: entry[3])
+        for name, isin, code, seen in entries:
+            by_name[name] = (name, isin, code)
+            if self.composite:
+                by_code[f'{isin}{code}'] = (name, isin, code)
+            else:
+                by_code[code] = (name, isin, code)
+                by_code[isin] = (name, isin, code)
+        if self.composite:
+            # 단축코드만으로 찾으면 최근 목록에 있는 것 중 계열 구분이 작은 종목을 사용한다.
+            entries = sorted(entries, key=lambda entry: entry[1])
+            for name, isin, code, seen in sorted(entries, key=lambda entry: entry[3], reverse=True):
+                by_code.setdefault(code, (name, isin, code))
+        # 다른 thread 가 찾는 중일 수 있으므로 다 만든 뒤에 바꾼다.
+        self.by_name = by_name
+        self.by_code = by_code
+
+    def merge(self, symbols, date):
+        for name, isin, code in symbols:
+            self.entries[self.key(isin, code)] = [name, isin, code, date]
+        self.date = date
+        self.build()
+
+    def lookup(self, item):
+        item = str(item)
+        symbol = self.by_name.get(item)
+        if symbol is None:
+            symbol = self.by_code.get(item)
+        return symbol
+
+
+class SymbolMaster:
+    def __init__(self, path=None, retry_after=60 * 10):
+        """
+        :param path: 저장 경로, default 값은 default_cache_dir()/symbols
+        :param retry_after: 목록을 받지 못했을 때 다시 시도하기까지 기다리는 시간(초), 그동안은 저장된 목록을 사용한다.
+        """
+        self.path = os.path.join(default_cache_dir(), 'symbols') if path is None else path
+        self.retry_after = retry_after
+        self.enabled = True
+        self._tables = {}
+        self._failed_at = {}
+        self._lock = threading.Lock()
+        self._refresh_locks = {kind: threading.Lock() for kind in listings}
+
+    def lookup(self, item, kind):
+        """
+        :return: (이름, 표준코드, 단축코드), 목록에 없거나 kind 의 목록을 만들 수 없으면 None
+        """
+        if not self.enabled or item is None or kind not in listings:
+            return None
+        table = self.table(kind)
+        if table is None:
+            return None
+        return table.lookup(item)
+
+    def loaded(self, kind):
+        """ 목록을 받지 않고 메모리나 디스크에 있는 kind 의 목록만 돌려준다. 없거나 사용하지 않으면 None """
+        if not self.enabled:
+            return None
+        return self._load(kind)
+
+    def table(self, kind):
+        table = self._load(kind)
+        if not self._stale(kind, table):
+            return table
+        # 같은 kind 의 목록은 한 번만 받는다.
+        with self._refresh_locks[kind]:
+            table = self._load(kind)
+            if not self._stale(kind, table):
+                return table
+            return self.refresh(kind)
+
+    def _stale(self, kind, table):
+        if table is not None and table.date == today():
+            return False
+        return time.time() - self._failed_at.get(kind, 0) > self.retry_after
+
+    def refresh(self, kind):
+        """ kind 의 목록을 받아서 저장된 목록에 합친다. 실패하면 저장된 목록을 그대로 사용한다. """
+        table = self._load(kind)
+        try:
+            with metrics.stage('symbol_master'):
+                symbols = fetch_listing(kind)
+        except Exception as e:
+            logging.getLogger('log').info(f'\tsymbol master:\t{kind}\nerror:\t{e}')
+            symbols = None
+        if not symbols:
+            self._failed_at[kind] = time.time()
+            return table
+        self._failed_at.pop(kind, None)
+        if table is None:
+            table = SymbolTable(composite=kind in composite_kinds)
+        table.merge(symbols, today())
+        with self._lock:
+            self._tables[kind] = table
+        self._write(kind, table)
+        return table
+
+    def invalidate(self, kind=None):
+        """ kind 가 None 이면 전부 지운다. """
+        kinds = list(listings) if kind is None else [kind]
+        with self._lock:
+            for kind in kinds:
+                self._tables.pop(kind, None)
+                self._failed_at.pop(kind, None)
+        for kind in kinds:
+            try:
+                os.remove(os.path.join(self.path, f'{kind}.json'))
+            except OSError:
+                pass
+
+    def _load(self, kind):
+        with self._lock:
+            table = self._tables.get(kind)
+        if table is not None:
+            return table
+        table = self._read(kind)
+        if table is not None:
+            with self._lock:
+                table = self._tables.setdefault(kind, table)
+        return table
+
+    def _read(self, kind):
+        try:
+            with open(os.path.join(self.path, f'{kind}.json'), encoding='utf-8') as f:
+                entry = json.load(f)
+            return SymbolTable(entry['entries'], entry['date'], composite=kind in composite_kinds)
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _write(self, kind, table):
+        content = json.dumps({'date': table.date, 'entries': table.entries}, ensure_ascii=False).encode('utf-8')
+        write_file(os.path.join(self.path, f'{kind}.json'), content)
+
+
+symbol_master = SymbolMaster()
+
+
+def lookup(item, kind):
+    """ symbol_master 를 사용하지 않을 때는 목록을 받아서 찾는다. """
+    if symbol_master.enabled:
+        return symbol_master.lookup(item, kind)
+    table = SymbolTable(composite=kind in composite_kinds)
+    table.merge(fetch_listing(kind), today())
+    return table.lookup(item)
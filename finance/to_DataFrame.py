@@ -1,7 +1,12 @@
 # -*- coding: utf-8 -*-
+import re
+import contextvars
+
 import pandas as pd
 import numpy as np
-from datetime import datetime
+
+from finance.exceptions import NoDataError
+from finance.json_decoder import is_columnar, n_rows
 
 second_column_map = {
     'BND_CLSS_NM1': '구분1',  # <- row map
@@ -16,17 +21,18 @@ no_display_columns = ['IND_TP_CD', 'IDX_IND_CD', 'MKT_ID',
 
 
 class GettingDataNm:
-    _data_nm = None
+    # thread, asyncio task 마다 따로 저장되어야 동시에 요청해도 종목명이 섞이지 않는다.
+    _data_nm = contextvars.ContextVar('data_nm', default=None)
 
     @property
     def data_nm(self):
-        item_name = GettingDataNm._data_nm
-        GettingDataNm._data_nm = None
+        item_name = GettingDataNm._data_nm.get()
+        GettingDataNm._data_nm.set(None)
         return item_name
 
     @data_nm.setter
     def data_nm(self, item_name):
-        GettingDataNm._data_nm = item_name
+        GettingDataNm._data_nm.set(item_name)
 
 
 def data_nm_column(data):
@@ -38,7 +44,12 @@ def data_nm_column(data):
     return data
 
 
-def to_DataFrame(krx_data, column_map):
+def to_DataFrame(krx_data, column_map, compact=False):
+    """
+    :param compact: True 이면 반복되는 문자열 column 은 category 로, 정수 값만 있는 column 은 int64 로 바꾼다.
+        'float32' 이면 나머지 float column 도 float32 로 바꾼다. (compact_DataFrame 참고)
+    """
+    check_compact(compact)
     check_data_validation(krx_data)
     column_map.update(second_column_map)
     data = apply_column_map(krx_data, column_map)
@@ -51,43 +62,95 @@ def to_DataFrame(krx_data, column_map):
         data.columns = columns
     data = string_to_float(data)
     data = data_nm_column(data)
+    if compact:
+        data = compact_DataFrame(data, float32=compact == 'float32')
     return data
 
 
 def check_data_validation(krx_data):
-    if len(list(krx_data.values())[0]) == 0:
-        raise Exception("No data, Check parameters")
+    if n_rows(list(krx_data.values())[0]) == 0:
+        raise NoDataError("No data, Check parameters")
 
 
 def apply_column_map(data_json, column_map):
-    readable_column_list = []
     data_list = list(data_json.values())[0]
+    if is_columnar(data_list):
+        return apply_column_map_to_columns(data_list, column_map)
+    if not data_list:
+        return pd.DataFrame()
+    # 모든 row 는 같은 key 를 가지므로 첫 row 의 key 로 어떤 column 을 남기고 어떻게 바꿀지 한 번만 정한다.
+    plan = column_plan(data_list[0].keys(), column_map)
+    data = pd.DataFrame.from_records(data_list, columns=[column for column, _ in plan])
+    data.columns = [name for _, name in plan]
+    return data
+
+
+def apply_column_map_to_columns(columns, column_map):
+    # json_decoder 로 읽은 {column: [values]} 는 row 를 거치지 않고 바로 DataFrame 으로 만든다.
+    plan = column_plan(columns.keys(), column_map)
+    return pd.DataFrame({name: columns[column] for column, name in plan})
+
+
+def column_plan(columns, column_map):
+    """
+    :return: [(응답의 column, 바꿀 이름)], 표시하지 않는 column 은 제외한다.
+        여러 column 이 같은 이름으로 바뀌면 처음 나온 자리에 마지막 column 의 값을 사용한다.
+    """
+    plan = {}
+    for column in columns:
+        if column in column_map:
+            name = column_map[column]
+        elif column in no_display_columns or 'TP_CD' in column:
+            continue
+        else:
+            name = column
+        # dict 는 처음 넣은 순서를 유지한다.
+        plan[name] = column
+    return [(column, name) for name, column in plan.items()]
+
 
-    for data in data_list:
-        readable_column = {}
-        for column, data_value in data.items():
-            try:
-                readable_column[column_map[column]] = data_value
-            except:
-                if column in no_display_columns or 'TP_CD' in column:
-                    continue
-                else:
-                    readable_column[column] = data_value
-        readable_column_list.append(readable_column)
-    return pd.json_normalize(readable_column_list)
+# index 로 사용할 날짜 column 과 KRX 의 날짜 표기
+date_columns = ['일자', '년월']
+date_formats = [
+    (re.compile(r'\d{4}/\d{2}/\d{2}'), '%Y/%m/%d'),
+    # 월별 데이터 [12004], [17105]
+    (re.compile(r'\d{4}/\d{2}'), '%Y/%m'),
+    (re.compile(r'\d{8}'), '%Y%m%d'),
+    (re.compile(r'\d{6}'), '%Y%m'),
+]
 
 
 def date_to_index(data):
-    if '일자' not in data.columns:
-        # '일자' 열이 있는지 확인
+    date_column = None
+    for column in date_columns:
+        if column in data.columns:
+            date_column = column
+            break
+    if date_column is None or len(data) == 0:
         return data
-    if len(data) != len(set(data['일자'].values)):
-        # '일자' 가 중복되는 데이터인지 확인
+    dates = data[date_column]
+    if not dates.is_unique:
+        # 날짜가 중복되는 데이터인지 확인
         return data
+    date_format = find_date_format(dates.iloc[0])
+    if date_format is None:
+        return data
+    try:
+        index = pd.DatetimeIndex(pd.to_datetime(dates.to_numpy(), format=date_format))
+    except (ValueError, TypeError):
+        return data
+    data = data.drop([date_column], axis='columns')
+    data.index = index
+    return data
 
-    date_list = [datetime.strptime(date, '%Y/%m/%d') for date in data['일자']]
-    data.index = date_list
-    return data.drop(['일자'], axis='columns')
+
+def find_date_format(value):
+    if not isinstance(value, str):
+        return None
+    for pattern, date_format in date_formats:
+        if pattern.fullmatch(value):
+            return date_format
+    return None
 
 
 def single_column(columns_depth):
@@ -116,27 +179,70 @@ def multi_columnize(column_data, columns_depth):
 
 
 def string_to_float(data):
-    new_values = []
-    for column in data.columns:
-        series = data[column]
-        edited_values = []
-        number_data = True
-        for i in series:
-            try:
-                value = float(i.replace(',', ''))
-            except:
-                if i != '-':
-                    number_data = False
-                    break
-                else:
-                    value = np.nan
-            edited_values.append(value)
-        if number_data:
-            new_values.append(edited_values)
-        else:
-            new_values.append(series.array)
-
-    return pd.DataFrame(np.array(new_values).T, columns=data.columns, index=data.index)
-
-
-
+    # column 별로 한 번에 변환한다. 숫자로 바뀌지 않는 column 과 문자열이 아닌 column 은 dtype 을 그대로 둔다.
+    columns = {i: column_to_float(series) for i, (_, series) in enumerate(data.items())}
+    result = pd.DataFrame(columns, index=data.index)
+    result.columns = data.columns
+    return result
+
+
+def column_to_float(series):
+    # '1,000' -> 1000.0, '-' -> NaN
+    if not pd.api.types.is_string_dtype(series.dtype):
+        return series.array
+    values = series.tolist()
+    try:
+        # 한 column 의 값을 하나의 문자열로 이어서 ',' 를 한 번에 지운다.
+        # 문자열이 아닌 값(None, NaN 등)이 있으면 TypeError 가 발생한다.
+        stripped = '\n'.join(values).replace(',', '').split('\n')
+    except TypeError:
+        return series.array
+    if len(stripped) != len(values):
+        # 값 안에 '\n' 이 있는 경우
+        stripped = [value.replace(',', '') for value in values]
+    stripped = np.array(stripped, dtype=object)
+    stripped[stripped == '-'] = np.nan
+    try:
+        # float() 로 변환되지 않는 값이 있으면 그 자리에서 ValueError 가 발생한다.
+        return stripped.astype(np.float64)
+    except ValueError:
+        return series.array
+
+
+# 서로 다른 값의 수가 row 수의 category_ratio 이하인 문자열 column 은 category 로 바꾼다.
+category_ratio = 0.5
+compacts = [False, True, 'float32']
+
+
+def check_compact(compact):
+    if compact not in compacts:
+        raise ValueError(f'compact 는 {compacts} 중 하나여야 합니다. : {compact}')
+
+
+def compact_DataFrame(data, float32=False):
+    """
+    메모리를 적게 쓰는 dtype 으로 바꾼다. 바꾸기 전과 후의 메모리 사용량(bytes)은 data.attrs['memory_usage'] 에 있다.
+        문자열 column : 종목명, 시장구분, 소속부처럼 같은 값이 반복되면 category
+        float column : 값이 모두 정수이면 int64, float32 가 True 이면 나머지는 float32
+    """
+    before = data.memory_usage(deep=True).sum()
+    columns = {i: compact_column(series, float32) for i, (_, series) in enumerate(data.items())}
+    result = pd.DataFrame(columns, index=data.index)
+    result.columns = data.columns
+    after = result.memory_usage(deep=True).sum()
+    result.attrs['memory_usage'] = {'before': int(before), 'after': int(after), 'saved': int(before - after)}
+    return result
+
+
+def compact_column(series, float32=False):
+    if pd.api.types.is_string_dtype(series.dtype) and not isinstance(series.dtype, pd.CategoricalDtype):
+        if series.nunique(dropna=False) <= len(series) * category_ratio:
+            return series.astype('category').array
+        return series.array
+    if series.dtype == np.float64:
+        values = series.to_numpy()
+        if np.isfinite(values).all() and (values == np.round(values)).all() and np.abs(values).max(initial=0) < 2 ** 53:
+            return values.astype(np.int64)
+        if float32:
+            return values.astype(np.float32)
+    return series.array
@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+"""
+getJsonData.cmd 응답을 pandas 를 거치지 않고 pyarrow.Table 또는 polars.DataFrame 으로 바꾼다.
+to_DataFrame 과 같은 column 이름, 숫자 변환, 날짜 변환을 사용하고, 다른 점은 아래와 같다.
+    '상위//하위' column 은 MultiIndex 대신 separator 로 이어 붙인 하나의 이름이 된다. ex) '기초지수_종가'
+    날짜 column(일자, 년월)은 index 가 아닌 date32 column 으로 남는다.
+"""
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:
+    pa = None
+    pc = None
+
+try:
+    import polars as pl
+except ImportError:
+    pl = None
+
+from finance.json_decoder import is_columnar, rows_to_columns
+from finance.to_DataFrame import (GettingDataNm, second_column_map, check_data_validation, column_plan,
+                                  date_columns, find_date_format, check_compact)
+
+outputs = ['pandas', 'arrow', 'polars']
+# '상위//하위' column 이름을 이어 붙일 때 사용한다.
+column_separator = '_'
+
+
+def check_output(output, compact=False):
+    if output not in outputs:
+        raise ValueError(f'output 은 {outputs} 중 하나여야 합니다. : {output}')
+    check_compact(compact)
+    # compact 는 pandas dtype 을 바꾸는 것이므로 arrow, polars 에는 적용되지 않는다.
+    if compact and output != 'pandas':
+        raise ValueError(f"compact 는 output='pandas' 에서만 사용할 수 있습니다. : output='{output}'")
+    if output in ['arrow', 'polars'] and pa is None:
+        raise ImportError(f"output='{output}' 을 사용하려면 pyarrow 가 필요합니다. (pip install pyarrow)")
+    if output == 'polars' and pl is None:
+        raise ImportError("output='polars' 를 사용하려면 polars 가 필요합니다. (pip install polars)")
+
+
+def to_Table(krx_data, column_map, output='arrow', separator=None):
+    check_output(output)
+    if separator is None:
+        separator = column_separator
+    check_data_validation(krx_data)
+    column_map.update(second_column_map)
+    block = list(krx_data.values())[0]
+    if not is_columnar(block):
+        block = list(rows_to_columns(krx_data).values())[0]
+
+    names = []
+    arrays = []
+    for column, name in column_plan(block.keys(), column_map):
+        array = to_array(block[column])
+        if name in date_columns:
+            array = column_to_date(array)
+        else:
+            array = column_to_float(array)
+        names.append(flatten_column_name(name, separator))
+        arrays.append(array)
+
+    item_name = GettingDataNm().data_nm
+    # 응답에 이미 종목명 column 이 있으면 같은 이름의 column 을 하나 더 만들지 않는다.
+    if item_name is not None and '종목명' not in names:
+        names.append('종목명')
+        arrays.append(pa.array([item_name] * len(arrays[0]), pa.string()))
+
+    table = pa.Table.from_arrays(arrays, names=names)
+    if output == 'polars':
+        # arrow buffer 를 그대로 사용하므로 복사하지 않는다.
+        return pl.from_arrow(table)
+    return table
+
+
+def to_array(values):
+    try:
+        return pa.array(values)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        # 문자열과 숫자가 섞인 column
+        return pa.array([None if value is None else str(value) for value in values], pa.string())
+
+
+def flatten_column_name(name, separator):
+    return separator.join([level for level in name.split('//') if level])
+
+
+def column_to_date(array):
+    if not pa.types.is_string(array.type) or len(array) == 0:
+        return array
+    date_format = find_date_format(array[0].as_py())
+    if date_format is None:
+        return array
+    try:
+        return pc.cast(pc.strptime(array, format=date_format, unit='s'), pa.date32())
+    except pa.ArrowInvalid:
+        return array
+
+
+def column_to_float(array):
+    # '1,000' -> 1000.0, '-' -> null, 숫자로 바뀌지 않는 column 은 그대로 둔다.
+    if not pa.types.is_string(array.type):
+        return array
+    stripped = pc.replace_substring(array, ',', '')
+    stripped = pc.if_else(pc.equal(stripped, '-'), pa.scalar(None, pa.string()), stripped)
+    try:
+        return pc.cast(stripped, pa.float64())
+    except pa.ArrowInvalid:
+        return array
+
+
+def replace_substring(data, column, pattern, replacement=''):
+    """ pandas.DataFrame, pyarrow.Table, polars.DataFrame 의 문자열 column 에서 pattern 을 replacement 로 바꾼다. """
+    if pa is not None and isinstance(data, pa.Table):
+        i = data.schema.get_field_index(column)
+        return data.set_column(i, column, pc.replace_substring(data[column], pattern, replacement))
+    if pl is not None and isinstance(data, pl.DataFrame):
+        return data.with_columns(pl.col(column).str.replace_all(pattern, replacement, literal=True))
+    data[column] = [value.replace(pattern, replacement) for value in data[column]]
+    return data
+
+
+def concat(tables):
+    """ to_Table 또는 to_DataFrame 의 결과들을 이어 붙인다. column 이 다르면 빈 값으로 채운다. """
+    if pa is not None and isinstance(tables[0], pa.Table):
+        return pa.concat_tables(tables, promote_options='default')
+    if pl is not None and isinstance(tables[0], pl.DataFrame):
+        return pl.concat(tables, how='diagonal_relaxed')
+    return pd.concat(tables, ignore_index=True)
+
+
+def copy(data):
+    # pyarrow.Table 은 바꿀 수 없으므로 복사하지 않는다.
+    if pa is not None and isinstance(data, pa.Table):
+        return data
+    if pl is not None and isinstance(data, pl.DataFrame):
+        return data.clone()
+    return data.copy()
@@ -1,13 +1,17 @@
 # -*- coding: utf-8 -*-
-import pandas as pd
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
 
-from finance.data_reader_ import data_reader
+from finance.data_reader_ import data_reader, data_reader_many
 from finance import utils
+from finance.symbols import symbol_master
+from finance.statistics.basic.info import Info
+from finance.to_Table import replace_substring, concat
 from finance.log.log import Log
 
 
 @Log.info
-def get(stock="all", start=None, end=None):
+def get(stock="all", start=None, end=None, output='pandas'):
     """
     코스피(KOSPI), 코스닥(KOSDAQ), 코넥스(KONEX)에 상장되어 있는 종목들에 대한 가격 데이터를 반환한다.
     Parameters
@@ -18,22 +22,115 @@ def get(stock="all", start=None, end=None):
         검색 시작일, default 값은 오늘로부터 60일 이전
     end : int, string
         검색 종료일, default 값은 오늘
+    output : string
+        'pandas' 이면 DataFrame, 'arrow' 이면 pyarrow.Table, 'polars' 이면 polars.DataFrame 을 반환한다.
 
     Returns : DataFrame
     -------
     """
     utils.start_end_validation(start, end)
     if stock == "all":
-        return data_reader("12001", market="전체", day=start)
+        return data_reader("12001", market="전체", day=start, output=output)
     else:
         if utils.classifier(stock) == "item code":
-            return data_reader("12003", start=start, end=end, item_code=stock)
+            return data_reader("12003", start=start, end=end, item_code=stock, output=output)
         else:
-            return data_reader("12003", start=start, end=end, item=stock)
+            return data_reader("12003", start=start, end=end, item=stock, output=output)
+
+
+def get_many(stocks, start=None, end=None, max_workers=8, output='pandas'):
+    """
+    여러 종목의 가격 데이터를 동시에 요청한다.
+    Parameters
+    ----------
+    stocks : list
+        종목명 또는 종목코드의 list
+    start : int, string
+        검색 시작일, default 값은 오늘로부터 60일 이전
+    end : int, string
+        검색 종료일, default 값은 오늘
+    max_workers : int
+        동시에 실행할 요청 수
+    output : string
+        'pandas' 이면 DataFrame, 'arrow' 이면 pyarrow.Table, 'polars' 이면 polars.DataFrame 을 반환한다.
+
+    Returns : list
+        stocks 와 같은 순서의 DataFrame list. 실패한 종목의 자리에는 발생한 Exception 이 들어간다.
+    -------
+    """
+    utils.start_end_validation(start, end)
+    requests = []
+    for stock in stocks:
+        if utils.classifier(stock) == "item code":
+            requests.append(("12003", {'start': start, 'end': end, 'item_code': stock, 'output': output}))
+        else:
+            requests.append(("12003", {'start': start, 'end': end, 'item': stock, 'output': output}))
+    return data_reader_many(requests, max_workers)
+
+
+# kind 를 정하지 않았을 때 찾아볼 종류, 앞에 있는 종류를 먼저 사용한다.
+resolve_kinds = ['stock', 'ETF', 'ETN', 'ELW', 'index']
+
+
+def resolve(items, kind=None, max_workers=8):
+    """
+    여러 종목명 또는 종목코드를 한 번에 (종목명, 표준코드, 단축코드, 종류)로 바꾼다.
+    종목 목록(finance.symbols)에서 먼저 찾고, 없는 것만 autocomplete.jspx 로 동시에 찾는다. 같은 값은 한 번만 찾는다.
+    Parameters
+    ----------
+    items : list
+        종목명 또는 종목코드의 list
+    kind : string
+        'stock', 'ETF', 'ETN', 'ELW', 'index' 등 Info.autocomplete 의 item_type.
+        default 값은 None 이며 resolve_kinds 의 종류를 모두 찾아본다.
+    max_workers : int
+        동시에 실행할 autocomplete 요청 수
+
+    Returns : list
+        items 와 같은 순서의 list. 찾지 못한 종목의 자리에는 발생한 Exception 이 들어간다.
+    -------
+    """
+    kinds = resolve_kinds if kind is None else [kind]
+    items = [str(item) for item in items]
+    resolved = {}
+    for item in dict.fromkeys(items):
+        for k in kinds:
+            symbol = symbol_master.lookup(item, k)
+            if symbol is not None:
+                resolved[item] = symbol + (k,)
+                break
+
+    misses = [item for item in dict.fromkeys(items) if item not in resolved]
+    if misses:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            # autocomplete 가 GettingDataNm 에 남기는 종목명이 호출한 쪽으로 넘어오지 않도록 context 를 복사해서 실행한다.
+            futures = {(item, k): executor.submit(contextvars.copy_context().run,
+                                                  Info(None, None, None).autocomplete, item, k)
+                       for item in misses for k in kinds}
+        for item in misses:
+            resolved[item] = pick_autocomplete_result(item, kinds, futures)
+    return [resolved[item] for item in items]
+
+
+def pick_autocomplete_result(item, kinds, futures):
+    # 이름이나 단축코드가 같은 결과를 먼저 사용하고, 없으면 앞에 있는 종류의 결과를 사용한다.
+    results = []
+    error = None
+    for k in kinds:
+        try:
+            results.append(futures[(item, k)].result() + (k,))
+        except Exception as e:
+            error = e
+    for result in results:
+        if item in (result[0], result[2]):
+            return result
+    if results:
+        return results[0]
+    return error
 
 
 @Log.info
-def per(stock="all", start=None, end=None):
+def per(stock="all", start=None, end=None, output='pandas'):
     """
     코스피(KOSPI), 코스닥(KOSDAQ), 코넥스(KONEX)에 상장되어 있는 종목들에 대한
     PER/EPS/PBS/BPS/주당배당금/배당수익률 데이터를 반환한다.
@@ -45,25 +142,26 @@ def per(stock="all", start=None, end=None):
         검색 시작일, default 값은 오늘로부터 60일 이전
     end : int, string
         검색 종료일, default 값은 오늘
+    output : string
+        'pandas' 이면 DataFrame, 'arrow' 이면 pyarrow.Table, 'polars' 이면 polars.DataFrame 을 반환한다.
 
     Returns : DataFrame
     -------
     """
     utils.start_end_validation(start, end)
     if stock == "all":
-        data = data_reader("12021", search_type="전종목", market="전체", day=start)
+        data = data_reader("12021", search_type="전종목", market="전체", day=start, output=output)
         #  12021 종목명 데이터에 아래와 같은 문자열이 함께 출력됨.
-        data["종목명"] = [name.replace("<em class =\"up\"></em>", "") for name in data["종목명"]]
-        return data
+        return replace_substring(data, "종목명", "<em class =\"up\"></em>")
     else:
         if utils.classifier(stock) == "item code":
-            return data_reader("12021", search_type="개별추이", item_code=stock, start=start, end=end)
+            return data_reader("12021", search_type="개별추이", item_code=stock, start=start, end=end, output=output)
         else:
-            return data_reader("12021", search_type="개별추이", item=stock, start=start, end=end)
+            return data_reader("12021", search_type="개별추이", item=stock, start=start, end=end, output=output)
 
 
 @Log.info
-def etf(item="all", start=None, end=None):
+def etf(item="all", start=None, end=None, output='pandas'):
     """
     Parameters
     ----------
@@ -73,22 +171,24 @@ def etf(item="all", start=None, end=None):
         검색 시작일, default 값은 오늘로부터 60일 이전
     end : int, string
         검색 종료일, default 값은 오늘
+    output : string
+        'pandas' 이면 DataFrame, 'arrow' 이면 pyarrow.Table, 'polars' 이면 polars.DataFrame 을 반환한다.
 
     Returns : DataFrame
     -------
     """
     utils.start_end_validation(start, end)
     if item == "all":
-        return data_reader("13101")
+        return data_reader("13101", output=output)
     else:
         if utils.classifier(item) == "item code":
-            return data_reader("13103", item_code=item, start=start, end=end)
+            return data_reader("13103", item_code=item, start=start, end=end, output=output)
         else:
-            return data_reader("13103", item=item, start=start, end=end)
+            return data_reader("13103", item=item, start=start, end=end, output=output)
 
 
 @Log.info
-def etn(item="all", start=None, end=None):
+def etn(item="all", start=None, end=None, output='pandas'):
     """
     Parameters
     ----------
@@ -98,22 +198,24 @@ def etn(item="all", start=None, end=None):
         검색 시작일, default 값은 오늘로부터 60일 이전
     end : int, string
         검색 종료일, default 값은 오늘
+    output : string
+        'pandas' 이면 DataFrame, 'arrow' 이면 pyarrow.Table, 'polars' 이면 polars.DataFrame 을 반환한다.
 
     Returns : DataFrame
     -------
     """
     utils.start_end_validation(start, end)
     if item == "all":
-        return data_reader("13201")
+        return data_reader("13201", output=output)
     else:
         if utils.classifier(item) == "item code":
-            return data_reader("13203", item_code=item, start=start, end=end)
+            return data_reader("13203", item_code=item, start=start, end=end, output=output)
         else:
-            return data_reader("13203", item=item, start=start, end=end)
+            return data_reader("13203", item=item, start=start, end=end, output=output)
 
 
 @Log.info
-def elw(item="all", start=None, end=None):
+def elw(item="all", start=None, end=None, output='pandas'):
     """
     Parameters
     ----------
@@ -123,22 +225,24 @@ def elw(item="all", start=None, end=None):
         검색 시작일, default 값은 오늘로부터 60일 이전
     end : int, string
         검색 종료일, default 값은 오늘
+    output : string
+        'pandas' 이면 DataFrame, 'arrow' 이면 pyarrow.Table, 'polars' 이면 polars.DataFrame 을 반환한다.
 
     Returns : DataFrame
     -------
     """
     utils.start_end_validation(start, end)
     if item == "all":
-        return data_reader("13301")
+        return data_reader("13301", output=output)
     else:
         if utils.classifier(item, "elw") == "item code":
-            return data_reader("13302", item_code=item, start=start, end=end)
+            return data_reader("13302", item_code=item, start=start, end=end, output=output)
         else:
-            return data_reader("13302", item=item, start=start, end=end)
+            return data_reader("13302", item=item, start=start, end=end, output=output)
 
 
 @Log.info
-def bond(item="all", start=None, end=None):
+def bond(item="all", start=None, end=None, output='pandas'):
     """
     Parameters
     ----------
@@ -148,16 +252,18 @@ def bond(item="all", start=None, end=None):
         검색 시작일, default 값은 오늘로부터 60일 이전
     end : int, string
         검색 종료일, default 값은 오늘
+    output : string
+        'pandas' 이면 DataFrame, 'arrow' 이면 pyarrow.Table, 'polars' 이면 polars.DataFrame 을 반환한다.
 
     Returns : DataFrame
     -------
     """
     utils.start_end_validation(start, end)
     if item == "all":
-        data1 = data_reader('14001', market='국채전문유통시장')
-        data2 = data_reader('14001', market='일반채권시장')
-        data3 = data_reader('14001', market='소액채권시장')
-        return pd.concat([data1, data2, data3], ignore_index=True)
+        data1 = data_reader('14001', market='국채전문유통시장', output=output)
+        data2 = data_reader('14001', market='일반채권시장', output=output)
+        data3 = data_reader('14001', market='소액채권시장', output=output)
+        return concat([data1, data2, data3])
     else:
         pass
 
@@ -0,0 +1,14 @@
+import pytest
+
+from finance import session
+
+
+@pytest.fixture(autouse=True)
+def reset_session():
+    # 앞선 테스트에서 열린 circuit breaker 나 바꾼 session.config 가 다음 테스트에 영향을 주지 않도록 되돌린다.
+    config = dict(session.config)
+    session.reset_breakers()
+    yield
+    session.config.clear()
+    session.config.update(config)
+    session.reset_breakers()
@@ -0,0 +1,240 @@
+# -*- coding: utf-8 -*-
+"""
+data.krx.co.kr 대신 사용하는 로컬 HTTP 서버.
+녹화해둔 응답(corpus)을 돌려주며, 응답 지연(latency)과 에러(5xx, JSON 대신 HTML)를 일부러 만들 수 있다.
+네트워크 없이 data_reader 전체를 테스트하거나 벤치마크할 때 사용한다.
+
+    from finance import session
+    from test.krx_server import KrxServer
+
+    with KrxServer(latency=0.05, error_rate=0.1) as server:
+        session.configure(base_url=server.url)
+        finance.data_reader('15001', day='20210430', item='코스피200 선물', market='전체')
+
+corpus 에 없는 요청은 upstream 을 주면 실제 KRX 에 요청해서 녹화하고, 없으면 404 를 돌려준다.
+
+    python -m test.krx_server --record-corpus    # representative_requests 를 녹화
+    python -m test.krx_server --record           # 녹화 서버 실행, 다른 터미널에서 base_url 을 바꿔 data_reader 실행
+    python -m test.krx_server --latency 0.05     # 재생 서버 실행
+"""
+import time
+import random
+import argparse
+import threading
+from collections import Counter
+from urllib.parse import urlsplit, parse_qsl
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+# Corpus 는 benchmark 에서도 사용하므로 benchmark.corpus 에 있다.
+from benchmark.corpus import Corpus, json_data_path
+
+krx_url = 'http://data.krx.co.kr'
+
+# record_corpus 의 default 요청, finance.tools 의 함수들이 사용하는 function code 와 같다.
+representative_requests = [
+    ('11003', {'start': '20180102', 'end': '20210430', 'item': '코스피 200'}),
+    ('12001', {'market': '전체', 'day': '20210430'}),
+    ('12003', {'start': '20180102', 'end': '20210430', 'item': '삼성전자'}),
+    ('12008', {'search_type': '기간합계', 'market': '전체', 'addition_item': ['ETF'],
+               'start': '20210401', 'end': '20210430'}),
+    ('12021', {'search_type': '전종목', 'market': '전체', 'day': '20210430'}),
+    ('12021', {'search_type': '개별추이', 'item': '삼성전자', 'start': '20200102', 'end': '20210430'}),
+    ('13101', {'day': '20210430'}),
+    ('13103', {'item': 'KODEX 200', 'start': '20200102', 'end': '20210430'}),
+    ('13201', {'day': '20210430'}),
+    ('13301', {'day': '20210430'}),
+    ('14001', {'market': '국채전문유통시장', 'day': '20210430'}),
+    ('15001', {'day': '20210430', 'item': '코스피200 선물', 'market': '전체'}),
+]
+
+# JSON 대신 HTML 이 오는 경우를 흉내낸다.
+html_error_page = '<!DOCTYPE html>\n<html><head><title>error</title></head><body>잠시 후 다시 시도해 주세요.</body></html>'
+
+
+class KrxServer:
+    def __init__(self, corpus=None, host='127.0.0.1', port=0, latency=0, error_rate=0, error_status=503,
+                 html_error_rate=0, truncate_rate=0, strict=False, upstream=None, seed=None):
+        """
+        Parameters
+        ----------
+        corpus : Corpus, str
+            Corpus 또는 corpus 경로, default 값은 test/corpus
+        port : int
+            0 이면 빈 port 를 사용한다. 실제 주소는 url 속성에 있다.
+        latency : float, tuple
+            응답 전에 기다리는 시간(초), (min, max) 이면 그 사이에서 무작위로 기다린다.
+        error_rate : float
+            error_status 로 응답하는 비율
+        html_error_rate : float
+            getJsonData.cmd 요청에 200 과 HTML 에러 페이지로 응답하는 비율
+        truncate_rate : float
+            getJsonData.cmd 요청에 Content-Length 보다 짧은 body 를 보내고 연결을 끊는 비율
+        strict : bool
+            Corpus.find 참고
+        upstream : str
+            corpus 에 없는 요청을 보낼 주소. ex) 'http://data.krx.co.kr' 받은 응답은 corpus 에 저장한다.
+        seed : int
+            에러를 재현할 수 있도록 random seed 를 정한다.
+        """
+        self.corpus = corpus if isinstance(corpus, Corpus) else Corpus(corpus)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.html_error_rate = html_error_rate
+        self.truncate_rate = truncate_rate
+        self.strict = strict
+        self.upstream = upstream
+        self.random = random.Random(seed)
+        # path 별 요청 수
+        self.requests = Counter()
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), make_handler(self))
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._httpd.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def respond(self, method, path, params, headers):
+        """ :return: (status, content_type, body, content_length) """
+        with self._lock:
+            self.requests[path] += 1
+            roll = self.random.random()
+            delay = self.random.uniform(*self.latency) if isinstance(self.latency, tuple) else self.latency
+        if delay:
+            time.sleep(delay)
+        if roll < self.error_rate:
+            body = html_error_page.encode('utf-8')
+            return self.error_status, 'text/html; charset=UTF-8', body, len(body)
+        if path == json_data_path and roll < self.error_rate + self.html_error_rate:
+            body = html_error_page.encode('utf-8')
+            return 200, 'text/html; charset=UTF-8', body, len(body)
+        truncated = path == json_data_path and roll < self.error_rate + self.html_error_rate + self.truncate_rate
+
+        entry = self.corpus.find(method, path, params, self.strict)
+        if entry is None and self.upstream is not None:
+            entry = self.record(method, path, params, headers)
+        if entry is None:
+            body = f'{method} {path} {params} is not in the corpus'.encode('utf-8')
+            return 404, 'text/plain; charset=UTF-8', body, len(body)
+        body = self.corpus.read_body(entry)
+        if truncated:
+            # 응답을 보내다가 연결이 끊긴 경우를 흉내낸다. Content-Length 는 원래 길이 그대로 보낸다.
+            return entry['status'], entry['content_type'], body[:len(body) // 2], len(body)
+        return entry['status'], entry['content_type'], body, len(body)
+
+    def record(self, method, path, params, headers):
+        url = self.upstream.rstrip('/') + path
+        forward_headers = {key: value for key, value in headers.items() if key.lower() in ['user-agent', 'accept']}
+        if method == 'GET':
+            r = requests.get(url, params=params, headers=forward_headers)
+        else:
+            r = requests.post(url, data=params, headers=forward_headers)
+        if r.status_code >= 500:
+            return None
+        return self.corpus.add(method, path, params, r.status_code, r.headers.get('Content-Type', ''), r.content)
+
+
+def record_corpus(requests_=None, corpus=None, upstream=krx_url):
+    """
+    requests_ 의 data_reader 요청을 녹화 서버를 거쳐 실행해서 corpus 에 저장한다. 네트워크가 필요하다.
+    :param requests_: data_reader_many 와 같은 (code, kwargs) 의 list, default 값은 representative_requests
+    :return: data_reader_many 의 결과
+    """
+    from finance import session
+    from finance.data_reader_ import data_reader_many
+    from finance.cache import metadata_cache, response_cache, resource_bundle_cache
+    from finance.statistics.basic.info import Info
+
+    # 캐시에 있는 요청도 녹화되도록 캐시를 끈다.
+    caches = [metadata_cache, response_cache, resource_bundle_cache, Info.autocomplete_cache]
+    enabled = [cache.enabled for cache in caches]
+    base_url = session.config['base_url']
+    for cache in caches:
+        cache.enabled = False
+    try:
+        with KrxServer(corpus, upstream=upstream, strict=True) as server:
+            session.configure(base_url=server.url)
+            return data_reader_many(representative_requests if requests_ is None else requests_)
+    finally:
+        session.configure(base_url=base_url)
+        for cache, e in zip(caches, enabled):
+            cache.enabled = e
+
+
+def make_handler(server):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_GET(self):
+            parts = urlsplit(self.path)
+            self.reply(server.respond('GET', parts.path, dict(parse_qsl(parts.query)), self.headers))
+
+        def do_POST(self):
+            length = int(self.headers.get('Content-Length', 0))
+            form = self.rfile.read(length).decode('utf-8')
+            self.reply(server.respond('POST', urlsplit(self.path).path, dict(parse_qsl(form)), self.headers))
+
+        def reply(self, response):
+            status, content_type, body, content_length = response
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(content_length))
+            self.end_headers()
+            self.wfile.write(body)
+            if len(body) < content_length:
+                self.close_connection = True
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='data.krx.co.kr 를 흉내내는 로컬 HTTP 서버')
+    parser.add_argument('--corpus', default=None)
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--latency', type=float, default=0)
+    parser.add_argument('--error-rate', type=float, default=0)
+    parser.add_argument('--html-error-rate', type=float, default=0)
+    parser.add_argument('--truncate-rate', type=float, default=0)
+    parser.add_argument('--strict', action='store_true')
+    parser.add_argument('--record', action='store_true', help=f'corpus 에 없는 요청을 {krx_url} 에서 받아 저장한다.')
+    parser.add_argument('--record-corpus', action='store_true', help='representative_requests 를 녹화하고 끝낸다.')
+    args = parser.parse_args()
+
+    if args.record_corpus:
+        for request, result in zip(representative_requests, record_corpus(corpus=args.corpus)):
+            print(request, 'error' if isinstance(result, Exception) else 'ok', result if isinstance(result, Exception) else '')
+        raise SystemExit
+
+    krx_server = KrxServer(args.corpus, port=args.port, latency=args.latency, error_rate=args.error_rate,
+                           html_error_rate=args.html_error_rate, truncate_rate=args.truncate_rate,
+                           strict=args.strict, upstream=krx_url if args.record else None)
+    print(f"session.configure(base_url='{krx_server.url}')")
+    try:
+        krx_server._httpd.serve_forever()
+    except KeyboardInterrupt:
+        krx_server._httpd.server_close()
@@ -0,0 +1,32 @@
+from benchmark import conversion
+from benchmark.payloads import make_universe, make_history, universe_rows
+
+
+def test_payloads():
+    assert len(make_universe()['OutBlock_1']) == universe_rows
+    history = make_history()['output']
+    assert history[0]['TRD_DD'] == '2021/04/30'
+    assert len(history) > 1000
+
+
+def test_run():
+    results = conversion.run('[item', repeat=2)
+    assert 'to_DataFrame[item]' in results
+    for result in results.values():
+        assert result['n'] == 2
+        assert result['p50_ms'] <= result['p99_ms']
+
+
+def test_compare():
+    baseline = {'a': {'p50_ms': 1.0, 'peak_kib': 10}, 'b': {'p50_ms': 1.0, 'peak_kib': 10}}
+    results = {'a': {'p50_ms': 1.1, 'peak_kib': 10}, 'b': {'p50_ms': 2.0, 'peak_kib': 10}, 'c': {'p50_ms': 1, 'peak_kib': 1}}
+    comparison = conversion.compare(results, baseline)
+    assert not comparison['a'][2]
+    assert comparison['b'][2]
+    assert 'c' not in comparison
+
+
+def test_baseline(tmp_path):
+    filename = str(tmp_path / 'baseline.json')
+    conversion.save_baseline({'a': {'p50_ms': 1.0, 'peak_kib': 10}}, filename)
+    assert conversion.load_baseline(filename) == {'a': {'p50_ms': 1.0, 'peak_kib': 10}}
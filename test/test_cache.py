@@ -0,0 +1,152 @@
+import os
+import time
+import threading
+from datetime import datetime
+
+from finance.cache import MetadataCache, ResponseCache, TTLCache, SingleFlight, is_historical
+
+
+converting_map = {'mktTpCd': {'전체': 'T', '정규': '0', '야간': '1'}}
+readable_columns = {'ISU_CD': '종목코드', 'TDD_CLSPRC': '종가'}
+
+
+def test_metadata_cache_get_set(tmp_path):
+    cache = MetadataCache(path=str(tmp_path))
+    assert cache.get('MDCSTAT12501') is None
+    cache.set('MDCSTAT12501', converting_map, readable_columns)
+    assert cache.get('MDCSTAT12501') == (converting_map, readable_columns)
+
+
+def test_metadata_cache_persistent(tmp_path):
+    MetadataCache(path=str(tmp_path)).set('MDCSTAT12501', converting_map, readable_columns)
+    assert MetadataCache(path=str(tmp_path)).get('MDCSTAT12501') == (converting_map, readable_columns)
+
+
+def test_metadata_cache_returns_copy(tmp_path):
+    cache = MetadataCache(path=str(tmp_path))
+    cache.set('MDCSTAT12501', converting_map, readable_columns)
+    cache.get('MDCSTAT12501')[1].update({'BND_CLSS_NM1': '구분1'})
+    assert cache.get('MDCSTAT12501')[1] == readable_columns
+
+
+def test_metadata_cache_ttl(tmp_path):
+    cache = MetadataCache(path=str(tmp_path), ttl=0)
+    cache.set('MDCSTAT12501', converting_map, readable_columns)
+    time.sleep(0.01)
+    assert cache.get('MDCSTAT12501') is None
+
+
+def test_metadata_cache_invalidate(tmp_path):
+    cache = MetadataCache(path=str(tmp_path))
+    cache.set('MDCSTAT12501', converting_map, readable_columns)
+    cache.set('MDCSTAT01701', converting_map, readable_columns)
+    cache.invalidate('MDCSTAT12501')
+    assert cache.get('MDCSTAT12501') is None
+    assert cache.get('MDCSTAT01701') is not None
+    cache.invalidate()
+    assert MetadataCache(path=str(tmp_path)).get('MDCSTAT01701') is None
+
+
+historical = {'bld': 'dbms/MDC/STAT/standard/MDCSTAT01701', 'strtDd': '20210101', 'endDd': '20210131'}
+krx_data = {'output': [{'TRD_DD': '2021/01/29', 'TDD_CLSPRC': '82,000'}]}
+
+
+def test_is_historical():
+    assert is_historical(historical)
+    assert not is_historical({'trdDd': datetime.now().strftime('%Y%m%d')})
+    assert not is_historical({'bld': 'dbms/MDC/STAT/standard/MDCSTAT04601'})
+
+
+def test_response_cache_historical(tmp_path):
+    cache = ResponseCache(path=str(tmp_path), ttl=0)
+    cache.set(historical, krx_data)
+    time.sleep(0.01)
+    assert cache.get(dict(reversed(list(historical.items())))) == krx_data
+    assert ResponseCache(path=str(tmp_path)).get(historical) == krx_data
+
+
+def test_response_cache_today(tmp_path):
+    cache = ResponseCache(path=str(tmp_path), ttl=0)
+    today = {'trdDd': datetime.now().strftime('%Y%m%d')}
+    cache.set(today, krx_data)
+    time.sleep(0.01)
+    assert cache.get(today) is None
+
+
+def test_response_cache_empty(tmp_path):
+    cache = ResponseCache(path=str(tmp_path), ttl=0)
+    for empty, columnar in [({'output': []}, False), ({'output': {}}, True)]:
+        cache.set(historical, empty, columnar)
+        time.sleep(0.01)
+        assert cache.get(historical, columnar) is None
+    # 디스크에도 저장하지 않는다.
+    assert os.listdir(str(tmp_path)) == []
+
+
+def test_response_cache_lru(tmp_path):
+    cache = ResponseCache(path=str(tmp_path), max_memory_entries=2, max_disk_entries=2)
+    for day in ['20210104', '20210105', '20210106']:
+        cache.set({'trdDd': day}, krx_data)
+    assert len(cache._memory) == 2
+    assert len(os.listdir(str(tmp_path))) == 2
+
+
+def test_ttl_cache():
+    cache = TTLCache(ttl=60, max_entries=2)
+    cache.set(('krx.mdc.i18n.component', 'B107.bld', 'kospi'), {'코스피200 선물': 'KRDRVFUK2I'})
+    assert cache.get(('krx.mdc.i18n.component', 'B107.bld', 'kospi')) == {'코스피200 선물': 'KRDRVFUK2I'}
+    cache.set('a', 1)
+    cache.set('b', 2)
+    assert cache.get(('krx.mdc.i18n.component', 'B107.bld', 'kospi')) is None
+    cache.ttl = -1
+    cache.set('c', 3)
+    assert cache.get('c') is None
+
+
+def test_single_flight():
+    flight = SingleFlight()
+    calls = []
+    started = threading.Event()
+    release = threading.Event()
+
+    def fetch():
+        calls.append(1)
+        started.set()
+        release.wait()
+        return 'bundle'
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(flight.do('key', fetch)))
+    leader.start()
+    started.wait()
+    followers = [threading.Thread(target=lambda: results.append(flight.do('key', fetch))) for _ in range(3)]
+    [t.start() for t in followers]
+    time.sleep(0.05)
+    release.set()
+    [t.join() for t in [leader] + followers]
+    assert results == ['bundle'] * 4
+    assert len(calls) == 1
+
+
+def test_single_flight_copy():
+    flight = SingleFlight(copy=list)
+    started = threading.Event()
+    release = threading.Event()
+    result = ['row']
+
+    def fetch():
+        started.set()
+        release.wait()
+        return result
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(flight.do('key', fetch)))
+    leader.start()
+    started.wait()
+    follower = threading.Thread(target=lambda: results.append(flight.do('key', fetch)))
+    follower.start()
+    time.sleep(0.05)
+    release.set()
+    [t.join() for t in [leader, follower]]
+    assert results == [result, result]
+    assert sum(r is result for r in results) == 1
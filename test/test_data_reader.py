@@ -1,4 +1,5 @@
 import pickle
+import pytest
 
 # test_is to avoid a conflict
 # btw same file name(.py) and function name(def .
@@ -61,6 +62,10 @@ def test_get_resource_bundle():
     assert get_resource_bundle(efrb_url) == resource_bundle
 
 
+def test_parse_efrb_key():
+    assert parse_efrb_key(efrb_url) == ('krx.mdc.i18n.component', 'B107.bld', 'kospi')
+
+
 def test_parse_jsGride_dict():
     assert parse_jsGrid_dict(jsp_soup) == jsGrid_dict
 
@@ -80,3 +85,77 @@ def test_parse_table_map():
 def test_parse_div_map():
     assert parse_div_map(div_tag) == div_map
 '''
+
+
+def test_data_reader_many(monkeypatch):
+    import finance.data_reader_
+
+    def fake_data_reader(code, **kwargs):
+        if code == '99999':
+            raise ValueError(f"No function code, [{code}]")
+        return code, kwargs
+
+    monkeypatch.setattr(finance.data_reader_, 'data_reader', fake_data_reader)
+    results = data_reader_many([('12003', {'item': '삼성전자'}), '99999', '12001'], max_workers=2)
+    assert results[0] == ('12003', {'item': '삼성전자'})
+    assert isinstance(results[1], ValueError)
+    assert results[2] == ('12001', {})
+
+
+def test_data_reader_checks_compact():
+    # 요청을 보내기 전에 잘못된 compact 를 알려준다.
+    with pytest.raises(ValueError):
+        data_reader('12001', day='20210430', market='전체', compact='int8')
+    with pytest.raises(ValueError):
+        data_reader('12001', day='20210430', market='전체', compact=True, output='arrow')
+
+
+def test_split_date_range():
+    assert split_date_range('20200101', '20201231', 200) == \
+           [('20200615', '20201231'), ('20200101', '20200614')]
+    assert split_date_range('20210104', '20210104', 730) == [('20210104', '20210104')]
+
+
+def test_split_requested_data():
+    data = {'bld': 'dbms/MDC/STAT/standard/MDCSTAT01701', 'strtDd': '20150101', 'endDd': '20201231'}
+    chunks = split_requested_data(data)
+    assert len(chunks) == 4
+    assert chunks[0]['endDd'] == '20201231' and chunks[-1]['strtDd'] == '20150101'
+    universe = dict(data, bld='dbms/MDC/STAT/standard/MDCSTAT01501')
+    assert split_requested_data(universe) == [universe]
+
+
+def test_split_requested_data_aggregate():
+    # [12008] 기간합계, 상세보기는 기간 전체의 합계이므로 나누지 않는다. 일별추이만 나눈다.
+    for bld, n_chunks in [('MDCSTAT02201', 1), ('MDCSTAT02203', 1), ('MDCSTAT02202', 7)]:
+        data = {'bld': f'dbms/MDC/STAT/standard/{bld}', 'strtDd': '20150101', 'endDd': '20201231'}
+        assert len(split_requested_data(data)) == n_chunks
+
+
+def test_merge_krx_data():
+    first = {'output': [{'TRD_DD': '2021/01/05'}, {'TRD_DD': '2021/01/04'}], 'CURRENT_DATETIME': '2021.01.06'}
+    second = {'output': [{'TRD_DD': '2021/01/04'}, {'TRD_DD': '2020/12/30'}], 'CURRENT_DATETIME': '2021.01.06'}
+    assert merge_krx_data([first, second]) == {
+        'output': [{'TRD_DD': '2021/01/05'}, {'TRD_DD': '2021/01/04'}, {'TRD_DD': '2020/12/30'}],
+        'CURRENT_DATETIME': '2021.01.06'
+    }
+    assert len(first['output']) == 2
+
+
+def test_parse_metadata_lxml():
+    # lxml backend 는 BeautifulSoup 과 같은 converting_map, readable_columns 를 만들어야 한다.
+    pytest.importorskip('lxml')
+    from finance import jsp_parser
+    tree = jsp_parser.make_tree(str(jsp_soup).encode())
+    resource_bundles = {efrb_url: resource_bundle}
+    assert parse_efrb_urls(tree) == [efrb_url]
+    assert jsp_parser.parse_jsGrid_dict(tree) == jsGrid_dict
+    assert parse_metadata(tree, mdcstat, resource_bundles) == \
+           (len_zero_converting_map, get_readable_columns(jsp_soup, mdcstat))
+
+
+def test_merge_krx_columns():
+    first = {'output': {'TRD_DD': ['2021/01/05', '2021/01/04'], 'TDD_CLSPRC': ['1', '2']}}
+    second = {'output': {'TRD_DD': ['2021/01/04', '2020/12/30'], 'TDD_CLSPRC': ['2', '3']}}
+    assert merge_krx_data([first, second, {'output': {}}]) == \
+           {'output': {'TRD_DD': ['2021/01/05', '2021/01/04', '2020/12/30'], 'TDD_CLSPRC': ['1', '2', '3']}}
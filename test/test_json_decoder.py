@@ -0,0 +1,51 @@
+import io
+import json
+
+import pytest
+
+from finance import json_decoder
+
+
+krx_data = {
+    'output': [
+        {'TRD_DD': '2021/04/27', 'TDD_CLSPRC': '82,900', 'FLUC_RT': '0.48'},
+        {'TRD_DD': '2021/04/26', 'TDD_CLSPRC': '82,500'},
+        {'TRD_DD': '2021/04/23', 'TDD_CLSPRC': '82,800', 'FLUC_RT': '0.49', 'MKTCAP': 494}
+    ],
+    'CURRENT_DATETIME': '2021.04.27 PM 04:10:02'
+}
+
+columns = {
+    'output': {
+        'TRD_DD': ['2021/04/27', '2021/04/26', '2021/04/23'],
+        'TDD_CLSPRC': ['82,900', '82,500', '82,800'],
+        'FLUC_RT': ['0.48', None, '0.49'],
+        'MKTCAP': [None, None, 494]
+    },
+    'CURRENT_DATETIME': '2021.04.27 PM 04:10:02'
+}
+
+
+def test_rows_to_columns():
+    assert json_decoder.rows_to_columns(krx_data) == columns
+
+
+def test_stream_columns():
+    pytest.importorskip('ijson')
+    content = io.BytesIO(json.dumps(krx_data).encode('utf-8'))
+    assert json_decoder.stream_columns(content) == {'output': columns['output']}
+
+
+def test_decode_columns_empty():
+    assert json_decoder.decode_columns(b'{"output": [], "CURRENT_DATETIME": ""}')['output'] == {}
+
+
+def test_prepended_stream():
+    stream = json_decoder.PrependedStream(b'{"out', io.BytesIO(b'put": []}'))
+    assert stream.read(3) + stream.read(4) + stream.read() == b'{"output": []}'
+
+
+def test_n_rows():
+    assert json_decoder.n_rows(columns['output']) == 3
+    assert json_decoder.n_rows(krx_data['output']) == 3
+    assert json_decoder.n_rows({}) == 0
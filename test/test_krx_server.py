@@ -0,0 +1,329 @@
+"""
+KrxServer 를 사용한 data_reader, adata_reader 테스트.
+
+test/corpus 에 녹화된 응답은 [15001] 전종목 시세(파생)의 jsp, resource bundle, getJsonData.cmd 하나씩뿐이다.
+autocomplete.jspx, 종목 목록, 일별 추이 [12003](MDCSTAT01701), 기간합계 [12008](MDCSTAT02201)은 아직 녹화하지 못했다.
+(녹화에는 data.krx.co.kr 접속이 필요하다.) 그래서 이 요청들은 stock_corpus 처럼 테스트에서 같은 형식의 응답을 만들어
+임시 corpus 에 넣어 테스트하고, test_recorded_corpus 는 녹화되기 전까지 skip 된다.
+python -m test.krx_server --record-corpus 로 녹화하면 test/corpus 에 추가된다.
+"""
+import json
+import time
+import asyncio
+from urllib.parse import urlsplit, parse_qsl
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+import requests
+
+import finance
+from finance import session, symbols, registry
+from finance.cache import metadata_cache, response_cache, resource_bundle_cache, TTLCache
+from finance.symbols import SymbolMaster
+from finance.statistics.basic.info import Info
+from finance.exceptions import KrxHtmlResponseError
+from test.krx_server import KrxServer, Corpus, json_data_path, representative_requests
+
+args = ('15001',)
+kwargs = {'day': '20210430', 'item': '코스피200 선물', 'market': '전체'}
+
+
+@pytest.fixture
+def krx_server(monkeypatch):
+    for cache in [metadata_cache, response_cache, resource_bundle_cache]:
+        monkeypatch.setattr(cache, 'enabled', False)
+    monkeypatch.setitem(session.config, 'backoff', 0)
+    servers = []
+
+    def start(**server_kwargs):
+        server = KrxServer(**server_kwargs).start()
+        servers.append(server)
+        monkeypatch.setitem(session.config, 'base_url', server.url)
+        return server
+    yield start
+    for server in servers:
+        server.stop()
+
+
+samsung = ('삼성전자', 'KR7005930003', '005930')
+hynix = ('SK하이닉스', 'KR7000660001', '000660')
+naver = ('NAVER', 'KR7035420009', '035420')
+form = {'MIME Type': 'application/x-www-form-urlencoded; charset=UTF-8', 'csvxls_isNo': 'false'}
+
+
+def history_params(symbol, start, end):
+    # [12003] 개별종목 시세 추이의 getJsonData.cmd 요청
+    name, isin, code = symbol
+    return dict(form, **{
+        'bld': 'dbms/MDC/STAT/standard/MDCSTAT01701',
+        'tboxisuCd_finder_stkisu0_2': f'{code}/{name}',
+        'isuCd': isin,
+        'isuCd2': code,
+        'codeNmisuCd_finder_stkisu0_2': name,
+        'param1isuCd_finder_stkisu0_2': 'STK',
+        'strtDd': start,
+        'endDd': end,
+    })
+
+
+@pytest.fixture
+def stock_corpus(tmp_path, monkeypatch):
+    """
+    종목 목록 [12005], 삼성전자, SK하이닉스의 20210430 [12003] 응답,
+    삼성전자의 20190102 ~ 20210430 [12003] 응답, 종목 목록에 없는 NAVER 의 autocomplete 와 [12003] 응답.
+    12003 의 converting map, column map 은 registry 에서 찾으므로 jsp 는 필요 없다.
+    """
+    corpus = Corpus(str(tmp_path / 'corpus'))
+    listing = [{'ISU_ABBRV': name, 'ISU_CD': isin, 'ISU_SRT_CD': code} for name, isin, code in [samsung, hynix]]
+    corpus.add('POST', json_data_path, dict(form, bld='dbms/MDC/STAT/standard/MDCSTAT01901', mktId='ALL'), 200,
+               'application/json', json.dumps({'OutBlock_1': listing}).encode('utf-8'))
+    for symbol, close in [(samsung, '81,700'), (hynix, '134,000')]:
+        rows = [{'TRD_DD': '2021/04/30', 'TDD_CLSPRC': close, 'ACC_TRDVOL': '1,000'}]
+        corpus.add('POST', json_data_path, history_params(symbol, '20210430', '20210430'), 200,
+                   'application/json', json.dumps({'output': rows}).encode('utf-8'))
+    # 20190102 ~ 20210430 은 chunk_days 에 따라 두 번으로 나누어 요청한다.
+    for start, end, day, close in [('20190502', '20210430', '2021/04/30', '81,700'),
+                                   ('20190102', '20190501', '2019/01/02', '38,750')]:
+        rows = [{'TRD_DD': day, 'TDD_CLSPRC': close, 'ACC_TRDVOL': '1,000'}]
+        corpus.add('POST', json_data_path, history_params(samsung, start, end), 200,
+                   'application/json', json.dumps({'output': rows}).encode('utf-8'))
+    # 종목 목록에 없는 이름은 autocomplete.jspx 로 찾는다.
+    url = urlsplit(Info.autocomplete_url('NAVER', 'stock'))
+    corpus.add('GET', url.path, dict(parse_qsl(url.query)), 200, 'text/html; charset=UTF-8',
+               '<li data-nm="NAVER" data-cd="KR7035420009" data-tp="035420"></li>'.encode('utf-8'))
+    rows = [{'TRD_DD': '2021/04/30', 'TDD_CLSPRC': '360,000', 'ACC_TRDVOL': '1,000'}]
+    corpus.add('POST', json_data_path, history_params(naver, '20210430', '20210430'), 200,
+               'application/json', json.dumps({'output': rows}).encode('utf-8'))
+
+    entry = {'converting_map': {}, 'readable_columns': {'TRD_DD': '일자', 'TDD_CLSPRC': '종가', 'ACC_TRDVOL': '거래량'},
+             'built_at': time.time()}
+    monkeypatch.setattr(registry, '_registry', {'version': registry.registry_version,
+                                                'entries': {'MDCSTAT01701': entry}})
+    master = SymbolMaster(path=str(tmp_path / 'symbols'))
+    monkeypatch.setattr(symbols, 'symbol_master', master)
+    monkeypatch.setattr('finance.tools.symbol_master', master)
+    monkeypatch.setattr('finance.statistics.basic.info.symbol_master', master)
+    monkeypatch.setattr(Info, 'autocomplete_cache', TTLCache(ttl=60))
+    return corpus
+
+
+def test_data_reader(krx_server):
+    server = krx_server()
+    df = finance.data_reader(*args, **kwargs)
+    assert df.shape == (13, 12)
+    assert server.requests[json_data_path] == 1
+
+
+def test_data_reader_retries_errors(krx_server, monkeypatch):
+    server = krx_server(error_rate=0.3, html_error_rate=0.3, seed=0)
+    monkeypatch.setitem(session.config, 'retries', 10)
+    monkeypatch.setitem(session.config, 'html_retries', 10)
+    df = finance.data_reader(*args, **kwargs)
+    assert df.shape == (13, 12)
+    assert sum(server.requests.values()) > 3
+
+
+def test_data_reader_html_response(krx_server):
+    server = krx_server(html_error_rate=1)
+    with pytest.raises(KrxHtmlResponseError):
+        finance.data_reader(*args, **kwargs)
+    assert server.requests[json_data_path] == session.config['html_retries'] + 1
+
+
+def test_strict(krx_server):
+    krx_server(strict=True)
+    r = session.post('http://data.krx.co.kr' + json_data_path, data={'bld': 'dbms/MDC/STAT/standard/MDCSTAT12501'})
+    assert r.status_code == 404
+
+
+def test_corpus_add(tmp_path):
+    corpus = Corpus(str(tmp_path))
+    corpus.add('POST', json_data_path, {'bld': 'a', 'trdDd': '20210430'}, 200, 'application/json', b'{"output": []}')
+    corpus = Corpus(str(tmp_path))
+    entry = corpus.find('POST', json_data_path, {'bld': 'a', 'trdDd': '20210503'})
+    assert corpus.read_body(entry) == b'{"output": []}'
+    assert corpus.find('POST', json_data_path, {'bld': 'a', 'trdDd': '20210503'}, strict=True) is None
+
+
+def test_latency(krx_server):
+    server = krx_server(latency=(0.05, 0.1))
+    r = requests.get(server.url + '/contents/MDC/STAT/standard/MDCSTAT125.jsp')
+    assert r.status_code == 200
+    assert r.elapsed.total_seconds() >= 0.05
+
+
+def test_single_flight(krx_server):
+    server = krx_server(latency=0.2)
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        futures = [executor.submit(finance.data_reader, *args, **kwargs) for _ in range(8)]
+        results = [future.result() for future in futures]
+    assert server.requests[json_data_path] == 1
+    for df in results[1:]:
+        assert df is not results[0]
+        assert df.equals(results[0])
+
+
+def test_single_flight_async(krx_server):
+    server = krx_server(latency=0.2)
+
+    async def main():
+        try:
+            return await asyncio.gather(*[finance.adata_reader(*args, **kwargs) for _ in range(8)])
+        finally:
+            await session.async_close()
+    results = asyncio.run(main())
+    assert server.requests[json_data_path] == 1
+    assert all(df.equals(results[0]) for df in results)
+
+
+def test_data_reader_arrow(krx_server):
+    pa = pytest.importorskip('pyarrow')
+    krx_server()
+    table = finance.data_reader(*args, output='arrow', **kwargs)
+    assert isinstance(table, pa.Table)
+    assert table.shape == (13, 12)
+    # null 은 to_numpy 에서 NaN 이 된다.
+    np.testing.assert_array_equal(table['종가'].to_numpy(), finance.data_reader(*args, **kwargs)['종가'].to_numpy())
+
+
+def test_aget(krx_server, stock_corpus):
+    server = krx_server(corpus=stock_corpus)
+
+    async def main():
+        return await asyncio.gather(
+            finance.aget('삼성전자', 20210430, 20210430),
+            finance.adata_reader('12003', start='20210430', end='20210430', item='SK하이닉스'),
+            finance.aget('000660', 20210430, 20210430),
+        )
+    samsung_df, hynix_df, hynix_by_code = asyncio.run(main())
+    assert samsung_df['종가'].tolist() == [81700]
+    assert hynix_df['종가'].tolist() == [134000]
+    assert hynix_by_code.equals(hynix_df)
+    # 종목 목록 1번, adata_reader 호출마다 1번씩
+    assert server.requests[json_data_path] == 4
+
+
+def test_async_session_closed_with_loop(krx_server, stock_corpus):
+    krx_server(corpus=stock_corpus)
+
+    async def main():
+        await finance.adata_reader('12003', start='20210430', end='20210430', item='삼성전자')
+        return session.get_async_session()
+    # async_close() 를 부르지 않아도 asyncio.run 이 끝날 때 session 이 닫힌다.
+    async_session = asyncio.run(main())
+    assert async_session.closed
+    assert len(session._async_sessions) == 0
+
+
+def test_get_many(krx_server, stock_corpus):
+    server = krx_server(corpus=stock_corpus)
+    results = finance.get_many(['SK하이닉스', '005930', '999999', '삼성전자'], 20210430, 20210430)
+    # stocks 와 같은 순서로 돌려주고, 종목명과 종목코드 모두 같은 종목의 데이터가 된다.
+    assert results[0]['종가'].tolist() == [134000]
+    assert results[1]['종가'].tolist() == [81700]
+    assert results[3].equals(results[1])
+    # 실패한 종목의 자리에는 Exception 이 들어가고 다른 종목에는 영향이 없다.
+    assert isinstance(results[2], AttributeError)
+    assert server.requests[json_data_path] == 4
+
+
+def test_chunked_history(krx_server, stock_corpus):
+    server = krx_server(corpus=stock_corpus, strict=True)
+    df = finance.get('삼성전자', 20190102, 20210430)
+    assert df['종가'].tolist() == [81700, 38750]
+    # 종목 목록 1번, 나누어진 기간마다 1번씩
+    assert server.requests[json_data_path] == 3
+
+
+def test_autocomplete(krx_server, stock_corpus):
+    server = krx_server(corpus=stock_corpus, strict=True)
+    df = finance.get('NAVER', 20210430, 20210430)
+    assert df['종가'].tolist() == [360000]
+    assert server.requests['/comm/finder/autocomplete.jspx'] == 1
+
+
+def test_item_code_does_not_block_loop(krx_server, stock_corpus, monkeypatch):
+    krx_server(corpus=stock_corpus)
+    fetch_listing = symbols.fetch_listing
+
+    def slow_fetch_listing(kind):
+        time.sleep(0.5)
+        return fetch_listing(kind)
+    monkeypatch.setattr(symbols, 'fetch_listing', slow_fetch_listing)
+
+    async def heartbeat(done):
+        # 종목 목록을 받는 동안에도 다른 task 가 실행되어야 한다.
+        gaps = []
+        while not done.is_set():
+            started = time.perf_counter()
+            await asyncio.sleep(0.01)
+            gaps.append(time.perf_counter() - started)
+        return max(gaps)
+
+    async def main():
+        done = asyncio.Event()
+        beat = asyncio.ensure_future(heartbeat(done))
+        try:
+            df = await finance.aget('005930', 20210430, 20210430)
+        finally:
+            done.set()
+        return df, await beat
+    df, max_gap = asyncio.run(main())
+    assert df['종가'].tolist() == [81700]
+    assert max_gap < 0.25
+
+
+def test_aggregate_is_not_chunked(krx_server, tmp_path, monkeypatch):
+    # [12008] 기간합계는 기간이 길어도 한 번만 요청한다. 나누면 투자자별 부분 합계가 여러 row 로 나온다.
+    corpus = Corpus(str(tmp_path / 'corpus'))
+    rows = [{'INVST_TP_NM': '개인', 'NETBID_TRDVAL': '1,000'}, {'INVST_TP_NM': '외국인', 'NETBID_TRDVAL': '-1,000'}]
+    corpus.add('POST', json_data_path, dict(form, bld='dbms/MDC/STAT/standard/MDCSTAT02201'), 200,
+               'application/json', json.dumps({'output': rows}).encode('utf-8'))
+    entry = {'converting_map': {}, 'readable_columns': {'INVST_TP_NM': '투자자구분', 'NETBID_TRDVAL': '순매수'},
+             'built_at': time.time()}
+    monkeypatch.setattr(registry, '_registry', {'version': registry.registry_version,
+                                                'entries': {'MDCSTAT02201': entry}})
+    server = krx_server(corpus=corpus)
+    df = finance.data_reader('12008', start='20150101', end='20201231', market='전체', addition_item=['ETF'])
+    assert df['투자자구분'].tolist() == ['개인', '외국인']
+    assert server.requests[json_data_path] == 1
+
+
+def test_truncated_body_is_retried(krx_server, monkeypatch):
+    # 응답을 읽다가 연결이 끊기면 다시 요청한다.
+    server = krx_server(truncate_rate=0.5, seed=0)
+    monkeypatch.setitem(session.config, 'retries', 10)
+    df = finance.data_reader(*args, **kwargs)
+    assert df.shape == (13, 12)
+    assert server.requests[json_data_path] > 1
+
+
+def test_truncated_body_raises_connection_error(krx_server):
+    server = krx_server(truncate_rate=1)
+    with pytest.raises(requests.ConnectionError):
+        finance.data_reader(*args, **kwargs)
+    assert server.requests[json_data_path] == session.config['retries'] + 1
+    # breaker 도 실패로 센다.
+    assert session.get_breaker(server.url).failures == session.config['retries'] + 1
+
+
+def test_truncated_body_is_retried_async(krx_server, monkeypatch):
+    server = krx_server(truncate_rate=0.5, seed=0)
+    monkeypatch.setitem(session.config, 'retries', 10)
+    df = asyncio.run(finance.adata_reader(*args, **kwargs))
+    assert df.shape == (13, 12)
+    assert server.requests[json_data_path] > 1
+
+
+@pytest.mark.parametrize('code, bld', [('12003', 'MDCSTAT01701'), ('12008', 'MDCSTAT02201')])
+def test_recorded_corpus(krx_server, code, bld):
+    # 일별 추이와 기간합계 응답을 녹화된 그대로 재생한다.
+    if Corpus().find('POST', json_data_path, {'bld': f'dbms/MDC/STAT/standard/{bld}'}) is None:
+        pytest.skip(f'{bld} 는 아직 test/corpus 에 녹화되지 않았다. (python -m test.krx_server --record-corpus)')
+    server = krx_server()
+    request_kwargs = next(request_kwargs for request_code, request_kwargs in representative_requests
+                          if request_code == code)
+    df = finance.data_reader(code, **request_kwargs)
+    assert len(df) > 0
+    assert server.requests[json_data_path] > 0
@@ -0,0 +1,84 @@
+import pytest
+
+import finance
+from finance import session, metrics
+from finance.cache import metadata_cache, response_cache, resource_bundle_cache
+from finance.exceptions import KrxHtmlResponseError
+from test.krx_server import KrxServer
+
+kwargs = {'day': '20210430', 'item': '코스피200 선물', 'market': '전체'}
+
+
+@pytest.fixture
+def krx_server(monkeypatch, tmp_path):
+    monkeypatch.setattr(metadata_cache, 'enabled', False)
+    monkeypatch.setattr(resource_bundle_cache, 'enabled', False)
+    monkeypatch.setattr(response_cache, 'path', str(tmp_path))
+    response_cache.invalidate()
+    monkeypatch.setattr(metrics, 'collector', metrics.Collector())
+    with KrxServer() as server:
+        monkeypatch.setitem(session.config, 'base_url', server.url)
+        yield server
+    response_cache.invalidate()
+
+
+def test_data_reader_metrics(krx_server):
+    recorded = []
+    metrics.add_hook(recorded.append)
+    try:
+        finance.data_reader('15001', **kwargs)
+        finance.data_reader('15001', **kwargs)
+    finally:
+        metrics.remove_hook(recorded.append)
+
+    first, second = [m.as_dict() for m in recorded]
+    assert first['code'] == '15001'
+    assert set(first['stages']) == {'get_requested_data', 'get_metadata', 'apply_converting_map',
+                                    'get_krx_data', 'to_DataFrame'}
+    # jsp, resource bundle, getJsonData.cmd
+    assert first['http_calls'] == 3
+    assert first['bytes'] > 0
+    assert first['rows'] == 13
+    assert first['cache_misses']['response'] == 1
+    # 두번째 호출의 getJsonData.cmd 는 response_cache 에서 온다.
+    assert second['http_calls'] == 2
+    assert second['cache_hits']['response'] == 1
+
+    totals = metrics.collector.as_dict()
+    assert totals['calls'] == {'15001': 2}
+    assert totals['http_calls'] == 5
+    assert totals['rows'] == 26
+
+
+def test_error_metrics(krx_server, monkeypatch):
+    krx_server.html_error_rate = 1
+    monkeypatch.setitem(session.config, 'retries', 0)
+    monkeypatch.setitem(session.config, 'html_retries', 0)
+    monkeypatch.setitem(session.config, 'backoff', 0)
+    with pytest.raises(KrxHtmlResponseError):
+        finance.data_reader('15001', **kwargs)
+    assert metrics.collector.as_dict()['errors'] == {'15001': 1}
+
+
+def test_no_metrics_outside_data_reader():
+    assert metrics.current() is None
+    with metrics.stage('get_krx_data'):
+        pass
+    metrics.count_http_call(10)
+
+
+def test_prometheus():
+    collector = metrics.Collector()
+    m = metrics.Metrics('12001')
+    m.add_stage('get_krx_data', 0.5)
+    m.add_http_call(100)
+    m.add_cache('response', True)
+    m.rows = 10
+    collector.add(m)
+    text = collector.to_prometheus()
+    assert '# TYPE finance_data_reader_calls_total counter' in text
+    assert 'finance_data_reader_calls_total{code="12001"} 1' in text
+    assert 'finance_data_reader_stage_seconds_total{stage="get_krx_data"} 0.5' in text
+    assert 'finance_http_bytes_total 100' in text
+    assert 'finance_cache_hits_total{cache="response"} 1' in text
+    assert text.endswith('\n')
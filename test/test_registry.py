@@ -0,0 +1,42 @@
+import json
+import time
+
+from finance import registry
+
+
+def write_registry(tmp_path, version, built_at):
+    filename = str(tmp_path / 'registry.json')
+    with open(filename, 'w', encoding='utf-8') as f:
+        json.dump({
+            'version': version,
+            'entries': {
+                'MDCSTAT01701': {
+                    'jsGrid': ['jsGrid_MDCSTAT017_0'],
+                    'converting_map': {},
+                    'readable_columns': {'TRD_DD': '일자', 'TDD_CLSPRC': '종가'},
+                    'built_at': built_at
+                }
+            }
+        }, f, ensure_ascii=False)
+    return filename
+
+
+def test_lookup(tmp_path):
+    registry.load_registry(write_registry(tmp_path, registry.registry_version, time.time()))
+    assert registry.lookup('MDCSTAT01701') == ({}, {'TRD_DD': '일자', 'TDD_CLSPRC': '종가'})
+    assert registry.lookup('MDCSTAT01501') is None
+    registry.load_registry()
+
+
+def test_lookup_stale(tmp_path):
+    registry.load_registry(write_registry(tmp_path, registry.registry_version, 0))
+    assert registry.lookup('MDCSTAT01701') is None
+    registry.load_registry(write_registry(tmp_path, registry.registry_version + 1, time.time()))
+    assert registry.lookup('MDCSTAT01701') is None
+    registry.load_registry()
+
+
+def test_function_codes():
+    codes = registry.function_codes()
+    assert '12003' in codes and '17108' in codes
+    assert codes == sorted(set(codes))
@@ -0,0 +1,111 @@
+import time
+
+import pytest
+
+from finance import search_index
+from finance.search_index import SearchIndex, to_jamo, to_choseong
+
+names = [('삼성전자', 'stock'), ('삼성전자우', 'stock'), ('삼성SDI', 'stock'), ('삼성물산', 'stock'),
+         ('SK하이닉스', 'stock'), ('현대차', 'stock'), ('LG화학', 'stock'), ('KODEX 200', 'ETF'),
+         ('KODEX 삼성그룹', 'ETF'), ('TIGER 200', 'ETF'), ('코스피 200', 'index'), ('코스피', 'index')]
+symbols = [(name, f'KR7{i:06d}0000', f'{i:06d}', kind) for i, (name, kind) in enumerate(names)]
+
+
+@pytest.fixture
+def index():
+    return SearchIndex(symbols)
+
+
+def search(index, query, **kwargs):
+    return [symbol[0] for symbol in index.search(query, **kwargs)]
+
+
+def test_jamo():
+    assert to_jamo('삼성') == 'ㅅㅏㅁㅅㅓㅇ'
+    assert to_jamo('화') == 'ㅎㅗㅏ'
+    assert to_jamo('ㅘ') == 'ㅗㅏ'
+    assert to_choseong('삼성SDI') == 'ㅅㅅSDI'
+
+
+def test_prefix(index):
+    assert set(search(index, '삼성')[:4]) == {'삼성SDI', '삼성물산', '삼성전자', '삼성전자우'}
+    # 입력 중인 글자
+    assert search(index, '삼성저')[:2] == ['삼성전자', '삼성전자우']
+    assert search(index, '사')[0].startswith('삼성')
+
+
+def test_exact_match_first(index):
+    assert search(index, '코스피')[0] == '코스피'
+    assert search(index, '코스피200')[0] == '코스피 200'
+    assert search(index, 'kodex 200')[0] == 'KODEX 200'
+
+
+def test_typo(index):
+    assert search(index, '삼송전자')[0] == '삼성전자'
+    assert search(index, '하이닉수')[0] == 'SK하이닉스'
+
+
+def test_choseong(index):
+    assert search(index, 'ㅅㅅㅈㅈ')[:2] == ['삼성전자', '삼성전자우']
+    assert search(index, 'ㅎㄷㅊ') == ['현대차']
+
+
+def test_kind_and_limit(index):
+    assert search(index, '삼성', kind='ETF') == ['KODEX 삼성그룹']
+    assert len(search(index, '삼성', limit=2)) == 2
+    assert search(index, '') == []
+    assert search(index, '없는이름') == []
+
+
+def test_code(index):
+    assert index.search('000007')[0] == symbols[7]
+
+
+def test_speed():
+    many = [(f'{name}{i}', f'KR{i:010d}', f'{i:06d}', kind) for i, (name, kind) in enumerate(names * 500)]
+    index = SearchIndex(many)
+    start = time.perf_counter()
+    for _ in range(100):
+        index.search('삼성전자')
+    # 6,000 개의 이름에서 찾아도 1번에 수 ms 이내
+    assert (time.perf_counter() - start) / 100 < 0.01
+
+
+@pytest.fixture
+def master(tmp_path, monkeypatch):
+    from finance import symbols as symbols_module
+    fetched = []
+
+    def fetch_listing(kind):
+        fetched.append(kind)
+        if kind == 'index':
+            # 지수는 여러 지수가 같은 계열 구분을 사용한다.
+            return [('코스피', '1', '001'), ('코스피 200', '1', '028'), ('코스닥', '2', '001')]
+        return [symbol[:3] for symbol in symbols if symbol[3] == kind]
+    monkeypatch.setattr(symbols_module, 'fetch_listing', fetch_listing)
+    master = symbols_module.SymbolMaster(path=str(tmp_path))
+    monkeypatch.setattr(search_index, 'symbol_master', master)
+    monkeypatch.setattr(search_index, '_index', None)
+    return master, fetched
+
+
+def test_search_uses_symbol_master(master):
+    search_index.refresh()
+    assert search_index.search('ㅅㅅㅈㅈ')[0] == symbols[0]
+    assert search_index.search('200', kind='index')[0] == ('코스피 200', '1', '028', 'index')
+    assert {symbol[0] for symbol in search_index.search('코스', kind='index')} == {'코스피', '코스피 200', '코스닥'}
+
+
+def test_search_does_not_fetch(master):
+    master, fetched = master
+    # 받아 둔 목록이 없으면 KRX 에 요청하지 않고 찾지 못한다.
+    assert search_index.search('삼성전자') == []
+    assert fetched == []
+    search_index.refresh(['stock'])
+    assert search_index.search('삼성전자')[0] == symbols[0]
+    # 받지 않은 ETF 목록은 찾지 않는다.
+    assert search_index.search('KODEX', kind='ETF') == []
+    assert fetched == ['stock']
+
+    master.enabled = False
+    assert search_index.search('삼성전자') == []
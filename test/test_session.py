@@ -0,0 +1,145 @@
+import pytest
+import requests
+
+from finance import session
+from finance.exceptions import CircuitOpenError, KrxHtmlResponseError
+from finance.data_reader_ import decode_krx_data, decode_krx_columns
+
+
+class FakeResponse:
+    def __init__(self, status_code):
+        self.status_code = status_code
+        self.content = b''
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(str(self.status_code))
+
+    def close(self):
+        pass
+
+
+class FakeSession:
+    def __init__(self, results):
+        self.results = list(results)
+        self.calls = 0
+
+    def request(self, method, url, **kwargs):
+        self.calls += 1
+        result = self.results.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return FakeResponse(result)
+
+
+@pytest.fixture
+def fake_session(monkeypatch):
+    monkeypatch.setitem(session.config, 'retries', 3)
+    monkeypatch.setitem(session.config, 'backoff', 0)
+    monkeypatch.setitem(session.config, 'breaker_threshold', 3)
+
+    def make(results):
+        fake = FakeSession(results)
+        monkeypatch.setattr(session, 'get_session', lambda: fake)
+        return fake
+    return make
+
+
+def test_request_retries_server_error(fake_session):
+    fake = fake_session([503, requests.ConnectionError(), 200])
+    assert session.get('http://data.krx.co.kr/').status_code == 200
+    assert fake.calls == 3
+
+
+def test_request_does_not_retry_client_error(fake_session):
+    fake = fake_session([404])
+    assert session.get('http://data.krx.co.kr/').status_code == 404
+    assert fake.calls == 1
+
+
+def test_request_raises_after_retries(fake_session):
+    session.config['breaker_threshold'] = 100
+    fake_session([500] * 4)
+    with pytest.raises(requests.HTTPError):
+        session.get('http://data.krx.co.kr/')
+
+
+def test_circuit_breaker_opens(fake_session):
+    fake = fake_session([requests.Timeout()] * 3)
+    with pytest.raises(CircuitOpenError):
+        session.get('http://data.krx.co.kr/')
+    assert fake.calls == 3
+    # 다른 host 는 영향을 받지 않는다.
+    fake_session([200])
+    assert session.get('http://other.example.com/').status_code == 200
+
+
+def test_circuit_breaker_half_open(fake_session, monkeypatch):
+    fake_session([requests.Timeout()] * 3)
+    with pytest.raises(CircuitOpenError):
+        session.get('http://data.krx.co.kr/')
+    monkeypatch.setitem(session.config, 'breaker_reset', 0)
+    fake_session([200])
+    assert session.get('http://data.krx.co.kr/').status_code == 200
+    assert session.get_breaker('http://data.krx.co.kr/').failures == 0
+
+
+def test_backoff_delay(monkeypatch):
+    monkeypatch.setitem(session.config, 'backoff', 0.5)
+    monkeypatch.setitem(session.config, 'backoff_max', 2)
+    for attempt in range(10):
+        assert 0 <= session.backoff_delay(attempt) <= min(2, 0.5 * 2 ** attempt)
+
+
+def test_call_with_retry(monkeypatch):
+    monkeypatch.setitem(session.config, 'backoff', 0)
+    results = [KrxHtmlResponseError({}), {'output': []}]
+
+    def fetch():
+        result = results.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result
+    assert session.call_with_retry(fetch, retry_on=KrxHtmlResponseError) == {'output': []}
+
+
+def test_call_with_retry_budget(monkeypatch):
+    monkeypatch.setitem(session.config, 'backoff', 0)
+    monkeypatch.setitem(session.config, 'retries', 5)
+    monkeypatch.setitem(session.config, 'html_retries', 1)
+    calls = []
+
+    def fetch(error):
+        calls.append(error)
+        raise error
+    # HTML 응답은 html_retries 만큼만 다시 요청한다.
+    with pytest.raises(KrxHtmlResponseError):
+        session.call_with_retry(fetch, KrxHtmlResponseError({}), retry_on=KrxHtmlResponseError)
+    assert len(calls) == 2
+    # 연결 오류는 request() 에서 이미 다시 요청했으므로 여기서는 다시 요청하지 않는다.
+    calls.clear()
+    with pytest.raises(requests.ConnectionError):
+        session.call_with_retry(fetch, requests.ConnectionError(), retry_on=KrxHtmlResponseError)
+    assert len(calls) == 1
+
+
+def test_decode_html_response():
+    content = b'\r\n<!DOCTYPE html><html><body>error</body></html>'
+    with pytest.raises(KrxHtmlResponseError):
+        decode_krx_data(content, {'bld': 'dbms/MDC/STAT/standard/MDCSTAT01501'}, 200)
+    with pytest.raises(KrxHtmlResponseError):
+        decode_krx_columns(content, {'bld': 'dbms/MDC/STAT/standard/MDCSTAT01501'}, 200)
+
+
+def test_decode_invalid_json():
+    # 예전에는 UnboundLocalError 가 발생했다.
+    with pytest.raises(ValueError):
+        decode_krx_data(b'{"output": [', {}, 200)
+
+
+def test_reset_breakers(fake_session):
+    fake_session([503, 503, 503, 200])
+    with pytest.raises(CircuitOpenError):
+        session.get('http://data.krx.co.kr/a')
+    session.reset_breakers()
+    assert session.get('http://data.krx.co.kr/a').status_code == 200
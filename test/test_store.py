@@ -0,0 +1,170 @@
+import os
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from finance import symbols, store as store_module
+from finance.exceptions import NoDataError
+from finance.store import TimeSeriesStore, subtract_ranges, merge_ranges, trim_weekend, merge_data
+
+pytest.importorskip('pyarrow')
+
+
+@pytest.fixture
+def fake_data_reader(monkeypatch):
+    calls = []
+    holidays = {'20210505'}
+
+    def data_reader(code, start=None, end=None, item=None, **kwargs):
+        calls.append((start, end))
+        days = [d for d in pd.date_range(start, end, freq='B')[::-1] if d.strftime('%Y%m%d') not in holidays]
+        if not days:
+            raise NoDataError('No data, Check parameters')
+        columns = pd.MultiIndex.from_tuples([('종가', ''), ('기초지수', '종가')])
+        values = np.array([[float(d.strftime('%Y%m%d')), 1.0] for d in days])
+        return pd.DataFrame(values, index=pd.DatetimeIndex(days), columns=columns)
+    monkeypatch.setattr(store_module, 'data_reader', data_reader)
+    listing = [('삼성전자', 'KR7005930003', '005930'), ('SK하이닉스', 'KR7000660001', '000660'),
+               ('KODEX 200', 'KR7069500007', '069500')]
+    monkeypatch.setattr(symbols, 'lookup', lambda item, kind: next(
+        (symbol for symbol in listing if str(item) in [symbol[0], symbol[2]]), None))
+    return calls
+
+
+def test_subtract_ranges():
+    d = lambda day: date(2021, 4, day)
+    assert subtract_ranges(d(1), d(30), []) == [(d(1), d(30))]
+    assert subtract_ranges(d(1), d(30), [(d(5), d(10)), (d(20), d(25))]) == \
+        [(d(1), d(4)), (d(11), d(19)), (d(26), d(30))]
+    assert subtract_ranges(d(5), d(10), [(d(1), d(30))]) == []
+    assert merge_ranges([(d(11), d(20)), (d(1), d(10)), (d(15), d(25))]) == [(d(1), d(25))]
+    # 20210501, 20210502 는 토요일, 일요일
+    assert trim_weekend(date(2021, 5, 1), date(2021, 5, 2)) is None
+    assert trim_weekend(date(2021, 4, 30), date(2021, 5, 2)) == (date(2021, 4, 30), date(2021, 4, 30))
+
+
+def test_fetch_only_missing_ranges(tmp_path, fake_data_reader):
+    store = TimeSeriesStore(path=str(tmp_path))
+    data = store.read('13103', 20210401, 20210430, item='KODEX 200')
+    assert fake_data_reader == [('20210401', '20210430')]
+    assert data.index[0] == pd.Timestamp('2021-04-30')
+    assert len(data) == 22
+
+    # 뒤쪽 기간만 받는다. 20210501, 20210502 는 주말이므로 20210503 부터 요청한다.
+    data = store.read('13103', 20210401, 20210507, item='KODEX 200')
+    assert fake_data_reader[1:] == [('20210503', '20210507')]
+    # 20210505 는 휴일
+    assert len(data) == 22 + 4
+    assert data.columns.equals(pd.MultiIndex.from_tuples([('종가', ''), ('기초지수', '종가')]))
+
+    # 가운데 기간을 받았던 경우 앞, 뒤만 받는다.
+    store.read('13103', 20210301, 20210331, item='KODEX 200')
+    store.read('13103', 20210201, 20210531, item='KODEX 200')
+    assert fake_data_reader[2:] == [('20210301', '20210331'), ('20210201', '20210226'), ('20210510', '20210531')]
+    assert store.covered('13103', item='KODEX 200') == [('20210201', '20210531')]
+
+    # 저장된 기간만 요청하면 KRX 에 요청하지 않는다.
+    data = TimeSeriesStore(path=str(tmp_path)).read('13103', 20210415, 20210420, item='KODEX 200')
+    assert len(fake_data_reader) == 5
+    assert list(data.index) == list(pd.date_range('20210415', '20210420', freq='B')[::-1])
+
+
+def test_weekend_and_holiday(tmp_path, fake_data_reader):
+    store = TimeSeriesStore(path=str(tmp_path))
+    with pytest.raises(NoDataError):
+        store.read('12003', 20210501, 20210502, item='삼성전자')
+    assert fake_data_reader == []
+    store.read('12003', 20210503, 20210504, item='삼성전자')
+    store.read('12003', 20210506, 20210507, item='삼성전자')
+    # 앞, 뒤로 데이터가 있는 평일은 휴장일이므로 다시 요청하지 않는다.
+    assert store.read('12003', 20210505, 20210505, item='삼성전자').empty
+    assert fake_data_reader[2:] == [('20210505', '20210505')]
+    store.read('12003', 20210501, 20210507, item='삼성전자')
+    assert len(fake_data_reader) == 3
+    assert store.covered('12003', item='삼성전자') == [('20210501', '20210507')]
+
+
+def test_empty_weekday_is_refetched(tmp_path, fake_data_reader):
+    # 앞, 뒤로 데이터가 없으면 상장 전이거나 아직 공개되지 않은 날일 수 있으므로 다시 요청한다.
+    store = TimeSeriesStore(path=str(tmp_path))
+    for _ in range(2):
+        with pytest.raises(NoDataError):
+            store.read('12003', 20210505, 20210505, item='삼성전자')
+    assert fake_data_reader == [('20210505', '20210505')] * 2
+    assert store.covered('12003', item='삼성전자') == []
+
+    store.read('12003', 20210506, 20210507, item='삼성전자')
+    assert store.read('12003', 20210505, 20210505, item='삼성전자').empty
+    assert fake_data_reader[3:] == [('20210505', '20210505')]
+
+
+def test_today_is_not_covered(tmp_path, fake_data_reader):
+    store = TimeSeriesStore(path=str(tmp_path))
+    today = datetime.now()
+    start = (today - timedelta(days=10)).strftime('%Y%m%d')
+    store.read('12003', start, item='삼성전자')
+    covered = store.covered('12003', item='삼성전자')
+    assert covered == [(start, (today - timedelta(days=1)).strftime('%Y%m%d'))]
+
+
+def test_params_are_stored_separately(tmp_path, fake_data_reader):
+    store = TimeSeriesStore(path=str(tmp_path))
+    store.read('12003', 20210401, 20210430, item='삼성전자')
+    store.read('12003', 20210401, 20210430, item='SK하이닉스')
+    # 같은 종목은 이름과 종목코드 중 무엇으로 요청해도 표준코드 아래에 함께 저장된다.
+    store.read('12003', 20210401, 20210430, item_code='005930')
+    assert len(fake_data_reader) == 2
+    assert sorted(os.listdir(tmp_path / '12003')) == ['KR7000660001', 'KR7005930003']
+    # 나머지 인자가 다르면 따로 저장된다.
+    store.read('12003', 20210401, 20210430, item='삼성전자', adj_price=True)
+    assert len(fake_data_reader) == 3
+    store.invalidate('12003', item_code='005930')
+    store.read('12003', 20210401, 20210430, item='삼성전자')
+    assert len(fake_data_reader) == 4
+
+
+def test_unknown_item(tmp_path, fake_data_reader):
+    # 종목 목록에 없으면 종목 인자도 key 에 넣어 따로 저장한다.
+    store = TimeSeriesStore(path=str(tmp_path))
+    store.read('12003', 20210401, 20210430, item='없는종목')
+    store.read('12003', 20210401, 20210430, item='다른종목')
+    assert len(fake_data_reader) == 2
+    assert os.listdir(tmp_path / '12003') == ['_']
+
+
+def test_lookup_symbol(monkeypatch):
+    monkeypatch.setattr(symbols, 'lookup', lambda item, kind: {
+        'index': ('코스피 200', '1', '028'), 'stock': ('삼성전자', 'KR7005930003', '005930')}[kind])
+    assert store_module.lookup_symbol('12003', '삼성전자') == 'KR7005930003'
+    # 지수는 계열 구분과 지수 코드를 붙여서 구분한다.
+    assert store_module.lookup_symbol('11003', '코스피 200') == '1028'
+    assert store_module.lookup_symbol('12003', None) is None
+    # 종목 목록이 없는 function code
+    assert store_module.lookup_symbol('14001', '국고채') is None
+
+
+def test_merge_data():
+    # 하루에 여러 row 가 있는 데이터
+    def frame(days, values):
+        return pd.DataFrame({'순매수': values}, index=pd.DatetimeIndex(days))
+    data = frame(['2021-04-29', '2021-04-29', '2021-04-30', '2021-04-30'], [1.0, 2.0, 3.0, 4.0])
+    parts = [frame(['2021-04-30', '2021-04-30', '2021-05-03', '2021-05-03'], [5.0, 6.0, 7.0, 8.0])]
+    merged = merge_data(data, parts)
+    # 새로 받은 20210430 은 저장된 row 를 모두 바꾸고, 같은 날짜의 여러 row 는 남긴다.
+    assert merged['순매수'].tolist() == [1.0, 2.0, 5.0, 6.0, 7.0, 8.0]
+    assert merge_data(None, parts)['순매수'].tolist() == [5.0, 6.0, 7.0, 8.0]
+
+
+def test_data_without_date_index(tmp_path, monkeypatch):
+    monkeypatch.setattr(store_module, 'data_reader', lambda *args, **kwargs: pd.DataFrame({'a': [1]}))
+    with pytest.raises(ValueError):
+        TimeSeriesStore(path=str(tmp_path)).read('12001', 20210401, 20210430)
+
+
+@pytest.mark.parametrize('kwargs', [{'output': 'arrow'}, {'compact': True}])
+def test_unsupported_kwargs(tmp_path, fake_data_reader, kwargs):
+    with pytest.raises(TypeError):
+        TimeSeriesStore(path=str(tmp_path)).read('12003', 20210401, 20210430, item='삼성전자', **kwargs)
+    assert fake_data_reader == []
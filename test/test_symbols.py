@@ -0,0 +1,180 @@
+import pytest
+
+from finance import symbols, session
+from finance.cache import TTLCache
+from finance.symbols import SymbolMaster, SymbolTable
+from finance.statistics.basic.info import Info
+from finance.to_DataFrame import GettingDataNm
+
+samsung = ('삼성전자', 'KR7005930003', '005930')
+kodex = ('KODEX 200', 'KR7069500007', '069500')
+
+
+@pytest.fixture
+def listing(monkeypatch):
+    listings = {'stock': [samsung, ('SK하이닉스', 'KR7000660001', '000660')], 'ETF': [kodex]}
+    calls = []
+
+    def fetch_listing(kind):
+        calls.append(kind)
+        if isinstance(listings[kind], Exception):
+            raise listings[kind]
+        return listings[kind]
+    monkeypatch.setattr(symbols, 'fetch_listing', fetch_listing)
+    return listings, calls
+
+
+def test_lookup(tmp_path, listing):
+    _, calls = listing
+    master = SymbolMaster(path=str(tmp_path))
+    assert master.lookup('삼성전자', 'stock') == samsung
+    assert master.lookup('005930', 'stock') == samsung
+    assert master.lookup('KR7005930003', 'stock') == samsung
+    assert master.lookup('KODEX 200', 'ETF') == kodex
+    assert master.lookup('없는종목', 'stock') is None
+    assert master.lookup('삼성전자', 'derivative') is None
+    # kind 별로 하루에 한 번만 받는다.
+    assert calls == ['stock', 'ETF']
+
+
+def test_persistent(tmp_path, listing):
+    _, calls = listing
+    SymbolMaster(path=str(tmp_path)).lookup('삼성전자', 'stock')
+    assert SymbolMaster(path=str(tmp_path)).lookup('005930', 'stock') == samsung
+    assert calls == ['stock']
+
+
+def test_refresh_is_incremental(tmp_path, listing, monkeypatch):
+    listings, calls = listing
+    master = SymbolMaster(path=str(tmp_path))
+    master.lookup('삼성전자', 'stock')
+
+    # 다음날 목록에서 삼성전자가 빠지고 같은 단축코드로 다른 종목이 생긴 경우
+    monkeypatch.setattr(symbols, 'today', lambda: '99991231')
+    listings['stock'] = [('새종목', 'KR7005930999', '005930')]
+    assert master.lookup('005930', 'stock') == ('새종목', 'KR7005930999', '005930')
+    # 목록에서 빠진 종목도 이름과 표준코드로 찾을 수 있다.
+    assert master.lookup('삼성전자', 'stock') == samsung
+    assert master.lookup('SK하이닉스', 'stock')[2] == '000660'
+    assert calls == ['stock', 'stock']
+
+
+def test_refresh_failure(tmp_path, listing, monkeypatch):
+    listings, calls = listing
+    master = SymbolMaster(path=str(tmp_path))
+    listings['ETF'] = ConnectionError()
+    assert master.lookup('KODEX 200', 'ETF') is None
+    assert master.lookup('KODEX 200', 'ETF') is None
+    # retry_after 동안은 다시 받지 않는다.
+    assert calls == ['ETF']
+
+    master.lookup('삼성전자', 'stock')
+    monkeypatch.setattr(symbols, 'today', lambda: '99991231')
+    listings['stock'] = ConnectionError()
+    # 받지 못하면 저장된 목록을 사용한다.
+    assert master.lookup('삼성전자', 'stock') == samsung
+
+
+def test_symbol_table_prefers_listed():
+    table = SymbolTable({'A': ['같은이름', 'A', '000001', '20200101'], 'B': ['같은이름', 'B', '000002', '20210101']})
+    assert table.lookup('같은이름') == ('같은이름', 'B', '000002')
+
+
+indices = [('코스피', '1', '001'), ('코스피 200', '1', '028'), ('코스피 100', '1', '034'),
+           ('코스닥', '2', '001'), ('코스닥 150', '2', '203')]
+
+
+def test_index_listing(tmp_path, listing):
+    listings, _ = listing
+    listings['index'] = indices
+    master = SymbolMaster(path=str(tmp_path))
+    # 계열 구분이 같은 지수도 따로 저장된다.
+    for index in indices:
+        assert master.lookup(index[0], 'index') == index
+        assert master.lookup(index[1] + index[2], 'index') == index
+    assert len(master.table('index').entries) == len(indices)
+    # 지수 코드만 주면 계열 구분이 작은 지수를 사용한다.
+    assert master.lookup('001', 'index') == ('코스피', '1', '001')
+    assert master.lookup('2001', 'index') == ('코스닥', '2', '001')
+    assert master.lookup('203', 'index') == ('코스닥 150', '2', '203')
+    assert SymbolMaster(path=str(tmp_path)).lookup('코스피 200', 'index') == ('코스피 200', '1', '028')
+
+
+def test_autocomplete_uses_symbol_master(tmp_path, listing, monkeypatch):
+    monkeypatch.setattr(symbols, 'symbol_master', SymbolMaster(path=str(tmp_path)))
+    monkeypatch.setattr('finance.statistics.basic.info.symbol_master', symbols.symbol_master)
+
+    def get(*args, **kwargs):
+        raise AssertionError('autocomplete.jspx 를 요청하면 안된다.')
+    monkeypatch.setattr(session, 'get', get)
+    assert Info(None, None, None).autocomplete('삼성전자', 'stock') == samsung
+    assert GettingDataNm().data_nm == '삼성전자'
+
+
+def test_fetch_listing(tmp_path, monkeypatch):
+    import json
+    from finance.cache import response_cache
+    from test.krx_server import KrxServer, Corpus, json_data_path
+    corpus = Corpus(str(tmp_path))
+    rows = [{'ISU_CD': samsung[1], 'ISU_SRT_CD': samsung[2], 'ISU_NM': '삼성전자보통주', 'ISU_ABBRV': samsung[0]}]
+    corpus.add('POST', json_data_path, {'bld': 'dbms/MDC/STAT/standard/MDCSTAT01901', 'mktId': 'ALL'}, 200,
+               'application/json', json.dumps({'OutBlock_1': rows}).encode('utf-8'))
+    monkeypatch.setattr(response_cache, 'enabled', False)
+    with KrxServer(corpus) as server:
+        monkeypatch.setitem(session.config, 'base_url', server.url)
+        assert symbols.fetch_listing('stock') == [samsung]
+
+
+def test_convert_code(tmp_path, listing, monkeypatch):
+    from finance.statistics.basic import stock, products
+    _, calls = listing
+    monkeypatch.setattr(symbols, 'symbol_master', SymbolMaster(path=str(tmp_path)))
+    monkeypatch.setattr('finance.statistics.basic.info.symbol_master', symbols.symbol_master)
+
+    item_price = stock.ItemPrice('12003', None, None, None, None, None, item_code='005930')
+    assert (item_price.data_nm, item_price.data_cd, item_price.data_tp) == samsung
+    etf = products.ETF('13103', None, None, None, None, item_code='069500')
+    assert (etf.data_nm, etf.data_cd, etf.data_tp) == kodex
+    with pytest.raises(AttributeError):
+        stock.ItemPrice('12003', None, None, None, None, None, item_code='999999')
+    # 여러 instance 가 같은 목록을 사용한다.
+    assert calls == ['stock', 'ETF']
+    assert GettingDataNm().data_nm == 'KODEX 200'
+
+
+def test_lookup_without_symbol_master(listing, monkeypatch):
+    monkeypatch.setattr(symbols.symbol_master, 'enabled', False)
+    assert symbols.lookup('005930', 'stock') == samsung
+
+
+class AutocompleteResponse:
+    def __init__(self, items):
+        self.content = ''.join(f'<li data-nm="{nm}" data-cd="{cd}" data-tp="{tp}"></li>' for nm, cd, tp in items).encode()
+
+
+def test_resolve(tmp_path, listing, monkeypatch):
+    import finance
+    monkeypatch.setattr('finance.tools.symbol_master', SymbolMaster(path=str(tmp_path)))
+    monkeypatch.setattr('finance.statistics.basic.info.symbol_master', SymbolMaster(path=str(tmp_path)))
+    monkeypatch.setattr(Info, 'autocomplete_cache', TTLCache(ttl=60))
+    requested = []
+    hynix = ('SK하이닉스', 'KR7000660001', '000660')
+    kospi = ('코스피', '1', '001')
+
+    def get(url, **kwargs):
+        requested.append(url)
+        if 'finder_equidx' in url:
+            return AutocompleteResponse([kospi])
+        return AutocompleteResponse([hynix])
+    monkeypatch.setattr(session, 'get', get)
+
+    result = finance.resolve(['삼성전자', '005930', 'KODEX 200', '코스피', '코스피', 'sk하이닉스'])
+    assert result[:3] == [samsung + ('stock',), samsung + ('stock',), kodex + ('ETF',)]
+    # 이름이 같은 결과가 있으면 그 종류를 사용한다.
+    assert result[3] == result[4] == kospi + ('index',)
+    # 같은 이름이 없으면 앞에 있는 종류의 결과를 사용한다.
+    assert result[5] == hynix + ('stock',)
+    # 목록에 없는 '코스피', 'sk하이닉스' 만 종류별로 한 번씩 요청한다.
+    assert len(requested) == 2 * len(finance.tools.resolve_kinds)
+
+    assert finance.resolve(['삼성전자'], kind='ETF')[0] == hynix + ('ETF',)
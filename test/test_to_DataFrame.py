@@ -86,6 +86,18 @@ def test_date_to_index_wrong():
     assert to_DataFrame.date_to_index(test_data).index[0] == 0
 
 
+def test_date_to_index_monthly():
+    test_data = pd.DataFrame([['2021/03', '100'], ['2021/02', '120']], columns=['일자', '주가'])
+    result = to_DataFrame.date_to_index(test_data)
+    assert list(result.index) == [datetime(2021, 3, 1), datetime(2021, 2, 1)]
+    assert list(result.columns) == ['주가']
+
+
+def test_date_to_index_unknown_format():
+    test_data = pd.DataFrame([['2021년 3월', '100']], columns=['일자', '주가'])
+    assert to_DataFrame.date_to_index(test_data).equals(test_data)
+
+
 def test_remove_same_named_column():
     test_data_1 = [['종가'], ['대비'], ['등락률', '주가']]
     test_data_2 = [['종가', ''], ['대비', ''], ['등락률', '주가']]
@@ -101,7 +113,73 @@ def test_multi_columnize():
 def test_string_to_float():
     test_data = pd.DataFrame([['100,000', '삼성', '-', '1000', '1000.33', 1, 1000.33]],
                     columns=['주가', 'str', '-', 'int_str', 'float_str', 'int', 'float'])
-    assert list(to_DataFrame.string_to_float(test_data).loc[0]) == \
-           [100000.0, '삼성', np.nan, 1000.0, 1000.33, 1, 1000.33]
-
-
+    # column 별 dtype 이 유지되므로 DataFrame 으로 비교한다. (np.nan 은 float64 column 에 들어간다.)
+    answer = pd.DataFrame([[100000.0, '삼성', np.nan, 1000.0, 1000.33, 1, 1000.33]],
+                          columns=['주가', 'str', '-', 'int_str', 'float_str', 'int', 'float'])
+    pd.testing.assert_frame_equal(to_DataFrame.string_to_float(test_data), answer)
+
+
+def test_string_to_float_dtypes():
+    test_data = pd.DataFrame([['1,000', '-', 'KOSPI'], ['2,000', '3.5', '1']],
+                             columns=[['가격', '가격', '시장'], ['종가', '등락률', '']],
+                             index=['a', 'b'])
+    result = to_DataFrame.string_to_float(test_data)
+    assert list(result.dtypes) == [np.float64, np.float64, test_data.dtypes.iloc[2]]
+    assert list(result.iloc[:, 0]) == [1000.0, 2000.0]
+    assert np.isnan(result.iloc[0, 1])
+    # 숫자가 아닌 값이 섞인 column 은 그대로 둔다.
+    assert list(result.iloc[:, 2]) == ['KOSPI', '1']
+    assert result.columns.equals(test_data.columns)
+    assert list(result.index) == ['a', 'b']
+
+
+
+def test_apply_column_map_columnar(example_data_json, example_column_map):
+    from finance.json_decoder import rows_to_columns
+    test = to_DataFrame.apply_column_map(rows_to_columns(example_data_json), example_column_map)
+    answer = to_DataFrame.apply_column_map(example_data_json, example_column_map)
+    pd.testing.assert_frame_equal(test, answer)
+
+
+def test_column_plan():
+    columns = ['ISU_CD', 'ISU_NM', 'FLUC_TP_CD', 'A', 'B', 'NEW']
+    column_map = {'ISU_NM': '종목명', 'A': '구분', 'B': '구분'}
+    assert to_DataFrame.column_plan(columns, column_map) == [('ISU_NM', '종목명'), ('B', '구분'), ('NEW', 'NEW')]
+
+
+def test_apply_column_map_same_as_json_normalize(example_data_json, example_column_map):
+    rows = example_data_json['output'] * 3
+    result = to_DataFrame.apply_column_map({'output': rows}, example_column_map)
+    answer = pd.json_normalize([{example_column_map[k]: v for k, v in row.items() if k != 'FLUC_TP_CD'} for row in rows])
+    pd.testing.assert_frame_equal(result, answer)
+
+
+def test_compact_DataFrame():
+    test_data = pd.DataFrame({'시장': ['KOSPI', 'KOSDAQ', 'KOSPI', 'KOSPI'],
+                              '종목명': ['a', 'b', 'c', 'd'],
+                              '종가': [1000.0, 2000.0, np.nan, 3000.0],
+                              '거래량': [10.0, 20.0, 30.0, 40.0],
+                              '등락률': [0.5, -1.25, 0.0, 3.0]})
+    result = to_DataFrame.compact_DataFrame(test_data)
+    assert isinstance(result['시장'].dtype, pd.CategoricalDtype)
+    assert not isinstance(result['종목명'].dtype, pd.CategoricalDtype)
+    # NaN 이 있으면 int64 로 바꿀 수 없다.
+    assert result['종가'].dtype == np.float64
+    assert result['거래량'].dtype == np.int64
+    assert result['등락률'].dtype == np.float64
+    assert list(result['시장']) == list(test_data['시장'])
+    memory_usage = result.attrs['memory_usage']
+    assert memory_usage['saved'] == memory_usage['before'] - memory_usage['after']
+
+    result = to_DataFrame.compact_DataFrame(test_data, float32=True)
+    assert result['등락률'].dtype == np.float32
+    assert result['거래량'].dtype == np.int64
+
+
+def test_to_DataFrame_compact(example_data_json, example_column_map):
+    from finance.json_decoder import rows_to_columns
+    data = rows_to_columns(example_data_json)
+    answer = to_DataFrame.to_DataFrame(data, dict(example_column_map))
+    result = to_DataFrame.to_DataFrame(data, dict(example_column_map), compact=True)
+    assert 'memory_usage' in result.attrs
+    pd.testing.assert_frame_equal(result, answer, check_dtype=False, check_categorical=False)
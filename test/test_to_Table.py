@@ -0,0 +1,89 @@
+import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from finance import to_Table
+from finance.json_decoder import rows_to_columns
+from finance.to_DataFrame import to_DataFrame, GettingDataNm
+from benchmark.payloads import load_payloads
+
+pa = pytest.importorskip('pyarrow')
+
+
+@pytest.fixture
+def history():
+    krx_data, column_map, _ = load_payloads()['history']
+    return rows_to_columns(krx_data), column_map
+
+
+def test_to_Table(history):
+    krx_data, column_map = history
+    table = to_Table.to_Table(krx_data, dict(column_map))
+    data = to_DataFrame(krx_data, dict(column_map))
+
+    assert table.num_rows == len(data)
+    assert table.schema.field('일자').type == pa.date32()
+    assert table['일자'][0].as_py() == datetime.date(2021, 4, 30)
+    # '기초지수//종가' -> '기초지수_종가'
+    assert '기초지수_종가' in table.column_names
+    assert table.schema.field('기초지수_지수명').type == pa.string()
+    np.testing.assert_array_equal(table['기초지수_종가'].to_numpy(), data[('기초지수', '종가')].to_numpy())
+    np.testing.assert_array_equal(table['종가'].to_numpy(), data[('종가', '')].to_numpy())
+
+
+def test_to_Table_rows():
+    krx_data = {'output': [{'TRD_DD': '2021/04/30', 'CLSPRC': '1,000', 'RT': '-', 'NM': 'a'},
+                           {'TRD_DD': '2021/04/29', 'CLSPRC': '2,000', 'RT': '1.5', 'NM': 'b'}]}
+    column_map = {'TRD_DD': '일자', 'CLSPRC': '가격//종가', 'RT': '등락률', 'NM': '종목명'}
+    table = to_Table.to_Table(krx_data, column_map, separator='/')
+    assert table.column_names == ['일자', '가격/종가', '등락률', '종목명']
+    assert table['가격/종가'].to_pylist() == [1000.0, 2000.0]
+    assert table['등락률'].to_pylist() == [None, 1.5]
+    assert table['종목명'].to_pylist() == ['a', 'b']
+
+
+def test_item_name_column():
+    krx_data = {'output': [{'TRD_DD': '2021/04/30', 'NM': 'a'}]}
+    column_map = {'TRD_DD': '일자', 'NM': '종목명'}
+    GettingDataNm().data_nm = '삼성전자'
+    table = to_Table.to_Table(krx_data, dict(column_map))
+    assert table.column_names == ['일자', '종목명']
+    assert table['종목명'].to_pylist() == ['a']
+
+    GettingDataNm().data_nm = '삼성전자'
+    table = to_Table.to_Table({'output': [{'TRD_DD': '2021/04/30'}]}, {'TRD_DD': '일자'})
+    assert table.column_names == ['일자', '종목명']
+    assert table['종목명'].to_pylist() == ['삼성전자']
+
+
+def test_check_output():
+    with pytest.raises(ValueError):
+        to_Table.check_output('numpy')
+    to_Table.check_output('pandas')
+    to_Table.check_output('arrow')
+    to_Table.check_output('pandas', 'float32')
+    with pytest.raises(ValueError):
+        to_Table.check_output('pandas', 'int8')
+    with pytest.raises(ValueError):
+        to_Table.check_output('arrow', True)
+
+
+def test_polars(history):
+    pl = pytest.importorskip('polars')
+    krx_data, column_map = history
+    data = to_Table.to_Table(krx_data, dict(column_map), output='polars')
+    assert isinstance(data, pl.DataFrame)
+    assert data.columns == to_Table.to_Table(krx_data, dict(column_map)).column_names
+
+
+def test_replace_substring_and_concat():
+    table = pa.table({'종목명': ['a<em>', 'b']})
+    table = to_Table.replace_substring(table, '종목명', '<em>')
+    assert table['종목명'].to_pylist() == ['a', 'b']
+    table = to_Table.concat([table, pa.table({'종목명': ['c'], '종가': [1.0]})])
+    assert table['종가'].to_pylist() == [None, None, 1.0]
+
+    data = to_Table.replace_substring(pd.DataFrame({'종목명': ['a<em>', 'b']}), '종목명', '<em>')
+    assert list(to_Table.concat([data, data])['종목명']) == ['a', 'b', 'a', 'b']